@@ -12,7 +12,7 @@ load_dotenv()
 
 # Import Base and all models to ensure they're known to Alembic
 from app.database import Base
-from app.models import User, Shop, Category, Product, Cart, Order, OrderItem
+from app.models import User, Shop, Category, Product, Cart, Order, OrderItem, StockReservation
 from app.config import settings
 
 # this is the Alembic Config object, which provides
@@ -22,9 +22,12 @@ config = context.config
 # Override sqlalchemy.url with value from environment variable
 config.set_main_option("sqlalchemy.url", settings.DATABASE_URL)
 
+# Connection handed over by the app (app.utils.schema.upgrade_schema), if any
+connection = config.attributes.get("connection")
+
 # Interpret the config file for Python logging.
-# This line sets up loggers basically.
-if config.config_file_name is not None:
+# This line sets up loggers basically. Not when running inside the app, whose logging it would reset.
+if config.config_file_name is not None and connection is None:
     fileConfig(config.config_file_name)
 
 # add your model's MetaData object here
@@ -68,19 +71,30 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    if connection is not None:
+        run_migrations(connection)
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
         poolclass=pool.NullPool,
     )
 
-    with connectable.connect() as connection:
-        context.configure(
-            connection=connection, target_metadata=target_metadata
-        )
+    with connectable.connect() as new_connection:
+        run_migrations(new_connection)
+
 
-        with context.begin_transaction():
-            context.run_migrations()
+def run_migrations(connection) -> None:
+    context.configure(
+        connection=connection,
+        target_metadata=target_metadata,
+        # SQLite can't ALTER most things; batch mode rebuilds the table instead
+        render_as_batch=connection.dialect.name == "sqlite",
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
 
 
 if context.is_offline_mode():
@@ -0,0 +1,69 @@
+"""Indexes for the common query paths
+
+Replaces the CREATE INDEX IF NOT EXISTS statements the app used to run on
+every start, minus the ones an existing unique index already covers (users
+email/username, carts user_id). Databases that ran them keep the indexes they
+already have, and lose the ones these supersede.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ('idx_users_role', 'users', ['role']),
+    ('idx_shops_owner_id', 'shops', ['owner_id']),
+    ('idx_shops_category_id', 'shops', ['category_id']),
+    ('idx_shops_is_active', 'shops', ['is_active']),
+    # Catalog browsing: filter by shop or category and availability, then range/sort by price or recency
+    ('idx_products_shop_available_price', 'products', ['shop_id', 'is_available', 'price']),
+    ('idx_products_category_available_price', 'products', ['category_id', 'is_available', 'price']),
+    ('idx_products_available_created_at', 'products', ['is_available', 'created_at']),
+    ('idx_carts_product_id', 'carts', ['product_id']),
+    ('idx_orders_customer_id', 'orders', ['customer_id']),
+    ('idx_orders_shop_id', 'orders', ['shop_id']),
+    ('idx_orders_status', 'orders', ['status']),
+    ('idx_orders_created_at', 'orders', ['created_at']),
+    ('idx_order_items_order_id', 'order_items', ['order_id']),
+    ('idx_order_items_product_id', 'order_items', ['product_id']),
+]
+
+# Indexes the startup script created before, covered by a unique index or one of the above
+SUPERSEDED_INDEXES = [
+    ('idx_users_email', 'users'),
+    ('idx_users_username', 'users'),
+    ('idx_products_shop_id', 'products'),
+    ('idx_products_category_id', 'products'),
+    ('idx_products_is_available', 'products'),
+    ('idx_products_price', 'products'),
+    ('idx_carts_user_id', 'carts'),
+]
+
+
+def _index_names(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        if name not in _index_names(table):
+            op.create_index(name, table, columns, unique=False)
+
+    for name, table in SUPERSEDED_INDEXES:
+        if name in _index_names(table):
+            op.drop_index(name, table_name=table)
+
+
+def downgrade() -> None:
+    for name, table, columns in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
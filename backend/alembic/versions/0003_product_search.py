@@ -0,0 +1,56 @@
+"""Full-text search over product names and descriptions
+
+MySQL gets a FULLTEXT index; SQLite an FTS5 external-content table kept in
+sync by triggers, filled with the products that already exist. Databases
+where the app created the search index at startup keep it.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+    "name, description, content='products', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN "
+    "INSERT INTO products_fts (rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN "
+    "INSERT INTO products_fts (products_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, description ON products BEGIN "
+    "INSERT INTO products_fts (products_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO products_fts (rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "INSERT INTO products_fts (products_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_context().dialect.name
+    if dialect == 'mysql':
+        existing = {index['name'] for index in sa.inspect(op.get_bind()).get_indexes('products')}
+        if 'ft_products_name_description' not in existing:
+            op.create_index('ft_products_name_description', 'products', ['name', 'description'], mysql_prefix='FULLTEXT')
+    elif dialect == 'sqlite':
+        for statement in SQLITE_SEARCH_DDL:
+            op.execute(statement)
+
+
+def downgrade() -> None:
+    dialect = op.get_context().dialect.name
+    if dialect == 'mysql':
+        op.drop_index('ft_products_name_description', table_name='products')
+    elif dialect == 'sqlite':
+        for trigger in ('products_fts_update', 'products_fts_delete', 'products_fts_insert'):
+            op.execute(f"DROP TRIGGER {trigger}")
+        op.execute("DROP TABLE products_fts")
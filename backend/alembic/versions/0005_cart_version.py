@@ -0,0 +1,31 @@
+"""Cart version counter on users
+
+Bumped in the transaction of every change to a user's cart or to a product in it,
+so cached cart summaries are checked with a primary key lookup.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('users')}
+    if 'cart_version' in columns:
+        return
+
+    op.add_column('users', sa.Column('cart_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'cart_version')
@@ -0,0 +1,36 @@
+"""Version rows of the data sets cached by every worker
+
+Readers compare their snapshot's version with the row's before serving it, so a
+write made through one worker is seen by the others at once.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    if sa.inspect(op.get_bind()).has_table('cache_versions'):
+        return
+
+    cache_versions = op.create_table(
+        'cache_versions',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(cache_versions, [{'name': 'categories', 'version': 0}])
+
+
+def downgrade() -> None:
+    op.drop_table('cache_versions')
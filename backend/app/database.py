@@ -1,29 +1,130 @@
-from sqlalchemy import create_engine
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from app.config import settings
+from app.replicas import ReplicaRouter
 import os
 
 # Database configuration
 DATABASE_URL = settings.DATABASE_URL
 
-# Create engine with connection pool settings
-engine = create_engine(
-    DATABASE_URL,
-    pool_pre_ping=True,  # Enable connection health checks
-    pool_recycle=3600,   # Recycle connections after 1 hour
-    pool_size=10,        # Maximum number of connections in the pool
-    max_overflow=20      # Maximum number of connections that can be created beyond pool_size
+def is_sqlite_file(url: str) -> bool:
+    """
+    Whether a database URL points at an SQLite file (not an in-memory database).
+    """
+    parsed = make_url(url)
+    return parsed.get_backend_name() == "sqlite" and parsed.database not in (None, "", ":memory:")
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={settings.SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size=-{settings.SQLITE_CACHE_SIZE_KB}")
+    cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+def _defer_begin(dbapi_connection, connection_record):
+    # Let SQLAlchemy emit BEGIN itself, instead of pysqlite deferring it to the first write
+    dbapi_connection.isolation_level = None
+
+def _begin_immediate(connection):
+    connection.exec_driver_sql("BEGIN IMMEDIATE")
+
+def _create_sqlite_engine(url: str, writer: bool):
+    """
+    SQLite production profile: WAL, so readers never block the writer, with tuned pragmas.
+
+    The writer engine has a single connection whose transactions start with BEGIN IMMEDIATE:
+    writers queue for it in the pool instead of failing with "database is locked" when a
+    read transaction tries to upgrade. Readers share a pool of connections.
+    """
+    sqlite_engine = create_engine(
+        url,
+        connect_args={"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000},
+        pool_size=1 if writer else settings.SQLITE_READER_POOL_SIZE,
+        max_overflow=0,
+        pool_timeout=settings.SQLITE_WRITE_QUEUE_TIMEOUT_SECONDS if writer else 30
+    )
+    event.listen(sqlite_engine, "connect", _set_sqlite_pragmas)
+    if writer:
+        event.listen(sqlite_engine, "connect", _defer_begin)
+        event.listen(sqlite_engine, "begin", _begin_immediate)
+    return sqlite_engine
+
+def _create_engine(url: str, pool_size: int, max_overflow: int):
+    return create_engine(
+        url,
+        pool_pre_ping=True,  # Enable connection health checks
+        pool_recycle=3600,   # Recycle connections after 1 hour
+        pool_size=pool_size,        # Maximum number of connections in the pool
+        max_overflow=max_overflow   # Maximum number of connections that can be created beyond pool_size
+    )
+
+if is_sqlite_file(DATABASE_URL):
+    # A single writer connection, plus a pool of readers on the same file
+    engine = _create_sqlite_engine(DATABASE_URL, writer=True)
+    read_engine = _create_sqlite_engine(DATABASE_URL, writer=False)
+else:
+    # Create engine with connection pool settings
+    engine = _create_engine(DATABASE_URL, settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+    read_engine = engine
+
+# Read replicas, each with its own pool
+replica_engines = [
+    _create_engine(url, settings.DB_REPLICA_POOL_SIZE, settings.DB_REPLICA_MAX_OVERFLOW)
+    for url in settings.DATABASE_REPLICA_URLS
+]
+
+replica_router = ReplicaRouter(
+    read_engine,
+    replica_engines,
+    max_lag=settings.DB_REPLICA_MAX_LAG_SECONDS,
+    lag_check_interval=settings.DB_REPLICA_LAG_CHECK_SECONDS,
+    read_your_writes_seconds=settings.DB_READ_YOUR_WRITES_SECONDS
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
 
-# Dependency to get database session
-def get_db():
+# Methods that never write; any other request marks its client as a recent writer
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+def _client_key(request: Request):
+    return request.headers.get("authorization")
+
+# Dependency to get database session.
+# Route handlers that use it are plain `def` functions so FastAPI runs them in its
+# worker threadpool instead of blocking the event loop on database I/O.
+def get_db(request: Request):
+    if request.method not in SAFE_METHODS:
+        replica_router.mark_write(_client_key(request))
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+# Dependency to get a session for read-only handlers that must not lag behind the primary
+# (the authenticated user lookup, carts, orders and the category snapshot): bound to
+# read_engine, the SQLite reader pool or the primary itself, but never a replica. Reads
+# stay off the single SQLite writer connection and never queue behind writes.
+def get_primary_read_db():
+    db = SessionLocal(bind=read_engine)
+    try:
+        yield db
+    finally:
+        db.close()
+
+# Dependency to get a session for read-only GET handlers: bound to a read replica
+# unless none is configured or within the allowed lag, or the client wrote recently
+# (and otherwise to read_engine: the SQLite reader pool, or the primary itself).
+def get_read_db(request: Request):
+    db = SessionLocal(bind=replica_router.read_engine(_client_key(request)))
+    try:
+        yield db
+    finally:
+        db.close()
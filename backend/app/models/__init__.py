@@ -5,5 +5,7 @@ from app.models.product import Product
 from app.models.cart import Cart
 from app.models.order import Order
 from app.models.order_item import OrderItem
+from app.models.stock_reservation import StockReservation
+from app.models.cache_version import CacheVersion
 
 # Import all models here to make them available when importing from app.models
\ No newline at end of file
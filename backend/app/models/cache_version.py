@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, event, DDL
+from app.database import Base
+
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+    
+    # One row per data set cached by every worker, bumped in the transaction of each write to it
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+# Names of the cached data sets, whose rows exist from the start
+CACHE_VERSION_NAMES = ["categories"]
+
+for name in CACHE_VERSION_NAMES:
+    event.listen(
+        CacheVersion.__table__,
+        "after_create",
+        DDL(f"INSERT INTO cache_versions (name, version) VALUES ('{name}', 0)")
+    )
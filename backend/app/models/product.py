@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean, DateTime, Numeric, func
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, Boolean, DateTime, Numeric, Index, func, event, DDL
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -21,4 +21,44 @@ class Product(Base):
     shop = relationship("Shop", back_populates="products")
     category = relationship("Category", back_populates="products")
     cart_items = relationship("Cart", back_populates="product", cascade="all, delete-orphan")
-    order_items = relationship("OrderItem", back_populates="product")
\ No newline at end of file
+    order_items = relationship("OrderItem", back_populates="product")
+    
+    # Composite indexes matching the catalog browsing access paths:
+    # filter by shop or category and availability, then range/sort by price or recency
+    __table_args__ = (
+        Index("idx_products_shop_available_price", "shop_id", "is_available", "price"),
+        Index("idx_products_category_available_price", "category_id", "is_available", "price"),
+        Index("idx_products_available_created_at", "is_available", "created_at"),
+    )
+
+# Full-text search over name/description. MySQL maintains a FULLTEXT index itself;
+# SQLite uses an FTS5 external-content table kept in sync by triggers.
+MYSQL_SEARCH_DDL = [
+    "CREATE FULLTEXT INDEX ft_products_name_description ON products (name, description)",
+]
+
+SQLITE_SEARCH_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS products_fts USING fts5("
+    "name, description, content='products', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_insert AFTER INSERT ON products BEGIN "
+    "INSERT INTO products_fts (rowid, name, description) VALUES (new.id, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_delete AFTER DELETE ON products BEGIN "
+    "INSERT INTO products_fts (products_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS products_fts_update AFTER UPDATE OF name, description ON products BEGIN "
+    "INSERT INTO products_fts (products_fts, rowid, name, description) "
+    "VALUES ('delete', old.id, old.name, old.description); "
+    "INSERT INTO products_fts (rowid, name, description) VALUES (new.id, new.name, new.description); END",
+]
+
+for statement in MYSQL_SEARCH_DDL:
+    event.listen(Product.__table__, "after_create", DDL(statement).execute_if(dialect="mysql"))
+
+for statement in SQLITE_SEARCH_DDL:
+    event.listen(Product.__table__, "after_create", DDL(statement).execute_if(dialect="sqlite"))
+
+event.listen(
+    Product.__table__,
+    "after_drop",
+    DDL("DROP TABLE IF EXISTS products_fts").execute_if(dialect="sqlite")
+)
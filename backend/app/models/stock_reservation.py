@@ -0,0 +1,20 @@
+from sqlalchemy import Column, Integer, ForeignKey, DateTime, Index, UniqueConstraint
+from app.database import Base
+
+class StockReservation(Base):
+    __tablename__ = "stock_reservations"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    product_id = Column(Integer, ForeignKey("products.id", ondelete="CASCADE"), nullable=False)
+    quantity = Column(Integer, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    
+    # Constraints: one hold per cart line. The product index covers the live-holds sum
+    # (product, expiry range, quantity) so it never touches the table rows; the expiry
+    # index serves the sweeper.
+    __table_args__ = (
+        UniqueConstraint('user_id', 'product_id', name='unique_reservation_user_product'),
+        Index("idx_stock_reservations_product_expires", "product_id", "expires_at", "quantity"),
+        Index("idx_stock_reservations_expires", "expires_at"),
+    )
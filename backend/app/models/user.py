@@ -14,6 +14,8 @@ class User(Base):
     last_name = Column(String(100))
     phone = Column(String(20))
     address = Column(Text)
+    # Bumped with every change to the cart or to a product in it (see cart_service)
+    cart_version = Column(Integer, nullable=False, default=0, server_default="0")
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
     
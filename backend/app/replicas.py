@@ -0,0 +1,131 @@
+"""
+Read-replica routing: picks the engine a read-only request should use.
+
+Reads go round-robin to the replicas that are within the allowed replication
+lag, and fall back to the primary when none is. Clients that wrote recently
+read from the primary for a short window, so they always see their own writes.
+"""
+import itertools
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Most clients remembered as recent writers; the oldest are forgotten first
+MAX_RECENT_WRITERS = 100_000
+
+def measure_replica_lag(engine: Engine) -> float:
+    """
+    Seconds a replica is behind its primary, or infinity when it is unreachable or not replicating.
+
+    MySQL reports it in SHOW REPLICA STATUS; other databases (SQLite stand-ins) report no lag.
+    """
+    if engine.dialect.name != "mysql":
+        return 0.0
+
+    with engine.connect() as connection:
+        try:
+            row = connection.execute(text("SHOW REPLICA STATUS")).mappings().first()
+            key = "Seconds_Behind_Source"
+        except Exception:
+            # Servers before 8.0.22
+            row = connection.execute(text("SHOW SLAVE STATUS")).mappings().first()
+            key = "Seconds_Behind_Master"
+
+    if row is None or row.get(key) is None:
+        return float("inf")
+    return float(row[key])
+
+class ReplicaRouter:
+    """
+    Choose between the primary engine and its read replicas.
+    """
+
+    def __init__(
+        self,
+        primary: Engine,
+        replicas: Sequence[Engine] = (),
+        max_lag: float = 5.0,
+        lag_check_interval: float = 5.0,
+        read_your_writes_seconds: Optional[float] = None,
+        lag_probe: Callable[[Engine], float] = measure_replica_lag
+    ):
+        self.primary = primary
+        self.replicas: List[Engine] = list(replicas)
+        self.max_lag = max_lag
+        self.lag_check_interval = lag_check_interval
+        self.lag_probe = lag_probe
+        # A replica in use can be up to max_lag behind, plus the time until its lag is next checked
+        if read_your_writes_seconds is None:
+            read_your_writes_seconds = max_lag + lag_check_interval
+        self.read_your_writes_seconds = read_your_writes_seconds
+        # Clients (by credentials) that wrote recently and until when they read from the primary, per process
+        self._recent_writers: "OrderedDict[str, float]" = OrderedDict()
+        self._lags: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        self._turn = itertools.count()
+
+    def mark_write(self, client: Optional[str]) -> None:
+        """
+        Send a client's reads to the primary for the read-your-writes window.
+        """
+        if not client or self.read_your_writes_seconds <= 0:
+            return
+        with self._lock:
+            self._recent_writers[client] = time.monotonic() + self.read_your_writes_seconds
+            self._recent_writers.move_to_end(client)
+            while len(self._recent_writers) > MAX_RECENT_WRITERS:
+                self._recent_writers.popitem(last=False)
+
+    def _wrote_recently(self, client: Optional[str]) -> bool:
+        if not client:
+            return False
+        with self._lock:
+            until = self._recent_writers.get(client)
+            if until is None:
+                return False
+            if until <= time.monotonic():
+                del self._recent_writers[client]
+                return False
+            return True
+
+    def replica_lag(self, index: int) -> float:
+        """
+        Lag of a replica, measured at most once per lag check interval.
+        """
+        now = time.monotonic()
+        with self._lock:
+            checked_at, lag = self._lags.get(index, (None, None))
+            if checked_at is not None and now - checked_at < self.lag_check_interval:
+                return lag
+            # Claim the check, so concurrent readers keep using the previous value meanwhile
+            self._lags[index] = (now, float("inf") if lag is None else lag)
+
+        try:
+            lag = self.lag_probe(self.replicas[index])
+        except Exception as e:
+            logger.warning("Replica %d is unavailable: %s", index, e)
+            lag = float("inf")
+
+        with self._lock:
+            self._lags[index] = (now, lag)
+        return lag
+
+    def read_engine(self, client: Optional[str] = None) -> Engine:
+        """
+        Engine for a read-only request: a replica within the allowed lag, or the primary.
+        """
+        if not self.replicas or self._wrote_recently(client):
+            return self.primary
+
+        start = next(self._turn)
+        for offset in range(len(self.replicas)):
+            index = (start + offset) % len(self.replicas)
+            if self.replica_lag(index) <= self.max_lag:
+                return self.replicas[index]
+        return self.primary
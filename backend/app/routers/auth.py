@@ -2,7 +2,7 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from datetime import timedelta
-from app.database import get_db
+from app.database import get_db, get_primary_read_db
 from app.schemas import UserCreate, UserResponse, Token
 from app.services import auth_service
 from app.utils.auth_middleware import get_current_active_user
@@ -15,12 +15,14 @@ router = APIRouter(
     responses={401: {"description": "Unauthorized"}},
 )
 
+# The password endpoints are async: they await the password hashing pool instead of
+# holding a request worker thread while bcrypt runs, and offload their queries.
 @router.post("/signup", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def signup(user: UserCreate, db: Session = Depends(get_db)):
     """
     Create a new user with the provided information.
     """
-    db_user, error_message = auth_service.create_user(db, user)
+    db_user, error_message = await auth_service.create_user_async(db, user)
     
     if error_message:
         raise HTTPException(
@@ -31,11 +33,13 @@ async def signup(user: UserCreate, db: Session = Depends(get_db)):
     return db_user
 
 @router.post("/login", response_model=Token)
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_primary_read_db)):
     """
     Authenticate a user and return a JWT token.
+    
+    Login only reads, so it does not take the write connection.
     """
-    user = auth_service.authenticate_user(db, form_data.username, form_data.password)
+    user = await auth_service.authenticate_user_async(db, form_data.username, form_data.password)
     
     if not user:
         raise HTTPException(
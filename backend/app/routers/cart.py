@@ -1,10 +1,23 @@
+from contextlib import contextmanager
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from decimal import Decimal
-from app.database import get_db
-from app.schemas import CartItemCreate, CartItemUpdate, CartItemResponse, CartSummary
-from app.models import Cart, Product, User
+from app.database import get_db, get_primary_read_db
+from app.schemas import CartItemCreate, CartItemUpdate, CartBatchUpdate, CartItemResponse, CartSummary
+from app.models import Cart, User
+from app.services import (
+    cart_line,
+    bump_cart_version,
+    get_cart_summary,
+    cache_cart_line,
+    uncache_cart_lines,
+    get_available_stock,
+    lock_products,
+    hold_stock,
+    hold_stocks,
+    release_stock_holds
+)
 from app.utils.auth_middleware import get_customer
 
 router = APIRouter(
@@ -13,45 +26,158 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+@contextmanager
+def _cart_write(db: Session):
+    """
+    Run a cart change, rejecting it with 409 when a concurrent request of the same user
+    wrote the same cart line or hold first (their unique constraints).
+    """
+    try:
+        yield
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The cart was changed by a concurrent request"
+        )
+
+def _stock_taken(db: Session, quantity: int, product_id: Optional[int] = None) -> HTTPException:
+    # Another cart or checkout took the stock between the check and the hold
+    db.rollback()
+    product = f" for product with id {product_id}" if product_id is not None else ""
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=f"Not enough stock available{product}. Requested: {quantity}"
+    )
+
 @router.get("/", response_model=CartSummary)
-async def get_cart(current_user: User = Depends(get_customer), db: Session = Depends(get_db)):
+def get_cart(current_user: User = Depends(get_customer), db: Session = Depends(get_primary_read_db)):
     """
     Get the current user's cart items.
+    
+    The summary is cached per user and kept up to date by the cart endpoints below; each read
+    checks it against the user's cart version, so changes made through other workers are seen.
     """
-    # Get cart items with product details
-    cart_items = db.query(Cart, Product).join(Product).filter(Cart.user_id == current_user.id).all()
+    return get_cart_summary(db, current_user.id)
+
+@router.patch("/", response_model=CartSummary)
+def update_cart(batch: CartBatchUpdate, current_user: User = Depends(get_customer), db: Session = Depends(get_db)):
+    """
+    Apply a list of add, set and remove operations to the cart.
+    
+    Operations run in order and are applied atomically: if one fails, none is.
+    Returns the updated cart summary.
+    """
+    product_ids = {operation.product_id for operation in batch.operations}
     
-    # Format response
-    items = []
-    total_amount = Decimal('0.00')
+    # Prefetch the products the operations touch, locking their rows until the holds are
+    # written, then the cart rows
+    products = lock_products(db, product_ids)
+    cart_items = {
+        cart_item.product_id: cart_item
+        for cart_item in db.query(Cart)
+            .filter(Cart.user_id == current_user.id, Cart.product_id.in_(product_ids))
+            .with_for_update()
+    }
     
-    for cart_item, product in cart_items:
-        item_total = product.price * cart_item.quantity
-        total_amount += item_total
+    # Work out the final quantity of each product, 0 meaning removed
+    quantities = {product_id: cart_item.quantity for product_id, cart_item in cart_items.items()}
+    held_product_ids = set()
+    for index, operation in enumerate(batch.operations):
+        if operation.op == "remove":
+            if not quantities.get(operation.product_id):
+                raise HTTPException(
+                    status_code=status.HTTP_404_NOT_FOUND,
+                    detail=f"Product with id {operation.product_id} is not in the cart"
+                )
+            quantities[operation.product_id] = 0
+            continue
+        
+        if operation.quantity is None:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"operations[{index}]: quantity is required for {operation.op}"
+            )
+        
+        product = products.get(operation.product_id)
+        if not product:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Product with id {operation.product_id} not found"
+            )
+        if not product.is_available:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Product with id {operation.product_id} is not available"
+            )
         
-        items.append(CartItemResponse(
-            id=cart_item.id,
-            user_id=cart_item.user_id,
-            product_id=product.id,
-            quantity=cart_item.quantity,
-            product_name=product.name,
-            product_price=product.price,
-            total_price=item_total
-        ))
-    
-    return CartSummary(
-        items=items,
-        total_items=len(items),
-        total_amount=total_amount
+        current = quantities.get(operation.product_id, 0) if operation.op == "add" else 0
+        quantities[operation.product_id] = current + operation.quantity
+        held_product_ids.add(operation.product_id)
+    
+    changed = {
+        product_id: quantity
+        for product_id, quantity in quantities.items()
+        if quantity != (cart_items[product_id].quantity if product_id in cart_items else 0)
+    }
+    
+    # Check the stock not held by other carts covers every line that changed, in one query
+    available = get_available_stock(
+        db,
+        [products[product_id] for product_id, quantity in changed.items() if quantity > 0],
+        exclude_user_id=current_user.id
     )
+    for product_id, stock in available.items():
+        if stock < changed[product_id]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Not enough stock available for product with id {product_id}. "
+                       f"Requested: {changed[product_id]}, Available: {max(stock, 0)}"
+            )
+    
+    # Write the cart rows and stock holds, flushed together
+    removed = [product_id for product_id, quantity in changed.items() if quantity == 0]
+    for product_id, quantity in changed.items():
+        cart_item = cart_items.get(product_id)
+        if quantity == 0:
+            db.delete(cart_item)
+        elif cart_item:
+            cart_item.quantity = quantity
+        else:
+            cart_items[product_id] = Cart(user_id=current_user.id, product_id=product_id, quantity=quantity)
+            db.add(cart_items[product_id])
+    
+    with _cart_write(db):
+        not_held = hold_stocks(db, current_user.id, {
+            product_id: quantities[product_id] for product_id in held_product_ids if quantities[product_id] > 0
+        })
+        if not_held:
+            raise _stock_taken(db, quantities[not_held[0]], not_held[0])
+        if removed:
+            release_stock_holds(db, current_user.id, removed)
+        db.flush()
+        version = bump_cart_version(db, current_user.id)
+        
+        # Format the changed lines before commit expires them
+        lines = [
+            cart_line(cart_items[product_id], products[product_id])
+            for product_id, quantity in changed.items() if quantity > 0
+        ]
+        db.commit()
+    
+    # Bring the cached summary up to date, then return it
+    for line in lines:
+        cache_cart_line(current_user.id, line, version)
+    uncache_cart_lines(current_user.id, version, removed)
+    return get_cart_summary(db, current_user.id, version)
 
 @router.post("/items", response_model=CartItemResponse, status_code=status.HTTP_201_CREATED)
-async def add_to_cart(item: CartItemCreate, current_user: User = Depends(get_customer), db: Session = Depends(get_db)):
+def add_to_cart(item: CartItemCreate, current_user: User = Depends(get_customer), db: Session = Depends(get_db)):
     """
     Add an item to the cart.
     """
-    # Check if product exists
-    product = db.query(Product).filter(Product.id == item.product_id).first()
+    # Check if product exists, locking its row until the hold is written
+    product = lock_products(db, [item.product_id]).get(item.product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -65,24 +191,24 @@ async def add_to_cart(item: CartItemCreate, current_user: User = Depends(get_cus
             detail=f"Product with id {item.product_id} is not available"
         )
     
-    # Check if product has enough stock
-    if product.stock_quantity < item.quantity:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Not enough stock available. Requested: {item.quantity}, Available: {product.stock_quantity}"
-        )
-    
     # Check if item already exists in cart
     existing_item = db.query(Cart).filter(
         Cart.user_id == current_user.id,
         Cart.product_id == item.product_id
-    ).first()
+    ).with_for_update().first()
+    
+    # Check if the stock not held by other carts covers the whole cart line
+    quantity = item.quantity + (existing_item.quantity if existing_item else 0)
+    available = get_available_stock(db, [product], exclude_user_id=current_user.id)[product.id]
+    if available < quantity:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Not enough stock available. Requested: {quantity}, Available: {max(available, 0)}"
+        )
     
     if existing_item:
         # Update quantity if item already exists
-        existing_item.quantity += item.quantity
-        db.commit()
-        db.refresh(existing_item)
+        existing_item.quantity = quantity
         cart_item = existing_item
     else:
         # Create new cart item
@@ -92,22 +218,23 @@ async def add_to_cart(item: CartItemCreate, current_user: User = Depends(get_cus
             quantity=item.quantity
         )
         db.add(cart_item)
+    
+    # Hold the stock for this cart until the reservation expires
+    with _cart_write(db):
+        if not hold_stock(db, current_user.id, product.id, quantity):
+            raise _stock_taken(db, quantity)
+        db.flush()
+        version = bump_cart_version(db, current_user.id)
         db.commit()
-        db.refresh(cart_item)
-    
-    # Return formatted response
-    return CartItemResponse(
-        id=cart_item.id,
-        user_id=cart_item.user_id,
-        product_id=product.id,
-        quantity=cart_item.quantity,
-        product_name=product.name,
-        product_price=product.price,
-        total_price=product.price * cart_item.quantity
-    )
+    db.refresh(cart_item)
+    
+    # Return formatted response, updating the cached cart summary with it
+    line = cart_line(cart_item, product)
+    cache_cart_line(current_user.id, line, version)
+    return line
 
 @router.put("/items/{item_id}", response_model=CartItemResponse)
-async def update_cart_item(item_id: int, item: CartItemUpdate, current_user: User = Depends(get_customer), db: Session = Depends(get_db)):
+def update_cart_item(item_id: int, item: CartItemUpdate, current_user: User = Depends(get_customer), db: Session = Depends(get_db)):
     """
     Update the quantity of a cart item.
     """
@@ -119,39 +246,39 @@ async def update_cart_item(item_id: int, item: CartItemUpdate, current_user: Use
             detail=f"Cart item with id {item_id} not found"
         )
     
-    # Get product
-    product = db.query(Product).filter(Product.id == cart_item.product_id).first()
+    # Get product, locking its row until the hold is written
+    product = lock_products(db, [cart_item.product_id]).get(cart_item.product_id)
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Product with id {cart_item.product_id} not found"
         )
     
-    # Check if product has enough stock
-    if product.stock_quantity < item.quantity:
+    # Check if the stock not held by other carts is enough
+    available = get_available_stock(db, [product], exclude_user_id=current_user.id)[product.id]
+    if available < item.quantity:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Not enough stock available. Requested: {item.quantity}, Available: {product.stock_quantity}"
+            detail=f"Not enough stock available. Requested: {item.quantity}, Available: {max(available, 0)}"
         )
     
-    # Update quantity
+    # Update quantity and the stock held for it
     cart_item.quantity = item.quantity
-    db.commit()
+    with _cart_write(db):
+        if not hold_stock(db, current_user.id, product.id, item.quantity):
+            raise _stock_taken(db, item.quantity)
+        db.flush()
+        version = bump_cart_version(db, current_user.id)
+        db.commit()
     db.refresh(cart_item)
     
-    # Return formatted response
-    return CartItemResponse(
-        id=cart_item.id,
-        user_id=cart_item.user_id,
-        product_id=product.id,
-        quantity=cart_item.quantity,
-        product_name=product.name,
-        product_price=product.price,
-        total_price=product.price * cart_item.quantity
-    )
+    # Return formatted response, updating the cached cart summary with it
+    line = cart_line(cart_item, product)
+    cache_cart_line(current_user.id, line, version)
+    return line
 
 @router.delete("/items/{item_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def remove_from_cart(item_id: int, current_user: User = Depends(get_customer), db: Session = Depends(get_db)):
+def remove_from_cart(item_id: int, current_user: User = Depends(get_customer), db: Session = Depends(get_db)):
     """
     Remove an item from the cart.
     """
@@ -163,19 +290,26 @@ async def remove_from_cart(item_id: int, current_user: User = Depends(get_custom
             detail=f"Cart item with id {item_id} not found"
         )
     
-    # Delete cart item
+    # Delete cart item and release its stock hold
+    release_stock_holds(db, current_user.id, [cart_item.product_id])
     db.delete(cart_item)
+    db.flush()
+    version = bump_cart_version(db, current_user.id)
     db.commit()
+    uncache_cart_lines(current_user.id, version, [cart_item.product_id])
     
     return None
 
 @router.delete("/", status_code=status.HTTP_204_NO_CONTENT)
-async def clear_cart(current_user: User = Depends(get_customer), db: Session = Depends(get_db)):
+def clear_cart(current_user: User = Depends(get_customer), db: Session = Depends(get_db)):
     """
     Clear the entire cart.
     """
     # Delete all cart items for the current user
     db.query(Cart).filter(Cart.user_id == current_user.id).delete()
+    release_stock_holds(db, current_user.id)
+    version = bump_cart_version(db, current_user.id)
     db.commit()
+    uncache_cart_lines(current_user.id, version)
     
     return None
\ No newline at end of file
@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status
 from sqlalchemy.orm import Session
-from typing import List
-from app.database import get_db
+from typing import List, Optional
+from app.database import get_db, get_primary_read_db
 from app.schemas import CategoryCreate, CategoryResponse, CategoryUpdate
-from app.models import User
-from app.services import get_categories, get_category, create_category, update_category, delete_category
+from app.models import Category, User
+from app.services import get_categories, get_category, create_category, update_category, delete_category, get_category_snapshot
 from app.utils.auth_middleware import get_current_user
+from app.utils.pagination import decode_cursor, set_next_cursor
+from app.utils.conditional import etag_matches, not_modified_response
 
 router = APIRouter(
     prefix="/categories",
@@ -14,19 +16,32 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=List[CategoryResponse])
-async def read_categories(
+def read_categories(
+    response: Response,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_primary_read_db)
 ):
     """
     Get all categories.
+    
+    Pass the `X-Next-Cursor` header of a page as `cursor` to read the next one.
+    Responses carry an ETag; send it back in `If-None-Match` to get a 304 when nothing changed.
     """
-    categories = get_categories(db, skip=skip, limit=limit)
+    etag = get_category_snapshot(db).etag
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+    
+    after_id = decode_cursor(cursor, [int])[0] if cursor else None
+    categories = get_categories(db, skip=skip, limit=limit, after_id=after_id)
+    set_next_cursor(response, categories, limit, lambda category: (category.id,))
+    response.headers["ETag"] = etag
     return categories
 
 @router.post("/", response_model=CategoryResponse, status_code=status.HTTP_201_CREATED)
-async def create_new_category(
+def create_new_category(
     category: CategoryCreate, 
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -52,17 +67,29 @@ async def create_new_category(
     return db_category
 
 @router.get("/{category_id}", response_model=CategoryResponse)
-async def read_category(category_id: int, db: Session = Depends(get_db)):
+def read_category(
+    category_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_primary_read_db)
+):
     """
     Get details for a specific category.
     """
-    db_category = get_category(db, category_id)
+    snapshot = get_category_snapshot(db)
+    db_category = snapshot.by_id.get(category_id)
     if db_category is None:
         raise HTTPException(status_code=404, detail="Category not found")
+    
+    etag = snapshot.etags[category_id]
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+    
+    response.headers["ETag"] = etag
     return db_category
 
 @router.put("/{category_id}", response_model=CategoryResponse)
-async def update_category_details(
+def update_category_details(
     category_id: int, 
     category_update: CategoryUpdate, 
     db: Session = Depends(get_db),
@@ -79,8 +106,8 @@ async def update_category_details(
     #         detail="Only admins can update categories"
     #     )
     
-    # Check if category exists
-    db_category = get_category(db, category_id)
+    # Check if category exists, in the database: the snapshot may predate another worker's write
+    db_category = db.get(Category, category_id)
     if db_category is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -98,7 +125,7 @@ async def update_category_details(
     return updated_category
 
 @router.delete("/{category_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_category_endpoint(
+def delete_category_endpoint(
     category_id: int, 
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -114,8 +141,8 @@ async def delete_category_endpoint(
     #         detail="Only admins can delete categories"
     #     )
     
-    # Check if category exists
-    db_category = get_category(db, category_id)
+    # Check if category exists, in the database: the snapshot may predate another worker's write
+    db_category = db.get(Category, category_id)
     if db_category is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
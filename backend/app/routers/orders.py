@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, Response, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func
-from typing import List, Optional
+from sqlalchemy import func, insert
+from typing import Dict, List, Optional
+from datetime import datetime
 from decimal import Decimal
-from app.database import get_db
+from app.database import get_db, get_primary_read_db, get_read_db
 from app.schemas import OrderCreate, OrderResponse, OrderUpdate, OrderItemResponse
 from app.models import Order, OrderItem, Cart, Product, Shop, User
+from app.services import reserve_product_stock, release_stock_holds, bump_cart_version, uncache_cart_lines, export_orders, EXPORT_FORMATS
 from app.utils.auth_middleware import get_current_user, get_shop_owner, get_customer
+from app.utils.pagination import decode_cursor, keyset_filter, set_next_cursor
+from app.utils.serialization import json_response
 
 router = APIRouter(
     prefix="/orders",
@@ -14,17 +19,63 @@ router = APIRouter(
     responses={404: {"description": "Not found"}},
 )
 
+def _load_order_items(db: Session, order_ids: List[int]) -> Dict[int, List[OrderItemResponse]]:
+    """
+    Load the items (with product names) for a batch of orders, grouped by order id.
+    """
+    items_by_order: Dict[int, List[OrderItemResponse]] = {}
+    if not order_ids:
+        return items_by_order
+    
+    items_query = db.query(OrderItem, Product.name.label("product_name")) \
+        .join(Product, OrderItem.product_id == Product.id) \
+        .filter(OrderItem.order_id.in_(order_ids)) \
+        .order_by(OrderItem.order_id, OrderItem.id)
+    
+    for item, product_name in items_query:
+        items_by_order.setdefault(item.order_id, []).append(OrderItemResponse(
+            id=item.id,
+            order_id=item.order_id,
+            product_id=item.product_id,
+            quantity=item.quantity,
+            price=item.price,
+            product_name=product_name
+        ))
+    
+    return items_by_order
+
+def _build_order_response(order: Order, items: List[OrderItemResponse]) -> OrderResponse:
+    """
+    Build an order response from an order and its already loaded items.
+    """
+    return OrderResponse(
+        id=order.id,
+        customer_id=order.customer_id,
+        shop_id=order.shop_id,
+        total_amount=order.total_amount,
+        status=order.status,
+        delivery_address=order.delivery_address,
+        notes=order.notes,
+        created_at=order.created_at,
+        updated_at=order.updated_at,
+        items=items
+    )
+
 @router.get("/", response_model=List[OrderResponse])
-async def get_orders(
+def get_orders(
+    response: Response,
     shop_id: Optional[int] = None,
     status: Optional[str] = None,
     skip: int = 0,
     limit: int = 100,
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_primary_read_db)
 ):
     """
-    Get orders for the current user (customers) or shop (owners).
+    Get orders for the current user (customers) or shop (owners), newest first.
+    
+    Pass the `X-Next-Cursor` header of a page as `cursor` to read the next one.
     """
     query = db.query(Order)
     
@@ -64,48 +115,26 @@ async def get_orders(
             )
         query = query.filter(Order.status == status)
     
+    # Continue after the cursor's (created_at, id) position
+    if cursor:
+        created_at, order_id = decode_cursor(cursor, [datetime.fromisoformat, int])
+        query = query.filter(keyset_filter([Order.created_at, Order.id], [created_at, order_id], descending=True))
+    
     # Apply pagination
-    orders = query.order_by(Order.created_at.desc()).offset(skip).limit(limit).all()
-    
-    # Load order items for each order
-    result = []
-    for order in orders:
-        # Get order items with product details
-        items_query = db.query(OrderItem, Product.name.label("product_name")) \
-            .join(Product, OrderItem.product_id == Product.id) \
-            .filter(OrderItem.order_id == order.id)
-        
-        items = []
-        for item, product_name in items_query:
-            items.append(OrderItemResponse(
-                id=item.id,
-                order_id=item.order_id,
-                product_id=item.product_id,
-                quantity=item.quantity,
-                price=item.price,
-                product_name=product_name
-            ))
-        
-        # Create order response with items
-        order_response = OrderResponse(
-            id=order.id,
-            customer_id=order.customer_id,
-            shop_id=order.shop_id,
-            total_amount=order.total_amount,
-            status=order.status,
-            delivery_address=order.delivery_address,
-            notes=order.notes,
-            created_at=order.created_at,
-            updated_at=order.updated_at,
-            items=items
-        )
-        
-        result.append(order_response)
+    orders = query.order_by(Order.created_at.desc(), Order.id.desc()).offset(skip).limit(limit).all()
+    set_next_cursor(response, orders, limit, lambda order: (order.created_at, order.id))
     
-    return result
+    # Load the items for every order on the page in a single query
+    items_by_order = _load_order_items(db, [order.id for order in orders])
+    
+    return json_response(
+        List[OrderResponse],
+        [_build_order_response(order, items_by_order.get(order.id, [])) for order in orders],
+        response
+    )
 
 @router.post("/", response_model=OrderResponse, status_code=status.HTTP_201_CREATED)
-async def create_order(order: OrderCreate, current_user: User = Depends(get_customer), db: Session = Depends(get_db)):
+def create_order(order: OrderCreate, current_user: User = Depends(get_customer), db: Session = Depends(get_db)):
     """
     Create a new order from cart items.
     """
@@ -134,6 +163,7 @@ async def create_order(order: OrderCreate, current_user: User = Depends(get_cust
     # Calculate total amount
     total_amount = Decimal('0.00')
     order_items = []
+    product_names = {}
     
     for cart_item, product in cart_items:
         # Check if product is available
@@ -154,15 +184,24 @@ async def create_order(order: OrderCreate, current_user: User = Depends(get_cust
         item_total = product.price * cart_item.quantity
         total_amount += item_total
         
-        # Create order item
+        # Order item row, inserted once the order has its id
         order_items.append({
             "product_id": product.id,
             "quantity": cart_item.quantity,
             "price": product.price
         })
-        
-        # Update product stock
-        product.stock_quantity -= cart_item.quantity
+        product_names[product.id] = product.name
+    
+    # Reserve stock with guarded atomic updates, in product id order so concurrent
+    # checkouts always lock the same rows in the same order
+    for cart_item, product in sorted(cart_items, key=lambda row: row[1].id):
+        if not reserve_product_stock(db, product.id, cart_item.quantity, user_id=current_user.id):
+            detail = f"Not enough stock for product '{product.name}'. Requested: {cart_item.quantity}"
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=detail
+            )
     
     # Create order
     new_order = Order(
@@ -175,56 +214,77 @@ async def create_order(order: OrderCreate, current_user: User = Depends(get_cust
     )
     
     db.add(new_order)
-    db.flush()  # Get the order ID without committing
+    db.flush()
     
-    # Create order items
-    db_order_items = []
+    # Insert the items with one executemany: flushed through the relationship they would be
+    # one INSERT each on MySQL, which has no RETURNING to batch them. Their ids are read back
+    # with a single query.
     for item in order_items:
-        order_item = OrderItem(
+        item["order_id"] = new_order.id
+    db.execute(insert(OrderItem), order_items)
+    item_ids = dict(db.query(OrderItem.product_id, OrderItem.id).filter(OrderItem.order_id == new_order.id).all())
+    
+    # Remove the consumed items from the cart with a single DELETE
+    db.query(Cart) \
+        .filter(Cart.id.in_([cart_item.id for cart_item, _ in cart_items])) \
+        .delete(synchronize_session=False)
+    
+    # The stock is sold now, so the cart's holds on it go too
+    release_stock_holds(db, current_user.id, product_names)
+    version = bump_cart_version(db, current_user.id)
+    
+    # Format the items from the data already loaded, before commit expires it
+    items = [
+        OrderItemResponse(
+            id=item_ids[item["product_id"]],
             order_id=new_order.id,
             product_id=item["product_id"],
             quantity=item["quantity"],
-            price=item["price"]
+            price=item["price"],
+            product_name=product_names[item["product_id"]]
         )
-        db.add(order_item)
-        db_order_items.append(order_item)
-    
-    # Remove items from cart
-    for cart_item, _ in cart_items:
-        db.delete(cart_item)
+        for item in order_items
+    ]
     
     # Commit all changes
     db.commit()
+    uncache_cart_lines(current_user.id, version, product_names)
     db.refresh(new_order)
     
-    # Format response
-    items = []
-    for item in db_order_items:
-        product_name = db.query(Product.name).filter(Product.id == item.product_id).scalar()
-        items.append(OrderItemResponse(
-            id=item.id,
-            order_id=item.order_id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price=item.price,
-            product_name=product_name
-        ))
+    return _build_order_response(new_order, items)
+
+@router.get("/export", response_class=StreamingResponse)
+def export_shop_orders(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    shop_id: Optional[int] = None,
+    order_status: Optional[str] = Query(None, alias="status", pattern="^(pending|confirmed|preparing|ready|delivered|cancelled)$"),
+    current_user: User = Depends(get_shop_owner),
+    db: Session = Depends(get_read_db)
+):
+    """
+    Export all orders of the current owner's shops, with their items, as NDJSON or CSV (shop owners only).
     
-    return OrderResponse(
-        id=new_order.id,
-        customer_id=new_order.customer_id,
-        shop_id=new_order.shop_id,
-        total_amount=new_order.total_amount,
-        status=new_order.status,
-        delivery_address=new_order.delivery_address,
-        notes=new_order.notes,
-        created_at=new_order.created_at,
-        updated_at=new_order.updated_at,
-        items=items
+    The export is streamed in keyset batches of orders, so it works for any number of orders.
+    """
+    # If shop_id is provided, verify it belongs to the current user
+    if shop_id:
+        shop = db.query(Shop.id).filter(Shop.id == shop_id, Shop.owner_id == current_user.id).first()
+        if not shop:
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="You don't have access to this shop's orders"
+            )
+    
+    media_type, extension = EXPORT_FORMATS[format]
+    # The session stays open until the response has been sent
+    return StreamingResponse(
+        export_orders(db, current_user.id, format, shop_id=shop_id, status=order_status),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="orders.{extension}"'}
     )
 
 @router.get("/{order_id}", response_model=OrderResponse)
-async def get_order(order_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_db)):
+def get_order(order_id: int, current_user: User = Depends(get_current_user), db: Session = Depends(get_primary_read_db)):
     """
     Get details for a specific order.
     """
@@ -252,37 +312,13 @@ async def get_order(order_id: int, current_user: User = Depends(get_current_user
             )
     
     # Get order items with product details
-    items_query = db.query(OrderItem, Product.name.label("product_name")) \
-        .join(Product, OrderItem.product_id == Product.id) \
-        .filter(OrderItem.order_id == order.id)
-    
-    items = []
-    for item, product_name in items_query:
-        items.append(OrderItemResponse(
-            id=item.id,
-            order_id=item.order_id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price=item.price,
-            product_name=product_name
-        ))
+    items_by_order = _load_order_items(db, [order.id])
     
     # Create order response with items
-    return OrderResponse(
-        id=order.id,
-        customer_id=order.customer_id,
-        shop_id=order.shop_id,
-        total_amount=order.total_amount,
-        status=order.status,
-        delivery_address=order.delivery_address,
-        notes=order.notes,
-        created_at=order.created_at,
-        updated_at=order.updated_at,
-        items=items
-    )
+    return _build_order_response(order, items_by_order.get(order.id, []))
 
 @router.put("/{order_id}", response_model=OrderResponse)
-async def update_order_status(order_id: int, order_update: OrderUpdate, current_user: User = Depends(get_shop_owner), db: Session = Depends(get_db)):
+def update_order_status(order_id: int, order_update: OrderUpdate, current_user: User = Depends(get_shop_owner), db: Session = Depends(get_db)):
     """
     Update an order status (shop owners only).
     """
@@ -316,31 +352,7 @@ async def update_order_status(order_id: int, order_update: OrderUpdate, current_
     db.refresh(order)
     
     # Get order items with product details
-    items_query = db.query(OrderItem, Product.name.label("product_name")) \
-        .join(Product, OrderItem.product_id == Product.id) \
-        .filter(OrderItem.order_id == order.id)
-    
-    items = []
-    for item, product_name in items_query:
-        items.append(OrderItemResponse(
-            id=item.id,
-            order_id=item.order_id,
-            product_id=item.product_id,
-            quantity=item.quantity,
-            price=item.price,
-            product_name=product_name
-        ))
+    items_by_order = _load_order_items(db, [order.id])
     
     # Create order response with items
-    return OrderResponse(
-        id=order.id,
-        customer_id=order.customer_id,
-        shop_id=order.shop_id,
-        total_amount=order.total_amount,
-        status=order.status,
-        delivery_address=order.delivery_address,
-        notes=order.notes,
-        created_at=order.created_at,
-        updated_at=order.updated_at,
-        items=items
-    )
\ No newline at end of file
+    return _build_order_response(order, items_by_order.get(order.id, []))
\ No newline at end of file
@@ -1,19 +1,31 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status, Query
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from app.database import get_db
-from app.schemas import ProductCreate, ProductResponse, ProductUpdate
+from typing import Any, Dict, Iterator, List, Optional
+from decimal import Decimal
+from app.database import get_db, get_read_db
+from app.schemas import ProductCreate, ProductResponse, ProductUpdate, ProductFacets, ProductBulkReport
 from app.models import User, Shop
 from app.services import (
     get_products, 
+    get_product_rows,
     get_product, 
+    get_product_row,
     get_product_by_shop_owner, 
     create_product, 
     update_product, 
     delete_product,
-    get_shop_by_owner
+    get_shop_by_owner,
+    search_products,
+    get_product_facets,
+    bulk_upsert_products,
+    product_cursor_key,
+    PRODUCT_SORTS
 )
 from app.utils.auth_middleware import get_shop_owner, get_current_user
+from app.utils.bulk_rows import BULK_ROWS_OPENAPI, read_bulk_rows
+from app.utils.conditional import etag_matches, not_modified_response, row_values, rows_etag
+from app.utils.pagination import decode_cursor, set_next_cursor
+from app.utils.serialization import json_response
 
 router = APIRouter(
     prefix="/products",
@@ -22,21 +34,96 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=List[ProductResponse])
-async def read_products(
+def read_products(
+    response: Response,
     shop_id: Optional[int] = None,
     category_id: Optional[int] = None,
+    min_price: Optional[Decimal] = Query(None, ge=0),
+    max_price: Optional[Decimal] = Query(None, ge=0),
+    in_stock: Optional[bool] = None,
+    is_available: Optional[bool] = None,
+    sort: Optional[str] = Query(None, pattern="^(price|price_desc|newest|name)$"),
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db)
 ):
     """
-    Get all products with optional shop and category filtering.
+    Get all products with optional filtering and sorting.
+    
+    Pass the `X-Next-Cursor` header of a page as `cursor` (with the same `sort`) to read the next one.
+    Responses carry an ETag; send it back in `If-None-Match` to get a 304 when the page is unchanged.
     """
-    products = get_products(db, shop_id=shop_id, category_id=category_id, skip=skip, limit=limit)
-    return products
+    after = None
+    if cursor:
+        converters = [PRODUCT_SORTS[sort][2], int] if sort else [int]
+        after = decode_cursor(cursor, converters)
+    
+    page = dict(
+        shop_id=shop_id,
+        category_id=category_id,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        is_available=is_available,
+        sort=sort,
+        skip=skip,
+        limit=limit,
+        after=after
+    )
+    
+    # Revalidate from the page's plain column values, without building ORM objects or a body
+    if if_none_match:
+        etag = rows_etag(get_product_rows(db, **page))
+        if etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+    
+    products = get_products(db, **page)
+    set_next_cursor(response, products, limit, lambda product: product_cursor_key(product, sort))
+    response.headers["ETag"] = rows_etag(row_values(product) for product in products)
+    return json_response(List[ProductResponse], products, response)
+
+@router.get("/facets", response_model=ProductFacets)
+def read_product_facets(
+    shop_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    min_price: Optional[Decimal] = Query(None, ge=0),
+    max_price: Optional[Decimal] = Query(None, ge=0),
+    in_stock: Optional[bool] = None,
+    is_available: Optional[bool] = None,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Get per-category and per-price-bucket counts for the products matching the filters.
+    """
+    return get_product_facets(
+        db,
+        shop_id=shop_id,
+        category_id=category_id,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        is_available=is_available
+    )
+
+@router.get("/search", response_model=List[ProductResponse])
+def search_product_catalog(
+    q: str = Query(..., min_length=1, max_length=200),
+    shop_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_read_db)
+):
+    """
+    Full-text search over product names and descriptions, best matches first.
+    """
+    products = search_products(db, q, shop_id=shop_id, category_id=category_id, skip=skip, limit=limit)
+    return json_response(List[ProductResponse], products)
 
 @router.post("/", response_model=ProductResponse, status_code=status.HTTP_201_CREATED)
-async def create_new_product(
+def create_new_product(
     product: ProductCreate, 
     db: Session = Depends(get_db),
     current_user: User = Depends(get_shop_owner)
@@ -54,18 +141,52 @@ async def create_new_product(
     
     return create_product(db, product)
 
+@router.post("/bulk", response_model=ProductBulkReport, openapi_extra=BULK_ROWS_OPENAPI)
+def bulk_import_products(
+    # Dependencies resolve in order: authenticate before reading and parsing the upload
+    current_user: User = Depends(get_shop_owner),
+    rows: Iterator[Dict[str, Any]] = Depends(read_bulk_rows),
+    db: Session = Depends(get_db)
+):
+    """
+    Create or update many products at once from a JSON array or a CSV file (shop owners only).
+    
+    Rows with an `id` update that product with the given fields; other rows create a product
+    and need `shop_id`, `name`, `price` and `category_id`. The report lists the outcome of
+    every row; invalid rows are skipped and the rest is saved in one transaction.
+    """
+    return bulk_upsert_products(db, current_user.id, rows)
+
 @router.get("/{product_id}", response_model=ProductResponse)
-async def read_product(product_id: int, db: Session = Depends(get_db)):
+def read_product(
+    product_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db)
+):
     """
     Get details for a specific product.
+    
+    Responses carry an ETag; send it back in `If-None-Match` to get a 304 when nothing changed.
     """
+    # Revalidate from the product's plain column values, without building an ORM object or a body
+    if if_none_match:
+        row = get_product_row(db, product_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Product not found")
+        etag = rows_etag([row])
+        if etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+    
     db_product = get_product(db, product_id)
     if db_product is None:
         raise HTTPException(status_code=404, detail="Product not found")
+    
+    response.headers["ETag"] = rows_etag([row_values(db_product)])
     return db_product
 
 @router.put("/{product_id}", response_model=ProductResponse)
-async def update_product_details(
+def update_product_details(
     product_id: int, 
     product_update: ProductUpdate, 
     db: Session = Depends(get_db),
@@ -87,7 +208,7 @@ async def update_product_details(
     return updated_product
 
 @router.delete("/{product_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_product_endpoint(
+def delete_product_endpoint(
     product_id: int, 
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
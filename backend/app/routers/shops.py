@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Response, status, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from app.database import get_db
+from app.database import get_db, get_read_db
 from app.schemas import ShopCreate, ShopResponse, ShopUpdate
 from app.models import User
-from app.services import get_shops, get_shop, get_shop_by_owner, create_shop, update_shop, delete_shop
+from app.services import get_shops, get_shop_rows, get_shop, get_shop_row, get_shop_by_owner, create_shop, update_shop, delete_shop
 from app.utils.auth_middleware import get_shop_owner, get_current_user
+from app.utils.conditional import etag_matches, not_modified_response, row_values, rows_etag
+from app.utils.pagination import decode_cursor, set_next_cursor
+from app.utils.serialization import json_response
 
 router = APIRouter(
     prefix="/shops",
@@ -14,20 +17,37 @@ router = APIRouter(
 )
 
 @router.get("/", response_model=List[ShopResponse])
-async def read_shops(
+def read_shops(
+    response: Response,
     category_id: Optional[int] = None,
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db)
 ):
     """
     Get all shops with optional category filtering.
+    
+    Pass the `X-Next-Cursor` header of a page as `cursor` to read the next one.
+    Responses carry an ETag; send it back in `If-None-Match` to get a 304 when the page is unchanged.
     """
-    shops = get_shops(db, category_id=category_id, skip=skip, limit=limit)
-    return shops
+    after_id = decode_cursor(cursor, [int])[0] if cursor else None
+    page = dict(category_id=category_id, skip=skip, limit=limit, after_id=after_id)
+    
+    # Revalidate from the page's plain column values, without building ORM objects or a body
+    if if_none_match:
+        etag = rows_etag(get_shop_rows(db, **page))
+        if etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+    
+    shops = get_shops(db, **page)
+    set_next_cursor(response, shops, limit, lambda shop: (shop.id,))
+    response.headers["ETag"] = rows_etag(row_values(shop) for shop in shops)
+    return json_response(List[ShopResponse], shops, response)
 
 @router.post("/", response_model=ShopResponse, status_code=status.HTTP_201_CREATED)
-async def create_new_shop(
+def create_new_shop(
     shop: ShopCreate, 
     db: Session = Depends(get_db),
     current_user: User = Depends(get_shop_owner)
@@ -38,17 +58,35 @@ async def create_new_shop(
     return create_shop(db, shop, current_user.id)
 
 @router.get("/{shop_id}", response_model=ShopResponse)
-async def read_shop(shop_id: int, db: Session = Depends(get_db)):
+def read_shop(
+    shop_id: int,
+    response: Response,
+    if_none_match: Optional[str] = Header(None),
+    db: Session = Depends(get_read_db)
+):
     """
     Get details for a specific shop.
+    
+    Responses carry an ETag; send it back in `If-None-Match` to get a 304 when nothing changed.
     """
+    # Revalidate from the shop's plain column values, without building an ORM object or a body
+    if if_none_match:
+        row = get_shop_row(db, shop_id)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Shop not found")
+        etag = rows_etag([row])
+        if etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+    
     db_shop = get_shop(db, shop_id)
     if db_shop is None:
         raise HTTPException(status_code=404, detail="Shop not found")
+    
+    response.headers["ETag"] = rows_etag([row_values(db_shop)])
     return db_shop
 
 @router.put("/{shop_id}", response_model=ShopResponse)
-async def update_shop_details(
+def update_shop_details(
     shop_id: int, 
     shop_update: ShopUpdate, 
     db: Session = Depends(get_db),
@@ -70,7 +108,7 @@ async def update_shop_details(
     return updated_shop
 
 @router.delete("/{shop_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_shop_endpoint(
+def delete_shop_endpoint(
     shop_id: int, 
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user)
@@ -1,9 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.database import get_db
 from app.schemas import UserUpdate, UserResponse
 from app.models import User
-from app.utils.auth_middleware import get_current_active_user
+from app.utils.auth_middleware import get_current_active_user, invalidate_cached_user
 from app.services import auth_service
 
 router = APIRouter(
@@ -13,7 +14,7 @@ router = APIRouter(
 )
 
 @router.put("/me", response_model=UserResponse)
-async def update_user_profile(
+def update_user_profile(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
@@ -21,6 +22,9 @@ async def update_user_profile(
     """
     Update the current user's profile information.
     """
+    # The user was read through a read session: attach it to this one to change it
+    current_user = db.merge(current_user, load=False)
+    
     # Check if email is being updated and if it's already taken
     if user_update.email and user_update.email != current_user.email:
         db_user = db.query(User).filter(User.email == user_update.email).first()
@@ -35,6 +39,7 @@ async def update_user_profile(
         setattr(current_user, key, value)
     
     db.commit()
+    invalidate_cached_user(current_user.id)
     db.refresh(current_user)
     return current_user
 
@@ -46,6 +51,8 @@ async def change_password(
 ):
     """
     Change the current user's password.
+    
+    Async so both hashes await the password hashing pool without holding a worker thread.
     """
     current_password = password_data.get("current_password")
     new_password = password_data.get("new_password")
@@ -57,27 +64,31 @@ async def change_password(
         )
     
     # Verify current password
-    if not auth_service.verify_password(current_password, current_user.password_hash):
+    if not await auth_service.verify_password_async(current_password, current_user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect"
         )
     
-    # Update password
-    current_user.password_hash = auth_service.get_password_hash(new_password)
-    db.commit()
+    # Update password, on the user attached to this session
+    current_user = db.merge(current_user, load=False)
+    current_user.password_hash = await auth_service.get_password_hash_async(new_password)
+    await run_in_threadpool(db.commit)
+    invalidate_cached_user(current_user.id)
     
     return {"message": "Password updated successfully"}
 
 @router.delete("/me")
-async def delete_account(
+def delete_account(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
     """
     Delete the current user's account.
     """
-    db.delete(current_user)
+    user_id = current_user.id
+    db.delete(db.merge(current_user, load=False))
     db.commit()
+    invalidate_cached_user(user_id)
     
     return {"message": "Account deleted successfully"}
\ No newline at end of file
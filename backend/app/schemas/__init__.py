@@ -1,9 +1,9 @@
 from app.schemas.user import UserBase, UserCreate, UserUpdate, UserResponse, UserInDB
 from app.schemas.token import Token, TokenData
 from app.schemas.shop import ShopBase, ShopCreate, ShopUpdate, ShopResponse
-from app.schemas.product import ProductBase, ProductCreate, ProductUpdate, ProductResponse
+from app.schemas.product import ProductBase, ProductCreate, ProductUpdate, ProductResponse, CategoryFacet, PriceBucketFacet, ProductFacets, ProductBulkResult, ProductBulkReport
 from app.schemas.category import CategoryBase, CategoryCreate, CategoryUpdate, CategoryResponse
-from app.schemas.cart import CartItemBase, CartItemCreate, CartItemUpdate, CartItemResponse, CartSummary
+from app.schemas.cart import CartItemBase, CartItemCreate, CartItemUpdate, CartOperation, CartBatchUpdate, CartItemResponse, CartSummary
 from app.schemas.order import OrderBase, OrderCreate, OrderUpdate, OrderResponse, OrderItemBase, OrderItemCreate, OrderItemResponse
 
 # Import all schemas here to make them available when importing from app.schemas
\ No newline at end of file
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List
 from datetime import datetime
 from decimal import Decimal
@@ -13,6 +13,14 @@ class CartItemCreate(CartItemBase):
 class CartItemUpdate(BaseModel):
     quantity: int = Field(..., gt=0)
 
+class CartOperation(BaseModel):
+    op: str = Field(..., pattern="^(add|set|remove)$")
+    product_id: int
+    quantity: Optional[int] = Field(None, gt=0)
+
+class CartBatchUpdate(BaseModel):
+    operations: List[CartOperation] = Field(..., min_length=1, max_length=100)
+
 class CartItemResponse(CartItemBase):
     id: int
     user_id: int
@@ -20,8 +28,7 @@ class CartItemResponse(CartItemBase):
     product_price: Decimal
     total_price: Decimal
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class CartSummary(BaseModel):
     items: List[CartItemResponse]
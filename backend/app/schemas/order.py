@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List
 from datetime import datetime
 from decimal import Decimal
@@ -16,8 +16,7 @@ class OrderItemResponse(OrderItemBase):
     order_id: int
     product_name: Optional[str] = None
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class OrderBase(BaseModel):
     shop_id: int
@@ -39,5 +38,4 @@ class OrderResponse(OrderBase):
     updated_at: datetime
     items: List[OrderItemResponse] = []
     
-    class Config:
-        orm_mode = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import Optional
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, List
 from datetime import datetime
 from decimal import Decimal
 
@@ -29,5 +29,30 @@ class ProductResponse(ProductBase):
     shop_id: int
     created_at: datetime
     
-    class Config:
-        orm_mode = True
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+class CategoryFacet(BaseModel):
+    category_id: int
+    count: int
+
+class PriceBucketFacet(BaseModel):
+    min_price: Decimal
+    max_price: Optional[Decimal] = None
+    count: int
+
+class ProductFacets(BaseModel):
+    total: int
+    categories: List[CategoryFacet]
+    price_buckets: List[PriceBucketFacet]
+
+class ProductBulkResult(BaseModel):
+    row: int
+    status: str
+    id: Optional[int] = None
+    errors: Optional[List[str]] = None
+
+class ProductBulkReport(BaseModel):
+    created: int
+    updated: int
+    failed: int
+    results: List[ProductBulkResult]
@@ -1,17 +1,24 @@
 from app.services.auth_service import (
     verify_password,
     get_password_hash,
+    verify_password_async,
+    get_password_hash_async,
+    get_password_hash_stats,
     create_access_token,
     get_user_by_email,
     get_user_by_username,
     create_user,
-    authenticate_user
+    create_user_async,
+    authenticate_user,
+    authenticate_user_async
 )
 
 # Import shop service functions
 from app.services.shop_service import (
     get_shops,
+    get_shop_rows,
     get_shop,
+    get_shop_row,
     get_shop_by_owner,
     create_shop,
     update_shop,
@@ -21,11 +28,23 @@ from app.services.shop_service import (
 # Import product service functions
 from app.services.product_service import (
     get_products,
+    get_product_rows,
     get_product,
+    get_product_row,
     get_product_by_shop_owner,
     create_product,
     update_product,
-    delete_product
+    delete_product,
+    reserve_product_stock,
+    bulk_upsert_products,
+    get_product_facets,
+    product_cursor_key,
+    PRODUCT_SORTS
+)
+
+# Import search service functions
+from app.services.search_service import (
+    search_products
 )
 
 # Import category service functions
@@ -35,7 +54,38 @@ from app.services.category_service import (
     get_category_by_name,
     create_category,
     update_category,
-    delete_category
+    delete_category,
+    get_category_snapshot,
+    bump_categories_version,
+    invalidate_category_cache
+)
+
+# Import cart service functions
+from app.services.cart_service import (
+    cart_line,
+    cart_version,
+    bump_cart_version,
+    bump_product_cart_versions,
+    get_cart_summary,
+    cache_cart_line,
+    uncache_cart_lines,
+    clear_cart_cache
+)
+
+# Import stock reservation functions
+from app.services.reservation_service import (
+    get_available_stock,
+    lock_products,
+    hold_stock,
+    hold_stocks,
+    release_stock_holds,
+    release_expired_reservations
+)
+
+# Import order export functions
+from app.services.order_export_service import (
+    export_orders,
+    EXPORT_FORMATS
 )
 
 # Export all services to be used in the application
\ No newline at end of file
@@ -1,8 +1,13 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
 from app.config import settings
 from app.models import User
 from app.schemas import TokenData
@@ -10,13 +15,64 @@ from app.schemas import TokenData
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt is deliberately slow, so hashing runs on its own bounded pool and a burst of
+# logins queues here instead of taking every CPU core. The async variants await the
+# pool, so the requests waiting on it don't hold request worker threads either; the
+# sync ones block their calling thread (scripts, tests).
+_hash_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+_hash_lock = threading.Lock()
+_hash_pending = 0
+
+@contextmanager
+def _counted_hashing():
+    global _hash_pending
+    with _hash_lock:
+        _hash_pending += 1
+    try:
+        yield
+    finally:
+        with _hash_lock:
+            _hash_pending -= 1
+
+def _run_password_hashing(func, *args):
+    """Run a password hashing call on the hashing pool and wait for its result."""
+    with _counted_hashing():
+        return _hash_executor.submit(func, *args).result()
+
+async def _await_password_hashing(func, *args):
+    """Run a password hashing call on the hashing pool and await its result."""
+    with _counted_hashing():
+        return await asyncio.wrap_future(_hash_executor.submit(func, *args))
+
+def get_password_hash_stats():
+    """Get the current load of the password hashing pool."""
+    with _hash_lock:
+        pending = _hash_pending
+    workers = settings.PASSWORD_HASH_WORKERS
+    return {
+        "workers": workers,
+        "in_flight": min(pending, workers),
+        "queued": max(pending - workers, 0)
+    }
+
 def verify_password(plain_password, hashed_password):
     """Verify a password against a hash."""
-    return pwd_context.verify(plain_password, hashed_password)
+    return _run_password_hashing(pwd_context.verify, plain_password, hashed_password)
 
 def get_password_hash(password):
     """Generate a password hash."""
-    return pwd_context.hash(password)
+    return _run_password_hashing(pwd_context.hash, password)
+
+async def verify_password_async(plain_password, hashed_password):
+    """Verify a password against a hash, without holding a worker thread while waiting."""
+    return await _await_password_hashing(pwd_context.verify, plain_password, hashed_password)
+
+async def get_password_hash_async(password):
+    """Generate a password hash, without holding a worker thread while waiting."""
+    return await _await_password_hashing(pwd_context.hash, password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     """Create a JWT access token."""
@@ -37,20 +93,16 @@ def get_user_by_username(db: Session, username: str):
     """Get a user by username."""
     return db.query(User).filter(User.username == username).first()
 
-def create_user(db: Session, user_data):
-    """Create a new user."""
-    # Check if user with email or username already exists
-    existing_email = get_user_by_email(db, user_data.email)
-    if existing_email:
-        return None, "Email already registered"
-    
-    existing_username = get_user_by_username(db, user_data.username)
-    if existing_username:
-        return None, "Username already taken"
-    
-    # Create new user
-    hashed_password = get_password_hash(user_data.password)
-    
+def find_registration_conflict(db: Session, user_data) -> Optional[str]:
+    """Why a new user can't be created with this email and username, if they are taken."""
+    if get_user_by_email(db, user_data.email):
+        return "Email already registered"
+    if get_user_by_username(db, user_data.username):
+        return "Username already taken"
+    return None
+
+def add_user(db: Session, user_data, hashed_password: str) -> User:
+    """Insert a new user with an already hashed password."""
     db_user = User(
         email=user_data.email,
         username=user_data.username,
@@ -65,19 +117,46 @@ def create_user(db: Session, user_data):
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
-    return db_user, None
+    return db_user
+
+def create_user(db: Session, user_data):
+    """Create a new user."""
+    # Check if user with email or username already exists
+    error_message = find_registration_conflict(db, user_data)
+    if error_message:
+        return None, error_message
+    
+    return add_user(db, user_data, get_password_hash(user_data.password)), None
+
+async def create_user_async(db: Session, user_data):
+    """Create a new user; database work runs in the threadpool and hashing on the hashing pool."""
+    error_message = await run_in_threadpool(find_registration_conflict, db, user_data)
+    if error_message:
+        return None, error_message
+    
+    hashed_password = await get_password_hash_async(user_data.password)
+    return await run_in_threadpool(add_user, db, user_data, hashed_password), None
+
+def find_login_user(db: Session, username: str):
+    """Find a user by username, or else by email."""
+    return get_user_by_username(db, username) or get_user_by_email(db, username)
 
 def authenticate_user(db: Session, username: str, password: str):
     """Authenticate a user by username and password."""
-    # Try to find user by username
-    user = get_user_by_username(db, username)
-    
-    # If not found by username, try email
-    if not user:
-        user = get_user_by_email(db, username)
+    user = find_login_user(db, username)
     
     # If user not found or password doesn't match
     if not user or not verify_password(password, user.password_hash):
         return False
     
-    return user
\ No newline at end of file
+    return user
+
+async def authenticate_user_async(db: Session, username: str, password: str):
+    """Authenticate a user by username and password, awaiting the hash check."""
+    user = await run_in_threadpool(find_login_user, db, username)
+    
+    # If user not found or password doesn't match
+    if not user or not await verify_password_async(password, user.password_hash):
+        return False
+    
+    return user
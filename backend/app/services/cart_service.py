@@ -0,0 +1,163 @@
+import threading
+from dataclasses import dataclass, field
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Cart, Product, User
+from app.schemas import CartItemResponse, CartSummary
+from app.utils.cache import TTLCache
+
+# Product fields shown in (or deciding) a cart summary; changing one invalidates the carts holding the product
+CART_PRODUCT_FIELDS = ("name", "price", "is_available")
+
+@dataclass
+class CachedCart:
+    """
+    A user's cart lines keyed by product id, with the running total kept alongside, and
+    the cart version they are current for.
+    """
+    version: int
+    lines: Dict[int, CartItemResponse] = field(default_factory=dict)
+    total_amount: Decimal = Decimal("0.00")
+
+# Cart summaries of recently active users, keyed by user id. Mutations update them in
+# place instead of dropping them. The cache is per process, so each read compares the
+# summary's version with the user's cart_version and reloads it when another worker
+# changed the cart.
+cart_cache = TTLCache(maxsize=settings.CART_CACHE_SIZE, ttl=settings.CART_CACHE_TTL_SECONDS)
+_cart_cache_lock = threading.Lock()
+
+class _Lease:
+    """
+    Placeholder stored while a summary is loaded; a mutation meanwhile removes it so the stale load is not cached.
+    """
+
+def cart_line(cart_item: Cart, product: Product) -> CartItemResponse:
+    """
+    Format a cart row and its product as a cart line.
+    """
+    return CartItemResponse(
+        id=cart_item.id,
+        user_id=cart_item.user_id,
+        product_id=product.id,
+        quantity=cart_item.quantity,
+        product_name=product.name,
+        product_price=product.price,
+        total_price=product.price * cart_item.quantity
+    )
+
+def _summary(cart: CachedCart) -> CartSummary:
+    items = sorted(cart.lines.values(), key=lambda line: line.id)
+    return CartSummary(items=items, total_items=len(items), total_amount=cart.total_amount)
+
+def cart_version(db: Session, user_id: int) -> Optional[int]:
+    """
+    Version of a user's cart: one primary key lookup.
+    """
+    return db.query(User.cart_version).filter(User.id == user_id).scalar()
+
+def bump_cart_version(db: Session, user_id: int) -> int:
+    """
+    Bump the version of a user's cart and return the new one. Call in the transaction
+    changing the cart, so the change and the new version commit together; the user row
+    stays locked until then, so concurrent changes to the cart get consecutive versions.
+    """
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(cart_version=User.cart_version + 1, updated_at=User.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+    return cart_version(db, user_id)
+
+def bump_product_cart_versions(db: Session, product_ids: Iterable[int]) -> None:
+    """
+    Bump the cart version of every user with one of the products in their cart, in the
+    transaction changing their CART_PRODUCT_FIELDS or deleting them.
+    """
+    product_ids = list(product_ids)
+    if not product_ids:
+        return
+    db.execute(
+        update(User)
+        .where(User.id.in_(select(Cart.user_id).where(Cart.product_id.in_(product_ids))))
+        .values(cart_version=User.cart_version + 1, updated_at=User.updated_at)
+        .execution_options(synchronize_session=False)
+    )
+
+def get_cart_summary(db: Session, user_id: int, version: Optional[int] = None) -> CartSummary:
+    """
+    Get a user's cart summary from the cache, loading it with one joined query on a miss.
+    
+    A cached summary is returned only while it is at the cart's version, read from the database
+    unless the caller just committed it. On a miss the version is read before the lines, so a
+    change committed in between leaves the summary older than its lines and it is reloaded.
+    """
+    if version is None:
+        version = cart_version(db, user_id)
+    
+    with _cart_cache_lock:
+        cached = cart_cache.get(user_id)
+        if isinstance(cached, CachedCart) and cached.version == version:
+            return _summary(cached)
+        lease = _Lease()
+        cart_cache.set(user_id, lease)
+    
+    cart = CachedCart(version=version)
+    for cart_item, product in db.query(Cart, Product).join(Product).filter(Cart.user_id == user_id):
+        line = cart_line(cart_item, product)
+        cart.lines[product.id] = line
+        cart.total_amount += line.total_price
+
+    with _cart_cache_lock:
+        if cart_cache.get(user_id) is lease:
+            cart_cache.set(user_id, cart)
+    return _summary(cart)
+
+def _update_cached_cart(user_id: int, update, version: int) -> None:
+    # Only a summary of the version just before this change, or of this one (a change made of
+    # several updates, or a load that already saw it: setting lines again is harmless), can be
+    # brought up to date; one that missed another change (or a load in progress) is dropped
+    with _cart_cache_lock:
+        cached = cart_cache.get(user_id)
+        if isinstance(cached, CachedCart) and cached.version in (version - 1, version):
+            update(cached)
+            cached.version = version
+            cart_cache.set(user_id, cached)
+        elif cached is not None:
+            cart_cache.delete(user_id)
+
+def cache_cart_line(user_id: int, line: CartItemResponse, version: int) -> None:
+    """
+    Add or replace a line in a user's cached cart, adjusting its total. Call after the commit,
+    with the version bump_cart_version returned before it.
+    """
+    def update(cart: CachedCart):
+        previous = cart.lines.get(line.product_id)
+        if previous is not None:
+            cart.total_amount -= previous.total_price
+        cart.lines[line.product_id] = line
+        cart.total_amount += line.total_price
+
+    _update_cached_cart(user_id, update, version)
+
+def uncache_cart_lines(user_id: int, version: int, product_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Remove lines (all of them by default) from a user's cached cart, adjusting its total. Call
+    after the commit, with the version bump_cart_version returned before it.
+    """
+    def update(cart: CachedCart):
+        for product_id in (list(cart.lines) if product_ids is None else product_ids):
+            line = cart.lines.pop(product_id, None)
+            if line is not None:
+                cart.total_amount -= line.total_price
+
+    _update_cached_cart(user_id, update, version)
+
+def clear_cart_cache() -> None:
+    """
+    Drop every cached cart summary.
+    """
+    cart_cache.clear()
@@ -1,19 +1,105 @@
+import threading
+import time
+from sqlalchemy import update
+from sqlalchemy.engine import Connection
 from sqlalchemy.orm import Session
-from typing import List, Optional, Tuple
-from app.models import Category
-from app.schemas import CategoryCreate, CategoryUpdate
+from typing import Dict, List, NamedTuple, Optional, Tuple, Union
+from app.config import settings
+from app.models import CacheVersion, Category
+from app.schemas import CategoryCreate, CategoryUpdate, CategoryResponse
+from app.utils.conditional import make_etag
 
-def get_categories(db: Session, skip: int = 0, limit: int = 100) -> List[Category]:
+class CategorySnapshot(NamedTuple):
     """
-    Get all categories.
+    An immutable, versioned copy of all categories served to readers.
     """
-    return db.query(Category).offset(skip).limit(limit).all()
+    version: int
+    source_version: Optional[int]
+    etag: str
+    categories: Tuple[CategoryResponse, ...]
+    by_id: Dict[int, CategoryResponse]
+    etags: Dict[int, str]
+    expires_at: float
 
-def get_category(db: Session, category_id: int) -> Optional[Category]:
+# Categories almost never change, so reads are served from an in-memory snapshot. Writes
+# bump the categories row of cache_versions, which every read compares with the snapshot's
+# (one primary key lookup), so a write made through any worker is seen at once. The TTL
+# only bounds staleness after writes made outside the app.
+_snapshot: Optional[CategorySnapshot] = None
+_snapshot_version = 0
+_snapshot_lock = threading.Lock()
+
+def invalidate_category_cache() -> None:
+    """
+    Discard the category snapshot so the next read rebuilds it.
+    """
+    global _snapshot
+    with _snapshot_lock:
+        _snapshot = None
+
+def bump_categories_version(db: Union[Session, Connection]) -> None:
+    """
+    Bump the categories version. Call in the transaction writing categories, so every
+    worker rebuilds its snapshot once the write commits.
+    """
+    db.execute(
+        update(CacheVersion)
+        .where(CacheVersion.name == "categories")
+        .values(version=CacheVersion.version + 1)
+    )
+
+def get_category_snapshot(db: Session) -> CategorySnapshot:
+    """
+    Get the current category snapshot, rebuilding it from the database if its version
+    is not the database's.
+    """
+    global _snapshot, _snapshot_version
+    # Read before the categories, so a write committed in between leaves the snapshot
+    # behind its version and it is rebuilt on the next read
+    source_version = db.query(CacheVersion.version).filter(CacheVersion.name == "categories").scalar()
+    with _snapshot_lock:
+        if (
+            _snapshot is not None
+            and _snapshot.source_version == source_version
+            and _snapshot.expires_at > time.monotonic()
+        ):
+            return _snapshot
+        
+        categories = tuple(
+            CategoryResponse.model_validate(category, from_attributes=True)
+            for category in db.query(Category).order_by(Category.id)
+        )
+        data = [category.model_dump(mode="json") for category in categories]
+        _snapshot_version += 1
+        _snapshot = CategorySnapshot(
+            version=_snapshot_version,
+            source_version=source_version,
+            etag=make_etag(data),
+            categories=categories,
+            by_id={category.id: category for category in categories},
+            etags={item["id"]: make_etag(item) for item in data},
+            expires_at=time.monotonic() + settings.CATEGORY_CACHE_TTL_SECONDS
+        )
+        return _snapshot
+
+def get_categories(db: Session, skip: int = 0, limit: int = 100, after_id: Optional[int] = None) -> List[CategoryResponse]:
+    """
+    Get all categories from the snapshot.
+    
+    Categories are ordered by id; pass `after_id` to page with a keyset cursor.
+    """
+    categories = get_category_snapshot(db).categories
+    
+    if after_id is not None:
+        categories = [category for category in categories if category.id > after_id]
+    
+    return list(categories[skip:skip + limit])
+
+def get_category(db: Session, category_id: int) -> Optional[CategoryResponse]:
     """
-    Get a category by ID.
+    Get a category by ID from the snapshot.
     """
-    return db.query(Category).filter(Category.id == category_id).first()
+    return get_category_snapshot(db).by_id.get(category_id)
 
 def get_category_by_name(db: Session, name: str) -> Optional[Category]:
     """
@@ -36,7 +122,9 @@ def create_category(db: Session, category: CategoryCreate) -> Tuple[Optional[Cat
     )
     
     db.add(db_category)
+    bump_categories_version(db)
     db.commit()
+    invalidate_category_cache()
     db.refresh(db_category)
     return db_category, None
 
@@ -59,7 +147,9 @@ def update_category(db: Session, category_id: int, category_update: CategoryUpda
     for key, value in update_data.items():
         setattr(db_category, key, value)
     
+    bump_categories_version(db)
     db.commit()
+    invalidate_category_cache()
     db.refresh(db_category)
     return db_category
 
@@ -72,5 +162,7 @@ def delete_category(db: Session, category_id: int) -> bool:
         return False
     
     db.delete(db_category)
+    bump_categories_version(db)
     db.commit()
+    invalidate_category_cache()
     return True
\ No newline at end of file
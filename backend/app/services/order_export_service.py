@@ -0,0 +1,147 @@
+import csv
+import io
+from typing import Iterator, Optional
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.models import Order, OrderItem, Product, Shop
+
+# Orders fetched per keyset batch, and bytes per streamed chunk
+EXPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+CSV_HEADER = [
+    "order_id", "created_at", "updated_at", "status", "customer_id", "shop_id", "total_amount",
+    "delivery_address", "notes", "item_id", "product_id", "product_name", "quantity", "price",
+]
+
+# Media type and file extension per export format
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+}
+
+def _export_rows(db: Session, owner_id: int, shop_id: Optional[int], status: Optional[str]) -> Iterator[tuple]:
+    """
+    Yield one row per order item (or per order without items), ordered by order, in keyset batches.
+
+    Each batch selects the next EXPORT_BATCH_SIZE order ids after the last one exported
+    (WHERE orders.id > :last_id ORDER BY orders.id LIMIT :batch), then their rows, so at most
+    one batch is in memory whatever the driver buffers. Plain columns are selected so no ORM
+    objects are built or kept in the session.
+    """
+    order_ids = select(Order.id) \
+        .where(Order.shop_id.in_(select(Shop.id).where(Shop.owner_id == owner_id))) \
+        .order_by(Order.id) \
+        .limit(EXPORT_BATCH_SIZE)
+
+    if shop_id:
+        order_ids = order_ids.where(Order.shop_id == shop_id)
+
+    if status:
+        order_ids = order_ids.where(Order.status == status)
+
+    rows = select(
+        Order.id, Order.created_at, Order.updated_at, Order.status, Order.customer_id, Order.shop_id,
+        Order.total_amount, Order.delivery_address, Order.notes,
+        OrderItem.id, OrderItem.product_id, Product.name, OrderItem.quantity, OrderItem.price
+    ) \
+        .select_from(Order) \
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id) \
+        .outerjoin(Product, Product.id == OrderItem.product_id) \
+        .order_by(Order.id, OrderItem.id)
+
+    last_id = 0
+    while True:
+        batch = db.execute(order_ids.where(Order.id > last_id)).scalars().all()
+        if not batch:
+            return
+        yield from db.execute(rows.where(Order.id.in_(batch))).all()
+        if len(batch) < EXPORT_BATCH_SIZE:
+            return
+        last_id = batch[-1]
+
+def _chunked(pieces: Iterator[bytes]) -> Iterator[bytes]:
+    """
+    Join small pieces into chunks of about EXPORT_CHUNK_SIZE bytes.
+    """
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= EXPORT_CHUNK_SIZE:
+            yield b"".join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b"".join(buffer)
+
+def _ndjson_lines(rows) -> Iterator[bytes]:
+    order = None
+    for row in rows:
+        (order_id, created_at, updated_at, status, customer_id, shop_id, total_amount,
+         delivery_address, notes, item_id, product_id, product_name, quantity, price) = row
+
+        if order is None or order["id"] != order_id:
+            if order is not None:
+                yield orjson.dumps(order) + b"\n"
+            order = {
+                "id": order_id,
+                "customer_id": customer_id,
+                "shop_id": shop_id,
+                "total_amount": str(total_amount),
+                "status": status,
+                "delivery_address": delivery_address,
+                "notes": notes,
+                "created_at": created_at,
+                "updated_at": updated_at,
+                "items": [],
+            }
+
+        if item_id is not None:
+            order["items"].append({
+                "id": item_id,
+                "order_id": order_id,
+                "product_id": product_id,
+                "product_name": product_name,
+                "quantity": quantity,
+                "price": str(price),
+            })
+
+    if order is not None:
+        yield orjson.dumps(order) + b"\n"
+
+def _csv_lines(rows) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    for row in rows:
+        writer.writerow(
+            value.isoformat() if hasattr(value, "isoformat") else ("" if value is None else value)
+            for value in row
+        )
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Only the header is left when there were no orders
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+def export_orders(
+    db: Session,
+    owner_id: int,
+    export_format: str = "ndjson",
+    shop_id: Optional[int] = None,
+    status: Optional[str] = None
+) -> Iterator[bytes]:
+    """
+    Stream the orders (with their items) of a shop owner's shops as NDJSON or CSV.
+
+    NDJSON has one order per line, with its items; CSV has one line per order item.
+    Orders are read in keyset batches, so memory use is bounded by EXPORT_BATCH_SIZE
+    however many orders there are.
+    """
+    rows = _export_rows(db, owner_id, shop_id, status)
+    lines = _ndjson_lines(rows) if export_format == "ndjson" else _csv_lines(rows)
+    return _chunked(lines)
@@ -1,27 +1,194 @@
 from sqlalchemy.orm import Session
-from typing import List, Optional, Tuple
-from app.models import Product, Shop
+from sqlalchemy import insert, update, case, func, text
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from datetime import datetime
+from decimal import Decimal
+from pydantic import ValidationError
+from app.models import Category, Product, Shop
 from app.schemas import ProductCreate, ProductUpdate
+from app.services.cart_service import CART_PRODUCT_FIELDS, bump_product_cart_versions
+from app.services.reservation_service import held_quantity
+from app.utils.pagination import keyset_filter
+
+# Sort keys accepted by get_products: the column, whether it sorts descending and
+# how to read its value back from a cursor. Ties are always broken by id.
+PRODUCT_SORTS = {
+    "price": (Product.price, False, Decimal),
+    "price_desc": (Product.price, True, Decimal),
+    "newest": (Product.created_at, True, datetime.fromisoformat),
+    "name": (Product.name, False, str),
+}
+
+# Rows written per statement by bulk_upsert_products
+PRODUCT_BULK_BATCH_SIZE = 500
+
+# Lower bounds of the price buckets reported by get_product_facets
+PRICE_BUCKET_BOUNDS = [Decimal("0"), Decimal("10"), Decimal("25"), Decimal("50"), Decimal("100")]
+
+def _filter_products(
+    query,
+    shop_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    min_price: Optional[Decimal] = None,
+    max_price: Optional[Decimal] = None,
+    in_stock: Optional[bool] = None,
+    is_available: Optional[bool] = None
+):
+    """
+    Apply the catalog browsing filters to a products query.
+    """
+    if shop_id:
+        query = query.filter(Product.shop_id == shop_id)
+    
+    if category_id:
+        query = query.filter(Product.category_id == category_id)
+    
+    if is_available is not None:
+        query = query.filter(Product.is_available == is_available)
+    
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+    
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+    
+    if in_stock is not None:
+        query = query.filter(Product.stock_quantity > 0 if in_stock else Product.stock_quantity <= 0)
+    
+    return query
+
+def product_sort_columns(sort: Optional[str] = None) -> Tuple[list, bool]:
+    """
+    Get the keyset columns and direction used to order products for a sort key.
+    """
+    if sort is None:
+        return [Product.id], False
+    column, descending, _ = PRODUCT_SORTS[sort]
+    return [column, Product.id], descending
+
+def product_cursor_key(product: Product, sort: Optional[str] = None) -> tuple:
+    """
+    Get the keyset values of a product for a sort key, as passed back in `after`.
+    """
+    columns, _ = product_sort_columns(sort)
+    return tuple(getattr(product, column.key) for column in columns)
 
 def get_products(
     db: Session, 
     shop_id: Optional[int] = None, 
     category_id: Optional[int] = None, 
     skip: int = 0, 
-    limit: int = 100
+    limit: int = 100,
+    after: Optional[tuple] = None,
+    min_price: Optional[Decimal] = None,
+    max_price: Optional[Decimal] = None,
+    in_stock: Optional[bool] = None,
+    is_available: Optional[bool] = None,
+    sort: Optional[str] = None
 ) -> List[Product]:
     """
-    Get all products with optional shop and category filtering.
+    Get all products with optional filtering and sorting.
+    
+    Products are ordered by `sort` (see PRODUCT_SORTS) or by id; pass the
+    product_cursor_key of the last product of a page as `after` to page with a keyset cursor.
     """
-    query = db.query(Product)
+    query = _filter_products(
+        db.query(Product),
+        shop_id=shop_id,
+        category_id=category_id,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        is_available=is_available
+    )
+    return _page_products(query, sort, skip, limit, after).all()
+
+def get_product_rows(
+    db: Session, 
+    shop_id: Optional[int] = None, 
+    category_id: Optional[int] = None, 
+    skip: int = 0, 
+    limit: int = 100,
+    after: Optional[tuple] = None,
+    min_price: Optional[Decimal] = None,
+    max_price: Optional[Decimal] = None,
+    in_stock: Optional[bool] = None,
+    is_available: Optional[bool] = None,
+    sort: Optional[str] = None
+) -> List[tuple]:
+    """
+    Get the products get_products returns for the same arguments as plain column tuples, without building ORM objects.
+    """
+    query = _filter_products(
+        db.query(*Product.__table__.columns),
+        shop_id=shop_id,
+        category_id=category_id,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        is_available=is_available
+    )
+    return _page_products(query, sort, skip, limit, after).all()
+
+def _page_products(query, sort: Optional[str], skip: int, limit: int, after: Optional[tuple]):
+    columns, descending = product_sort_columns(sort)
+    if after is not None:
+        query = query.filter(keyset_filter(columns, after, descending=descending))
     
-    if shop_id:
-        query = query.filter(Product.shop_id == shop_id)
+    order_by = [column.desc() if descending else column for column in columns]
+    return query.order_by(*order_by).offset(skip).limit(limit)
+
+def get_product_facets(
+    db: Session,
+    shop_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    min_price: Optional[Decimal] = None,
+    max_price: Optional[Decimal] = None,
+    in_stock: Optional[bool] = None,
+    is_available: Optional[bool] = None
+) -> dict:
+    """
+    Count the matching products per category and per price bucket.
     
-    if category_id:
-        query = query.filter(Product.category_id == category_id)
+    Both facets come from a single GROUP BY (category, price bucket) query.
+    """
+    upper_bounds = PRICE_BUCKET_BOUNDS[1:]
+    price_bucket = case(
+        *[(Product.price < bound, index) for index, bound in enumerate(upper_bounds)],
+        else_=len(upper_bounds)
+    ).label("price_bucket")
+    
+    query = _filter_products(
+        db.query(Product.category_id, price_bucket, func.count(Product.id)),
+        shop_id=shop_id,
+        category_id=category_id,
+        min_price=min_price,
+        max_price=max_price,
+        in_stock=in_stock,
+        is_available=is_available
+    ).group_by(Product.category_id, text("price_bucket"))
     
-    return query.offset(skip).limit(limit).all()
+    category_counts = {}
+    bucket_counts = [0] * len(PRICE_BUCKET_BOUNDS)
+    for row_category_id, bucket, count in query:
+        category_counts[row_category_id] = category_counts.get(row_category_id, 0) + count
+        bucket_counts[bucket] += count
+    
+    return {
+        "total": sum(bucket_counts),
+        "categories": [
+            {"category_id": facet_category_id, "count": count}
+            for facet_category_id, count in sorted(category_counts.items())
+        ],
+        "price_buckets": [
+            {
+                "min_price": lower,
+                "max_price": upper_bounds[index] if index < len(upper_bounds) else None,
+                "count": bucket_counts[index]
+            }
+            for index, lower in enumerate(PRICE_BUCKET_BOUNDS)
+        ]
+    }
 
 def get_product(db: Session, product_id: int) -> Optional[Product]:
     """
@@ -29,6 +196,12 @@ def get_product(db: Session, product_id: int) -> Optional[Product]:
     """
     return db.query(Product).filter(Product.id == product_id).first()
 
+def get_product_row(db: Session, product_id: int) -> Optional[tuple]:
+    """
+    Get a product by ID as a plain column tuple, without building an ORM object.
+    """
+    return db.query(*Product.__table__.columns).filter(Product.id == product_id).first()
+
 def get_product_by_shop_owner(db: Session, product_id: int, owner_id: int) -> Optional[Product]:
     """
     Get a product by ID and verify it belongs to a shop owned by the specified owner.
@@ -68,9 +241,17 @@ def update_product(db: Session, product_id: int, product_update: ProductUpdate)
     
     # Update product attributes
     update_data = product_update.dict(exclude_unset=True)
+    cart_fields_changed = any(
+        key in CART_PRODUCT_FIELDS and getattr(db_product, key) != value
+        for key, value in update_data.items()
+    )
     for key, value in update_data.items():
         setattr(db_product, key, value)
     
+    # Cached cart summaries showing the old name, price or availability are stale now
+    if cart_fields_changed:
+        bump_product_cart_versions(db, [product_id])
+    
     db.commit()
     db.refresh(db_product)
     return db_product
@@ -83,6 +264,149 @@ def delete_product(db: Session, product_id: int) -> bool:
     if not db_product:
         return False
     
+    # The product's cart rows go with it, so bump their carts' versions first
+    bump_product_cart_versions(db, [product_id])
     db.delete(db_product)
     db.commit()
-    return True
\ No newline at end of file
+    return True
+
+def reserve_product_stock(db: Session, product_id: int, quantity: int, user_id: Optional[int] = None) -> bool:
+    """
+    Atomically take `quantity` units of stock from an available product.
+    
+    The decrement is a single guarded UPDATE, so concurrent checkouts can never
+    drive stock below zero, nor into units other carts hold. Holds of `user_id`
+    (the buyer) are not counted against them. The caller owns the transaction and must commit.
+    """
+    result = db.execute(
+        update(Product)
+        .where(
+            Product.id == product_id,
+            Product.is_available == True,
+            Product.stock_quantity - held_quantity(product_id, exclude_user_id=user_id) >= quantity
+        )
+        .values(stock_quantity=Product.stock_quantity - quantity)
+    )
+    return result.rowcount == 1
+
+# Fields an update may leave out but not set to null
+_REQUIRED_PRODUCT_FIELDS = ("name", "price", "category_id", "stock_quantity", "is_available")
+
+def _integer_field(row: Dict[str, Any], key: str) -> int:
+    try:
+        return int(row[key])
+    except (TypeError, ValueError):
+        raise ValueError(f"{key}: must be an integer")
+
+def _validation_messages(error: ValidationError) -> List[str]:
+    return [f"{'.'.join(str(part) for part in detail['loc'])}: {detail['msg']}" for detail in error.errors()]
+
+def _write_product_batch(db: Session, inserts: List[tuple], updates: List[tuple], owned_shop_ids: set) -> None:
+    """
+    Write one batch of validated rows: updates as one executemany, inserts as multi-row INSERTs.
+    
+    Each entry is (result, values); the results are filled in with the outcome.
+    """
+    if updates:
+        product_ids = {values["id"] for _, values in updates}
+        product_shops = dict(db.query(Product.id, Product.shop_id).filter(Product.id.in_(product_ids)).all())
+        rows = []
+        for result, values in updates:
+            shop_id = product_shops.get(values["id"])
+            if shop_id not in owned_shop_ids:
+                result["errors"] = [f"id: product {values['id']} not found in your shops"]
+            elif values.pop("shop_id", shop_id) != shop_id:
+                result["errors"] = ["shop_id: products cannot be moved to another shop"]
+            else:
+                result.update(status="updated", id=values["id"])
+                rows.append(values)
+        if rows:
+            db.execute(update(Product), rows)
+    
+    if inserts:
+        if db.get_bind().dialect.insert_executemany_returning:
+            # A few multi-row INSERT ... RETURNING statements. Autoincrement ids are
+            # allocated in row order, but RETURNING may list them in any order
+            product_ids = sorted(db.scalars(
+                insert(Product).returning(Product.id),
+                [values for _, values in inserts]
+            ).all())
+        else:
+            # No RETURNING for executemany (MySQL): the flush reads each new id back
+            products = [Product(**values) for _, values in inserts]
+            db.add_all(products)
+            db.flush()
+            product_ids = [product.id for product in products]
+        for (result, _), product_id in zip(inserts, product_ids):
+            result.update(status="created", id=product_id)
+
+def bulk_upsert_products(
+    db: Session,
+    owner_id: int,
+    rows: Iterable[Dict[str, Any]],
+    batch_size: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Create or update many products of an owner's shops in one transaction.
+    
+    Rows with an `id` update that product (only the given fields); other rows create
+    a product. Ownership and categories are checked once for the whole import, and
+    rows are written in batches. Invalid rows are reported and skipped; the valid
+    ones are committed together.
+    """
+    batch_size = batch_size or PRODUCT_BULK_BATCH_SIZE
+    owned_shop_ids = {shop_id for (shop_id,) in db.query(Shop.id).filter(Shop.owner_id == owner_id)}
+    category_ids = {category_id for (category_id,) in db.query(Category.id)}
+    results = []
+    inserts, updates = [], []
+    cart_product_ids = set()
+    
+    for row_number, row in enumerate(rows, start=1):
+        result = {"row": row_number, "status": "error", "id": None, "errors": None}
+        results.append(result)
+        
+        if not isinstance(row, dict):
+            result["errors"] = ["row: must be an object"]
+            continue
+        
+        try:
+            if row.get("id") is not None:
+                values = ProductUpdate.model_validate(row).model_dump(exclude_unset=True)
+                values["id"] = _integer_field(row, "id")
+                if row.get("shop_id") is not None:
+                    values["shop_id"] = _integer_field(row, "shop_id")
+            else:
+                values = ProductCreate.model_validate(row).model_dump()
+        except ValidationError as error:
+            result["errors"] = _validation_messages(error)
+            continue
+        except ValueError as error:
+            result["errors"] = [str(error)]
+            continue
+        
+        cleared = [key for key in _REQUIRED_PRODUCT_FIELDS if key in values and values[key] is None]
+        if cleared:
+            result["errors"] = [f"{key}: cannot be empty" for key in cleared]
+        elif "id" not in values and values["shop_id"] not in owned_shop_ids:
+            result["errors"] = [f"shop_id: you don't own shop {values['shop_id']}"]
+        elif values.get("category_id") is not None and values["category_id"] not in category_ids:
+            result["errors"] = [f"category_id: category {values['category_id']} not found"]
+        else:
+            (updates if "id" in values else inserts).append((result, values))
+            if "id" in values and any(key in values for key in CART_PRODUCT_FIELDS):
+                cart_product_ids.add(values["id"])
+        
+        if len(inserts) + len(updates) >= batch_size:
+            _write_product_batch(db, inserts, updates, owned_shop_ids)
+            inserts, updates = [], []
+    
+    _write_product_batch(db, inserts, updates, owned_shop_ids)
+    bump_product_cart_versions(db, cart_product_ids)
+    db.commit()
+    
+    return {
+        "created": sum(1 for result in results if result["status"] == "created"),
+        "updated": sum(1 for result in results if result["status"] == "updated"),
+        "failed": sum(1 for result in results if result["status"] == "error"),
+        "results": results,
+    }
@@ -0,0 +1,117 @@
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import delete, func, insert, literal, select
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.models import Product, StockReservation
+
+def _live_holds(exclude_user_id: Optional[int], now: datetime):
+    """
+    Filter criteria of the unexpired holds, optionally leaving one user's holds out.
+    """
+    criteria = [StockReservation.expires_at > now]
+    if exclude_user_id is not None:
+        criteria.append(StockReservation.user_id != exclude_user_id)
+    return criteria
+
+def held_quantity(product_id, exclude_user_id: Optional[int] = None, now: Optional[datetime] = None):
+    """
+    Scalar subquery summing the live holds on a product (a product id or the Product.id column).
+    
+    It is answered from the (product_id, expires_at, quantity) index alone.
+    """
+    return select(func.coalesce(func.sum(StockReservation.quantity), 0)) \
+        .where(StockReservation.product_id == product_id, *_live_holds(exclude_user_id, now or datetime.utcnow())) \
+        .scalar_subquery()
+
+def get_available_stock(
+    db: Session,
+    products: Iterable[Product],
+    exclude_user_id: Optional[int] = None
+) -> Dict[int, int]:
+    """
+    Available stock (stock minus live holds) of already loaded products, keyed by product id.
+    
+    Holds of `exclude_user_id` are not subtracted, so a user's own cart does not count against them.
+    All products are covered by a single grouped query.
+    """
+    products = list(products)
+    if not products:
+        return {}
+    
+    now = datetime.utcnow()
+    query = select(StockReservation.product_id, func.sum(StockReservation.quantity)) \
+        .where(StockReservation.product_id.in_([product.id for product in products]), *_live_holds(exclude_user_id, now)) \
+        .group_by(StockReservation.product_id)
+    held = dict(db.execute(query).all())
+    
+    return {product.id: (product.stock_quantity or 0) - held.get(product.id, 0) for product in products}
+
+def lock_products(db: Session, product_ids: Iterable[int]) -> Dict[int, Product]:
+    """
+    Load products with SELECT ... FOR UPDATE, keyed by id, so their rows stay locked until the transaction ends.
+    
+    Changing the holds on a product under its row lock serializes concurrent carts on it, so
+    stock checked under the lock is still there when the hold is written. Rows are locked in
+    id order, like checkout's stock updates, so concurrent requests cannot deadlock.
+    (SQLite ignores FOR UPDATE; its writer connection runs one write transaction at a time.)
+    """
+    query = db.query(Product) \
+        .filter(Product.id.in_(list(product_ids))) \
+        .order_by(Product.id) \
+        .with_for_update() \
+        .populate_existing()
+    return {product.id: product for product in query}
+
+def hold_stocks(db: Session, user_id: int, quantities: Dict[int, int]) -> List[int]:
+    """
+    Hold stock for a user's cart, `quantities` mapping product ids to units, for CART_RESERVATION_TTL_SECONDS.
+    
+    The user's existing holds on those products are replaced. Each hold is a guarded
+    INSERT ... SELECT, written only while the product's stock not held by other carts covers
+    it, so concurrent carts can never hold more than the stock. Returns the ids of the
+    products that could not be held; the caller rolls back then, and owns the transaction.
+    """
+    if not quantities:
+        return []
+    
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=settings.CART_RESERVATION_TTL_SECONDS)
+    release_stock_holds(db, user_id, quantities)
+    
+    not_held = []
+    for product_id, quantity in sorted(quantities.items()):
+        rows = select(literal(user_id), Product.id, literal(quantity), literal(expires_at)).where(
+            Product.id == product_id,
+            Product.is_available == True,
+            Product.stock_quantity - held_quantity(product_id, exclude_user_id=user_id, now=now) >= quantity
+        )
+        result = db.execute(
+            insert(StockReservation).from_select(["user_id", "product_id", "quantity", "expires_at"], rows)
+        )
+        if result.rowcount != 1:
+            not_held.append(product_id)
+    return not_held
+
+def hold_stock(db: Session, user_id: int, product_id: int, quantity: int) -> bool:
+    """
+    Hold `quantity` units of one product for a user's cart; see hold_stocks. Returns whether it is held.
+    """
+    return not hold_stocks(db, user_id, {product_id: quantity})
+
+def release_stock_holds(db: Session, user_id: int, product_ids: Optional[Iterable[int]] = None) -> None:
+    """
+    Drop a user's holds, on the given products or all of them. The caller owns the transaction.
+    """
+    query = delete(StockReservation).where(StockReservation.user_id == user_id)
+    if product_ids is not None:
+        query = query.where(StockReservation.product_id.in_(list(product_ids)))
+    db.execute(query)
+
+def release_expired_reservations(db: Session, now: Optional[datetime] = None) -> int:
+    """
+    Delete the holds that have expired and return how many were released.
+    """
+    result = db.execute(delete(StockReservation).where(StockReservation.expires_at <= (now or datetime.utcnow())))
+    db.commit()
+    return result.rowcount
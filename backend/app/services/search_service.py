@@ -0,0 +1,63 @@
+import re
+from sqlalchemy import column, or_, table, text
+from sqlalchemy.dialects.mysql import match
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from app.models import Product
+
+# Name of the SQLite FTS5 shadow table
+FTS_TABLE_NAME = "products_fts"
+
+products_fts = table(FTS_TABLE_NAME, column("rowid"))
+
+def _dialect(db: Session) -> str:
+    return db.get_bind().dialect.name
+
+def _fts5_query(q: str) -> str:
+    """
+    Turn free text into an FTS5 query matching any of its words.
+    
+    Every word is quoted so user input can never be parsed as FTS5 syntax.
+    """
+    words = re.findall(r"\w+", q)
+    return " OR ".join('"' + word.replace('"', '""') + '"' for word in words)
+
+def search_products(
+    db: Session,
+    q: str,
+    shop_id: Optional[int] = None,
+    category_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100
+) -> List[Product]:
+    """
+    Search products by name and description, best matches first.
+    """
+    query = db.query(Product)
+    dialect = _dialect(db)
+    
+    if dialect == "mysql":
+        relevance = match(Product.name, Product.description, against=q).in_natural_language_mode()
+        query = query.filter(relevance > 0).order_by(relevance.desc(), Product.id)
+    elif dialect == "sqlite":
+        fts_query = _fts5_query(q)
+        if not fts_query:
+            return []
+        # bm25() is lower for better matches
+        query = query \
+            .join(products_fts, products_fts.c.rowid == Product.id) \
+            .filter(text(f"{FTS_TABLE_NAME} MATCH :fts_query")) \
+            .params(fts_query=fts_query) \
+            .order_by(text(f"bm25({FTS_TABLE_NAME})"), Product.id)
+    else:
+        # No full-text support: fall back to substring matching
+        pattern = f"%{q}%"
+        query = query.filter(or_(Product.name.ilike(pattern), Product.description.ilike(pattern))).order_by(Product.id)
+    
+    if shop_id:
+        query = query.filter(Product.shop_id == shop_id)
+    
+    if category_id:
+        query = query.filter(Product.category_id == category_id)
+    
+    return query.offset(skip).limit(limit).all()
@@ -1,24 +1,44 @@
 from sqlalchemy.orm import Session
 from sqlalchemy import func
 from typing import List, Optional, Tuple
-from app.models import Shop, User
+from app.models import Product, Shop, User
 from app.schemas import ShopCreate, ShopUpdate
+from app.services.cart_service import bump_product_cart_versions
 
 def get_shops(
     db: Session, 
     category_id: Optional[int] = None, 
     skip: int = 0, 
-    limit: int = 100
+    limit: int = 100,
+    after_id: Optional[int] = None
 ) -> List[Shop]:
     """
     Get all shops with optional category filtering.
-    """
-    query = db.query(Shop)
     
+    Shops are ordered by id; pass `after_id` to page with a keyset cursor.
+    """
+    return _page_shops(db.query(Shop), category_id, skip, limit, after_id).all()
+
+def get_shop_rows(
+    db: Session, 
+    category_id: Optional[int] = None, 
+    skip: int = 0, 
+    limit: int = 100,
+    after_id: Optional[int] = None
+) -> List[tuple]:
+    """
+    Get the shops get_shops returns for the same arguments as plain column tuples, without building ORM objects.
+    """
+    return _page_shops(db.query(*Shop.__table__.columns), category_id, skip, limit, after_id).all()
+
+def _page_shops(query, category_id: Optional[int], skip: int, limit: int, after_id: Optional[int]):
     if category_id:
         query = query.filter(Shop.category_id == category_id)
     
-    return query.offset(skip).limit(limit).all()
+    if after_id is not None:
+        query = query.filter(Shop.id > after_id)
+    
+    return query.order_by(Shop.id).offset(skip).limit(limit)
 
 def get_shop(db: Session, shop_id: int) -> Optional[Shop]:
     """
@@ -26,6 +46,12 @@ def get_shop(db: Session, shop_id: int) -> Optional[Shop]:
     """
     return db.query(Shop).filter(Shop.id == shop_id).first()
 
+def get_shop_row(db: Session, shop_id: int) -> Optional[tuple]:
+    """
+    Get a shop by ID as a plain column tuple, without building an ORM object.
+    """
+    return db.query(*Shop.__table__.columns).filter(Shop.id == shop_id).first()
+
 def get_shop_by_owner(db: Session, owner_id: int, shop_id: int) -> Optional[Shop]:
     """
     Get a shop by ID and owner ID to verify ownership.
@@ -78,6 +104,8 @@ def delete_shop(db: Session, shop_id: int) -> bool:
     if not db_shop:
         return False
     
+    # The shop's products leave the carts holding them, so bump their versions first
+    bump_product_cart_versions(db, [product_id for product_id, in db.query(Product.id).filter(Product.shop_id == shop_id)])
     db.delete(db_shop)
     db.commit()
     return True
\ No newline at end of file
@@ -4,7 +4,8 @@ from app.utils.auth_middleware import (
     get_current_user,
     get_current_active_user,
     get_shop_owner,
-    get_customer
+    get_customer,
+    invalidate_cached_user
 )
 
 # Export all utilities to be used in the application
\ No newline at end of file
@@ -1,18 +1,46 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
 from app.config import settings
-from app.database import get_db
+from app.database import get_primary_read_db
 from app.models import User
 from app.schemas import TokenData
+from app.utils.cache import TTLCache
 
 # OAuth2 scheme for token extraction from request
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/login")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# Column snapshots of recently authenticated users, keyed by the token's user id.
+# The cache is per process, so the TTL bounds staleness across workers.
+user_cache = TTLCache(maxsize=settings.USER_CACHE_SIZE, ttl=settings.USER_CACHE_TTL_SECONDS)
+
+def _load_user(db: Session, user_id: int):
+    """
+    Load a user from the cache (attached to the session without a query) or the database.
+    """
+    values = user_cache.get(user_id)
+    if values is not None:
+        user = User(**values)
+        make_transient_to_detached(user)
+        return db.merge(user, load=False)
+    
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is not None:
+        user_cache.set(user_id, {column.key: getattr(user, column.key) for column in User.__table__.columns})
+    return user
+
+def invalidate_cached_user(user_id: int):
+    """
+    Drop a user from the authentication cache after their record changes.
+    """
+    user_cache.delete(user_id)
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_primary_read_db)):
     """
     Dependency to get the current authenticated user from JWT token.
+    
+    The user is read through a read session, so handlers that change it attach it to their own.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -34,8 +62,8 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception
         
-    # Get user from database
-    user = db.query(User).filter(User.id == token_data.user_id).first()
+    # Get user from the cache or the database
+    user = _load_user(db, token_data.user_id)
     if user is None:
         raise credentials_exception
         
@@ -0,0 +1,65 @@
+"""
+Request body reader for bulk endpoints: a JSON array of objects or a CSV file.
+"""
+import codecs
+import csv
+import tempfile
+from typing import Any, AsyncIterator, Dict, IO, Iterator
+import orjson
+from fastapi import HTTPException, Request, status
+
+# CSV bodies larger than this are spooled to disk instead of memory
+CSV_SPOOL_MAX_MEMORY = 1024 * 1024
+
+# OpenAPI request body of the endpoints using read_bulk_rows
+BULK_ROWS_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {"type": "array", "items": {"type": "object"}}},
+            "text/csv": {"schema": {"type": "string"}},
+        },
+    }
+}
+
+def _csv_rows(source: IO[bytes]) -> Iterator[Dict[str, Any]]:
+    # Empty cells are left out, so they fall back to defaults (or stay unchanged on update)
+    for row in csv.DictReader(codecs.getreader("utf-8-sig")(source, errors="replace")):
+        yield {key.strip(): value.strip() for key, value in row.items() if key and value is not None and value.strip()}
+
+async def read_bulk_rows(request: Request) -> AsyncIterator[Iterator[Dict[str, Any]]]:
+    """
+    Dependency yielding the rows of a JSON array or CSV (`Content-Type: text/csv`) request body.
+
+    CSV bodies are streamed into a temporary file and parsed lazily, one row at a time.
+    """
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip().lower()
+
+    if content_type == "text/csv":
+        spool = tempfile.SpooledTemporaryFile(max_size=CSV_SPOOL_MAX_MEMORY)
+        try:
+            async for chunk in request.stream():
+                spool.write(chunk)
+            spool.seek(0)
+            yield _csv_rows(spool)
+        finally:
+            spool.close()
+    elif content_type == "application/json":
+        try:
+            rows = orjson.loads(await request.body())
+        except orjson.JSONDecodeError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid JSON body"
+            )
+        if not isinstance(rows, list):
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="Expected a JSON array of rows"
+            )
+        yield iter(rows)
+    else:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Send a JSON array (application/json) or CSV (text/csv)"
+        )
@@ -0,0 +1,220 @@
+"""
+Negotiated response compression (zstd, brotli, gzip) as ASGI middleware.
+
+Bodies smaller than `minimum_size` are sent as they are. Compression of large
+bodies and stream chunks runs in the worker threadpool so the event loop stays
+free. Responses carrying an ETag are the same bytes for the same ETag, so their
+compressed form can be kept and reused instead of compressing them again.
+
+brotli and zstd need the optional `brotli` and `zstandard` packages; without
+them only gzip is offered.
+"""
+import gzip
+import zlib
+from typing import Callable, Dict, List, Optional, Sequence
+import anyio.to_thread
+from starlette.datastructures import Headers, MutableHeaders
+from app.utils.cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+# Levels favouring speed, as every response is compressed on the fly
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 4
+ZSTD_LEVEL = 3
+
+# Media types worth compressing (matched as prefixes)
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/", "application/javascript", "image/svg+xml")
+
+class _GzipStream:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+class _BrotliStream:
+    def __init__(self):
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+class _ZstdStream:
+    def __init__(self):
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def chunk(self, data: bytes) -> bytes:
+        return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+# Whole-body compressor and stream compressor factory per content coding
+CODECS: Dict[str, tuple] = {"gzip": (lambda data: gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0), _GzipStream)}
+if brotli is not None:
+    CODECS["br"] = (lambda data: brotli.compress(data, quality=BROTLI_QUALITY), _BrotliStream)
+if zstandard is not None:
+    CODECS["zstd"] = (lambda data: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data), _ZstdStream)
+
+def negotiate_encoding(accept_encoding: Optional[str], preferred: Sequence[str]) -> Optional[str]:
+    """
+    Pick the content coding to use from an Accept-Encoding header.
+
+    The client's highest q-value wins; ties go to the earliest coding in `preferred`.
+    """
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key.lower() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name:
+            weights[name.strip().lower()] = weight
+
+    candidates = [
+        (weights.get(encoding, weights.get("*", 0.0)), -index, encoding)
+        for index, encoding in enumerate(preferred)
+    ]
+    candidates = [candidate for candidate in candidates if candidate[0] > 0]
+    return max(candidates)[2] if candidates else None
+
+def _is_compressible(status: int, headers: Headers) -> bool:
+    if status < 200 or status in (204, 304) or "content-encoding" in headers:
+        return False
+    return headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing responses with the best content coding the client accepts.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        thread_size: int = 64 * 1024,
+        cache_size: int = 0,
+        encodings: Sequence[str] = ("zstd", "br", "gzip")
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.thread_size = thread_size
+        self.encodings: List[str] = [encoding for encoding in encodings if encoding in CODECS]
+        # Compressed bodies of ETag-carrying responses, keyed by request target, ETag and coding
+        self.cache = TTLCache(maxsize=cache_size, ttl=3600)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding"), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(self, encoding, scope, send)
+        await self.app(scope, receive, responder.send)
+
+    async def compress(self, function: Callable[[bytes], bytes], data: bytes) -> bytes:
+        """
+        Run a compression function, in a worker thread when the data is large.
+        """
+        if len(data) >= self.thread_size:
+            return await anyio.to_thread.run_sync(function, data)
+        return function(data)
+
+class _CompressionResponder:
+    """
+    Per-request state: holds back the response start until the first body message shows how to send it.
+    """
+
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, scope, send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self.target = (scope.get("path", ""), scope.get("query_string", b""))
+        self.downstream = send
+        self.start = None
+        self.stream = None
+        self.passthrough = False
+
+    async def send(self, message):
+        if message["type"] == "http.response.start":
+            self.start = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.downstream(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.stream is not None:
+            await self._send_chunk(body, more_body)
+            return
+
+        headers = MutableHeaders(raw=self.start["headers"])
+        if not _is_compressible(self.start["status"], headers) or (not more_body and len(body) < self.middleware.minimum_size):
+            self.passthrough = True
+            await self.downstream(self.start)
+            await self.downstream(message)
+            return
+
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+
+        if more_body:
+            # Streamed body: compress and flush chunk by chunk
+            del headers["Content-Length"]
+            self.stream = CODECS[self.encoding][1]()
+            await self.downstream(self.start)
+            await self._send_chunk(body, more_body)
+            return
+
+        body = await self._compress_body(body, headers.get("etag"))
+        headers["Content-Length"] = str(len(body))
+        await self.downstream(self.start)
+        await self.downstream({"type": "http.response.body", "body": body})
+
+    async def _compress_body(self, body: bytes, etag: Optional[str]) -> bytes:
+        cache = self.middleware.cache
+        key = (self.target, etag, self.encoding) if etag and cache.maxsize > 0 else None
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None and cached[0] == len(body):
+                return cached[1]
+
+        compressed = await self.middleware.compress(CODECS[self.encoding][0], body)
+        if key is not None:
+            cache.set(key, (len(body), compressed))
+        return compressed
+
+    async def _send_chunk(self, body: bytes, more_body: bool):
+        data = await self.middleware.compress(self.stream.chunk, body) if body else b""
+        if not more_body:
+            data += self.stream.finish()
+        await self.downstream({"type": "http.response.body", "body": data, "more_body": more_body})
@@ -0,0 +1,50 @@
+"""
+Helpers for conditional GET requests (ETag / If-None-Match).
+"""
+import hashlib
+import json
+from typing import Any, Iterable, Optional
+from fastapi import Response, status
+
+def make_etag(data: Any) -> str:
+    """
+    Build a weak ETag from JSON-serializable data.
+    
+    Weak, because the same representation may be sent with different content encodings.
+    """
+    raw = json.dumps(data, sort_keys=True, separators=(",", ":"), default=str)
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+
+def row_values(row: Any) -> tuple:
+    """
+    Get the column values of an ORM object, in table order, as a column-only query returns them.
+    """
+    return tuple(getattr(row, column.key) for column in row.__table__.columns)
+
+def rows_etag(rows: Iterable[tuple]) -> str:
+    """
+    Build a weak ETag from the column values of the rows a response is made of, in order.
+    
+    The values can be read with a plain column query, so a conditional GET is answered
+    without building ORM objects or serializing a body. `updated_at` alone would not do:
+    it has one-second resolution, so two writes within a second would share an ETag.
+    """
+    return make_etag([list(row) for row in rows])
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag (weak comparison).
+    """
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    if "*" in candidates:
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    return any((candidate[2:] if candidate.startswith("W/") else candidate) == opaque for candidate in candidates)
+
+def not_modified_response(etag: str) -> Response:
+    """
+    Build an empty 304 response for a matching conditional GET.
+    """
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
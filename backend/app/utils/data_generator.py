@@ -0,0 +1,258 @@
+"""
+High-volume synthetic data generator.
+
+Writes users, shops, products, carts, orders and order items with Core
+`insert()` executemany batches instead of ORM objects, hashes the shared
+password once, and derives every value from a seeded random generator so the
+same seed and counts always produce the same data.
+
+Row ids are assigned here (after the current maximum of each table) so related
+rows can reference each other without reading anything back.
+"""
+import random
+from contextlib import contextmanager
+from array import array
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.engine import Connection, Engine
+from app.models import User, Category, Shop, Product, Cart, Order, OrderItem
+from app.services import auth_service
+from app.services.category_service import bump_categories_version
+from app.utils.schema import upgrade_schema
+
+DEFAULT_PASSWORD = "password123"
+CUSTOMER_PREFIX = "gen_customer_"
+OWNER_PREFIX = "gen_owner_"
+CATEGORY_NAMES = [
+    "Groceries", "Bakery", "Clothing", "Electronics", "Books", "Home",
+    "Garden", "Toys", "Sports", "Beauty", "Pharmacy", "Pets",
+]
+ORDER_STATUSES = ["pending", "confirmed", "preparing", "ready", "delivered", "cancelled"]
+
+class GeneratorSpec(NamedTuple):
+    shops: int
+    products_per_shop: int
+    customers: int
+    orders: int
+    # Customers that get a non-empty cart
+    carts: int = 0
+    max_items_per_order: int = 4
+    max_items_per_cart: int = 5
+
+def _batches(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def _next_id(connection: Connection, model) -> int:
+    return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+def _sqlite_synchronous(connection: Connection, value: Optional[int] = None) -> Optional[int]:
+    """
+    Read, or set, PRAGMA synchronous through the DBAPI connection, outside any transaction.
+
+    SQLite refuses to change it inside one, and SQLAlchemy would begin one first (the writer
+    engine of the SQLite production profile with BEGIN IMMEDIATE).
+    """
+    cursor = connection.connection.dbapi_connection.cursor()
+    try:
+        if value is None:
+            cursor.execute("PRAGMA synchronous")
+            return cursor.fetchone()[0]
+        cursor.execute(f"PRAGMA synchronous = {int(value)}")
+        return None
+    finally:
+        cursor.close()
+
+@contextmanager
+def _bulk_load_settings(connection: Connection) -> Iterator[None]:
+    """
+    Relax per-statement durability and checks for the load session only.
+
+    The generated rows are consistent by construction, so skipping the checks loses nothing.
+    The connection's own settings are restored afterwards, as it goes back to the pool.
+    Call it on a connection that has not begun a transaction yet.
+    """
+    dialect = connection.dialect.name
+    if dialect == "sqlite":
+        previous = _sqlite_synchronous(connection)
+        _sqlite_synchronous(connection, 0)  # OFF
+    elif dialect == "mysql":
+        previous = connection.execute(text("SELECT @@SESSION.unique_checks, @@SESSION.foreign_key_checks")).one()
+        connection.execute(text("SET SESSION unique_checks = 0, foreign_key_checks = 0"))
+    try:
+        yield
+    finally:
+        # Drop a batch left unfinished by an error before restoring
+        connection.rollback()
+        if dialect == "sqlite":
+            _sqlite_synchronous(connection, previous)
+        elif dialect == "mysql":
+            connection.execute(
+                text("SET SESSION unique_checks = :unique_checks, foreign_key_checks = :foreign_key_checks"),
+                {"unique_checks": previous[0], "foreign_key_checks": previous[1]}
+            )
+        connection.commit()
+
+def generate_data(
+    engine: Engine,
+    spec: GeneratorSpec,
+    seed: int = 42,
+    batch_size: int = 5_000,
+    anchor: Optional[datetime] = None,
+    password: str = DEFAULT_PASSWORD,
+    progress: Optional[Callable[[str], None]] = None
+) -> Dict[str, int]:
+    """
+    Migrate the schema to the latest revision and insert a synthetic dataset of the given size.
+
+    Timestamps are spread back from `anchor` (default: today at midnight UTC).
+    Returns the number of rows written per table.
+    """
+    rng = random.Random(seed)
+    anchor = anchor or datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    password_hash = auth_service.get_password_hash(password)
+    counts = {table: 0 for table in ("users", "shops", "products", "carts", "orders", "order_items")}
+    upgrade_schema(engine)
+
+    with engine.begin() as connection:
+        existing = set(connection.execute(select(Category.name)).scalars())
+        missing = [name for name in CATEGORY_NAMES if name not in existing]
+        if missing:
+            connection.execute(insert(Category), [
+                {"name": name, "description": f"{name} shops and products"} for name in missing
+            ])
+            bump_categories_version(connection)
+        category_ids = list(connection.execute(select(Category.id).order_by(Category.id)).scalars())
+
+        first_user_id = _next_id(connection, User)
+        first_shop_id = _next_id(connection, Shop)
+        first_product_id = _next_id(connection, Product)
+        first_order_id = _next_id(connection, Order)
+
+    owner_ids = range(first_user_id, first_user_id + spec.shops)
+    customer_ids = range(first_user_id + spec.shops, first_user_id + spec.shops + spec.customers)
+    shop_ids = range(first_shop_id, first_shop_id + spec.shops)
+    shop_categories = array("l", (rng.choice(category_ids) for _ in shop_ids))
+    # Product prices in cents, needed again for order items; an array keeps millions of them compact
+    product_prices = array("l")
+
+    # Every row of an executemany batch must have the same keys
+    def users():
+        for index, user_id in enumerate(owner_ids):
+            created_at = anchor - timedelta(days=rng.randint(0, 1_095))
+            yield {
+                "id": user_id, "email": f"{OWNER_PREFIX}{user_id}@example.com", "username": f"{OWNER_PREFIX}{user_id}",
+                "password_hash": password_hash, "role": "shop_owner", "first_name": "Owner", "last_name": str(index),
+                "phone": f"555-{user_id % 10_000:04d}", "address": f"{index} Owner Avenue",
+                "created_at": created_at, "updated_at": created_at,
+            }
+        for index, user_id in enumerate(customer_ids):
+            created_at = anchor - timedelta(days=rng.randint(0, 1_095))
+            yield {
+                "id": user_id, "email": f"{CUSTOMER_PREFIX}{user_id}@example.com", "username": f"{CUSTOMER_PREFIX}{user_id}",
+                "password_hash": password_hash, "role": "customer", "first_name": "Customer", "last_name": str(index),
+                "phone": None, "address": f"{index} Customer Street",
+                "created_at": created_at, "updated_at": created_at,
+            }
+
+    def shops():
+        for index, (owner_id, shop_id) in enumerate(zip(owner_ids, shop_ids)):
+            created_at = anchor - timedelta(days=rng.randint(0, 730))
+            yield {
+                "id": shop_id, "owner_id": owner_id, "name": f"Shop {shop_id}", "description": f"Synthetic shop {shop_id}",
+                "category_id": shop_categories[index], "address": f"{shop_id} Market Street",
+                "email": f"shop{shop_id}@example.com", "is_active": rng.random() < 0.97,
+                "created_at": created_at, "updated_at": created_at,
+            }
+
+    def products():
+        product_id = first_product_id
+        for index, shop_id in enumerate(shop_ids):
+            for _ in range(spec.products_per_shop):
+                cents = rng.randint(99, 19_999)
+                product_prices.append(cents)
+                created_at = anchor - timedelta(days=rng.randint(0, 365))
+                yield {
+                    "id": product_id, "shop_id": shop_id, "name": f"Product {product_id}",
+                    "description": f"Synthetic product {product_id} sold by shop {shop_id}",
+                    "price": Decimal(cents) / 100,
+                    "category_id": shop_categories[index] if rng.random() < 0.8 else rng.choice(category_ids),
+                    "stock_quantity": rng.randint(0, 1_000) if rng.random() < 0.1 else 1_000_000,
+                    "is_available": rng.random() < 0.95,
+                    "created_at": created_at, "updated_at": created_at,
+                }
+                product_id += 1
+
+    order_items: List[dict] = []
+
+    def orders():
+        for order_id in range(first_order_id, first_order_id + spec.orders):
+            shop_index = rng.randrange(spec.shops)
+            total = 0
+            for product_offset in rng.sample(range(spec.products_per_shop), min(rng.randint(1, spec.max_items_per_order), spec.products_per_shop)):
+                product_index = shop_index * spec.products_per_shop + product_offset
+                quantity = rng.randint(1, 3)
+                total += product_prices[product_index] * quantity
+                order_items.append({
+                    "order_id": order_id, "product_id": first_product_id + product_index,
+                    "quantity": quantity, "price": Decimal(product_prices[product_index]) / 100,
+                })
+            created_at = anchor - timedelta(minutes=rng.randint(0, 525_600))
+            yield {
+                "id": order_id, "customer_id": rng.choice(customer_ids), "shop_id": first_shop_id + shop_index,
+                "total_amount": Decimal(total) / 100, "status": rng.choice(ORDER_STATUSES),
+                "delivery_address": f"{order_id} Delivery Road", "created_at": created_at, "updated_at": created_at,
+            }
+
+    def carts():
+        for user_id in rng.sample(customer_ids, min(spec.carts, spec.customers)):
+            shop_index = rng.randrange(spec.shops)
+            item_count = min(rng.randint(1, spec.max_items_per_cart), spec.products_per_shop)
+            for product_offset in rng.sample(range(spec.products_per_shop), item_count):
+                created_at = anchor - timedelta(minutes=rng.randint(0, 10_080))
+                yield {
+                    "user_id": user_id, "product_id": first_product_id + shop_index * spec.products_per_shop + product_offset,
+                    "quantity": rng.randint(1, 3), "created_at": created_at, "updated_at": created_at,
+                }
+
+    def report(message: str) -> None:
+        if progress:
+            progress(message)
+
+    with engine.connect() as connection, _bulk_load_settings(connection):
+        for table, model, rows in (("users", User, users()), ("shops", Shop, shops()), ("products", Product, products())):
+            for batch in _batches(rows, batch_size):
+                connection.execute(insert(model), batch)
+                connection.commit()
+                counts[table] += len(batch)
+            report(f"{table}: {counts[table]} rows")
+
+        # Orders and carts need customers and products to refer to
+        if not (spec.shops and spec.products_per_shop and spec.customers):
+            return counts
+
+        # Order items are produced alongside their orders and written right after them
+        for batch in _batches(orders(), batch_size):
+            connection.execute(insert(Order), batch)
+            connection.execute(insert(OrderItem), order_items)
+            connection.commit()
+            counts["orders"] += len(batch)
+            counts["order_items"] += len(order_items)
+            order_items.clear()
+        report(f"orders: {counts['orders']} rows, order_items: {counts['order_items']} rows")
+
+        for batch in _batches(carts(), batch_size):
+            connection.execute(insert(Cart), batch)
+            connection.commit()
+            counts["carts"] += len(batch)
+        report(f"carts: {counts['carts']} rows")
+
+    return counts
@@ -0,0 +1,262 @@
+"""
+Minimal Prometheus-style metrics: HTTP request counts, latency and in-flight
+requests per route, per-request SQL statement stats, connection pool stats and
+checkout waits,
+rendered in the Prometheus text exposition format by the /metrics endpoint.
+
+Metrics are kept per process; scrape each worker (or aggregate) accordingly.
+"""
+import threading
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+from sqlalchemy import event, exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+from starlette.routing import Match
+from app.utils.query_stats import report_query_stats, start_query_stats, stop_query_stats
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+POOL_WAIT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(labelnames: Sequence[str], labels: Tuple) -> str:
+    if not labelnames:
+        return ""
+    pairs = []
+    for name, value in zip(labelnames, labels):
+        escaped = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{name}="{escaped}"')
+    return "{" + ",".join(pairs) + "}"
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple, float] = {}
+
+    def inc(self, labels: Tuple = (), amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def dec(self, labels: Tuple = (), amount: float = 1) -> None:
+        self.inc(labels, -amount)
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._values: Dict[Tuple, list] = {}
+
+    def observe(self, labels: Tuple, value: float) -> None:
+        with self._lock:
+            entry = self._values.setdefault(labels, [[0] * len(self.buckets), 0.0])
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][index] += 1
+            entry[1] += value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((labels, (list(counts), total)) for labels, (counts, total) in self._values.items())
+        lines = self._header()
+        for labels, (counts, total) in values:
+            for bound, count in zip(self.buckets, counts):
+                bucket_labels = _format_labels(self.labelnames + ("le",), labels + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{bucket_labels} {count}")
+            label_text = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_text} {counts[-1]}")
+        return lines
+
+http_requests_total = Counter(
+    "http_requests_total", "HTTP requests served.", ("method", "route", "status")
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency in seconds.", ("method", "route")
+)
+http_requests_in_flight = Gauge(
+    "http_requests_in_flight", "HTTP requests currently being served.", ("method", "route")
+)
+http_request_db_statements = Histogram(
+    "http_request_db_statements", "SQL statements executed per HTTP request.", ("method", "route"), STATEMENT_BUCKETS
+)
+http_request_db_duration_seconds = Histogram(
+    "http_request_db_duration_seconds", "Time spent executing SQL per HTTP request, in seconds.", ("method", "route")
+)
+db_pool_checkouts_total = Counter(
+    "db_pool_checkouts_total", "Connections checked out of the pool.", ("engine",)
+)
+db_pool_checkout_wait_seconds = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time taken to get a connection from the pool (waiting for a free one or opening one), in seconds.",
+    ("engine",),
+    POOL_WAIT_BUCKETS
+)
+db_pool_checkout_timeouts_total = Counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that gave up waiting for a free connection.", ("engine",)
+)
+
+_metrics = [
+    http_requests_total,
+    http_request_duration_seconds,
+    http_requests_in_flight,
+    http_request_db_statements,
+    http_request_db_duration_seconds,
+    db_pool_checkouts_total,
+    db_pool_checkout_wait_seconds,
+    db_pool_checkout_timeouts_total,
+]
+
+# Callables returning extra exposition lines, evaluated at scrape time
+_collectors: List[Callable[[], List[str]]] = []
+
+def register_collector(collector: Callable[[], List[str]]) -> None:
+    """
+    Add a callable whose exposition lines are appended to every scrape.
+    """
+    _collectors.append(collector)
+
+def gauge_lines(name: str, documentation: str, value: float, labelnames: Sequence[str] = (), labels: Tuple = ()) -> List[str]:
+    """
+    Render a single gauge sample, for collectors reporting values read at scrape time.
+    """
+    return [
+        f"# HELP {name} {documentation}",
+        f"# TYPE {name} gauge",
+        f"{name}{_format_labels(labelnames, labels)} {_format_value(value)}"
+    ]
+
+def instrument_engine(engine: Engine, name: str = "primary") -> None:
+    """
+    Report connection pool stats for an engine, and how long checkouts wait for a connection.
+    """
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return
+    
+    # The pool's _do_get hands out an idle connection, opens a new one or blocks until one
+    # is returned (up to pool_timeout), so timing it measures the real wait
+    do_get = pool._do_get
+    
+    def _timed_do_get():
+        start = time.perf_counter()
+        try:
+            return do_get()
+        except exc.TimeoutError:
+            db_pool_checkout_timeouts_total.inc((name,))
+            raise
+        finally:
+            db_pool_checkout_wait_seconds.observe((name,), time.perf_counter() - start)
+    
+    pool._do_get = _timed_do_get
+
+    @event.listens_for(pool, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        db_pool_checkouts_total.inc((name,))
+
+    def collect() -> List[str]:
+        labels = (("engine",), (name,))
+        return (
+            gauge_lines("db_pool_size", "Configured number of pooled connections.", pool.size(), *labels)
+            + gauge_lines("db_pool_checked_out", "Connections currently checked out.", pool.checkedout(), *labels)
+            + gauge_lines("db_pool_checked_in", "Idle connections in the pool.", pool.checkedin(), *labels)
+            + gauge_lines("db_pool_overflow", "Connections open beyond the pool size.", max(pool.overflow(), 0), *labels)
+        )
+    
+    register_collector(collect)
+
+def render_metrics() -> str:
+    """
+    Render all metrics in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in _metrics:
+        lines += metric.render()
+    for collector in _collectors:
+        lines += collector()
+    return "\n".join(lines) + "\n"
+
+def _route_path(scope) -> str:
+    # The route template the router will pick (a full match, else the route answering 405),
+    # known before the request runs
+    partial = None
+    for route in getattr(scope.get("app"), "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return route.path
+        if match == Match.PARTIAL and partial is None:
+            partial = route.path
+    return partial or "unmatched"
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, latency, in-flight requests and SQL stats per route.
+    """
+
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        method = scope["method"]
+        status_code = 500
+        
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+        
+        # Label by route template, not raw path, to keep cardinality bounded
+        in_flight_labels = (method, _route_path(scope))
+        http_requests_in_flight.inc(in_flight_labels)
+        stats, token = start_query_stats()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            stop_query_stats(token)
+            http_requests_in_flight.dec(in_flight_labels)
+            
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            http_requests_total.inc((method, route_path, str(status_code)))
+            http_request_duration_seconds.observe((method, route_path), elapsed)
+            http_request_db_statements.observe((method, route_path), stats.statements)
+            http_request_db_duration_seconds.observe((method, route_path), stats.duration)
+            report_query_stats(stats, method, route_path)
@@ -0,0 +1,65 @@
+"""
+Keyset (cursor) pagination helpers for the list endpoints.
+
+Cursors are opaque, URL-safe tokens encoding the sort key of the last row of
+a page. The next page is read with `WHERE key > cursor` on an index instead of
+scanning and discarding every earlier row as OFFSET does.
+"""
+import base64
+import json
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Callable, Sequence
+from fastapi import HTTPException, Response, status
+from sqlalchemy import and_, or_
+
+# Response header carrying the cursor of the next page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def _json_default(value: Any):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """
+    Encode the sort key values of a row as an opaque cursor.
+    """
+    raw = json.dumps(list(values), separators=(",", ":"), default=_json_default)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, converters: Sequence[Callable[[Any], Any]]) -> tuple:
+    """
+    Decode a cursor into its sort key values, converting each one with the matching converter.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if not isinstance(values, list) or len(values) != len(converters):
+            raise ValueError(cursor)
+        return tuple(convert(value) for convert, value in zip(converters, values))
+    except (ValueError, TypeError, ArithmeticError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+def keyset_filter(columns: Sequence[Any], values: Sequence[Any], descending: bool = False):
+    """
+    Build a filter selecting the rows that come strictly after `values` in `columns` order.
+    """
+    clauses = []
+    for index, column in enumerate(columns):
+        equal_prefix = [columns[i] == values[i] for i in range(index)]
+        after = column < values[index] if descending else column > values[index]
+        clauses.append(and_(*equal_prefix, after))
+    return or_(*clauses)
+
+def set_next_cursor(response: Response, items: Sequence[Any], limit: int, key: Callable[[Any], Sequence[Any]]):
+    """
+    Advertise the cursor of the next page when the current page is full.
+    """
+    if limit > 0 and len(items) == limit:
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(key(items[-1]))
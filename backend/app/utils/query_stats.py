@@ -0,0 +1,138 @@
+"""
+Per-request SQL statement accounting, query budgets and N+1 detection.
+
+SQLAlchemy cursor events on every engine add each statement's count and duration
+to the stats of the request being served (tracked in a context variable, which
+also follows the request into the threadpool).
+"""
+import contextvars
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised when a request executes more SQL statements than QUERY_BUDGET allows (in "raise" mode).
+    """
+
+class QueryStats:
+    """
+    Number and total duration of the SQL statements executed for one request.
+    """
+    __slots__ = ("statements", "duration", "statement_counts")
+
+    def __init__(self):
+        self.statements = 0
+        self.duration = 0.0
+        self.statement_counts = Counter()
+
+    def repeated_statements(self, threshold: int) -> List[Tuple[str, int]]:
+        """
+        Get the statements executed at least `threshold` times, the signature of an N+1 pattern.
+        """
+        return [(statement, count) for statement, count in self.statement_counts.most_common() if count >= threshold]
+
+_current_stats: contextvars.ContextVar[Optional[QueryStats]] = contextvars.ContextVar("query_stats", default=None)
+
+def start_query_stats() -> Tuple[QueryStats, contextvars.Token]:
+    """
+    Start collecting statement stats for the current request.
+    """
+    stats = QueryStats()
+    return stats, _current_stats.set(stats)
+
+def stop_query_stats(token: contextvars.Token) -> None:
+    """
+    Stop collecting statement stats started with start_query_stats.
+    """
+    _current_stats.reset(token)
+
+def current_query_stats() -> Optional[QueryStats]:
+    """
+    Get the stats of the request being served, if any.
+    """
+    return _current_stats.get()
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # In raise mode the statement over budget is stopped before it runs
+    stats = _current_stats.get()
+    if (
+        stats is not None
+        and settings.QUERY_BUDGET_MODE == "raise"
+        and 0 < settings.QUERY_BUDGET <= stats.statements
+    ):
+        raise QueryBudgetExceeded(
+            f"Request exceeded the query budget of {settings.QUERY_BUDGET} statements: {statement}"
+        )
+    conn.info.setdefault("query_start_times", []).append(time.perf_counter())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_times"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.statements += 1
+        stats.duration += elapsed
+        stats.statement_counts[statement] += 1
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute
+    connection = exception_context.connection
+    if connection is not None and connection.info.get("query_start_times"):
+        connection.info["query_start_times"].pop()
+
+def report_query_stats(stats: QueryStats, method: str, route: str) -> None:
+    """
+    Log a request that went over the query budget or repeated a statement N+1 style.
+    """
+    if settings.QUERY_BUDGET_MODE == "off":
+        return
+    
+    if 0 < settings.QUERY_BUDGET < stats.statements:
+        logger.warning(
+            "%s %s executed %d SQL statements (budget %d)",
+            method, route, stats.statements, settings.QUERY_BUDGET
+        )
+    
+    for statement, count in stats.repeated_statements(settings.N_PLUS_ONE_THRESHOLD):
+        logger.warning("%s %s: possible N+1, statement executed %d times: %s", method, route, count, statement)
+
+class QueryCounter:
+    """
+    The SQL statements captured by count_queries.
+    """
+    
+    def __init__(self):
+        self.statements: List[str] = []
+    
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+    
+    def __repr__(self):
+        return f"<QueryCounter {self.count} statements: {self.statements!r}>"
+
+@contextmanager
+def count_queries() -> Iterator[QueryCounter]:
+    """
+    Capture every SQL statement executed (on any engine, in any thread) inside the block.
+    """
+    counter = QueryCounter()
+    
+    def _record(conn, cursor, statement, parameters, context, executemany):
+        counter.statements.append(statement)
+    
+    event.listen(Engine, "after_cursor_execute", _record)
+    try:
+        yield counter
+    finally:
+        event.remove(Engine, "after_cursor_execute", _record)
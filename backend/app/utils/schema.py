@@ -0,0 +1,64 @@
+"""
+Schema version check against the Alembic migrations in backend/alembic.
+
+The schema is created and changed by `alembic upgrade head`, run once per deploy.
+Workers only compare the database's revision with the migrations' head at startup:
+one small query, instead of running DDL on every boot.
+"""
+from pathlib import Path
+from typing import Optional
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy.engine import Connection, Engine
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
+
+class SchemaOutOfDate(RuntimeError):
+    """
+    The database is not at the head revision of the migrations.
+    """
+
+def alembic_config(connection: Optional[Connection] = None) -> Config:
+    """
+    The Alembic configuration of backend/alembic.ini, optionally running on an existing connection.
+    """
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    if connection is not None:
+        config.attributes["connection"] = connection
+    return config
+
+def head_revision() -> Optional[str]:
+    return ScriptDirectory.from_config(alembic_config()).get_current_head()
+
+def current_revision(engine: Engine) -> Optional[str]:
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+def upgrade_schema(engine: Engine) -> None:
+    """
+    Apply the pending migrations (`alembic upgrade head`) in one transaction.
+    """
+    with engine.begin() as connection:
+        command.upgrade(alembic_config(connection), "head")
+
+def check_schema_version(engine: Engine, migrate: bool = False) -> str:
+    """
+    Make sure the database is at the migrations' head revision and return it.
+
+    Out of date, the pending migrations are applied when `migrate` is set (single-process
+    setups only: concurrent workers would race); otherwise SchemaOutOfDate is raised.
+    """
+    head = head_revision()
+    current = current_revision(engine)
+    if current == head:
+        return head
+    
+    if not migrate:
+        raise SchemaOutOfDate(
+            f"Database schema is at revision {current or '(none)'}, expected {head}: run `alembic upgrade head`"
+        )
+    upgrade_schema(engine)
+    return head
@@ -1,5 +1,6 @@
 from sqlalchemy.orm import Session
 from app.models import User, Category, Shop, Product
+from app.services import bump_categories_version
 from passlib.context import CryptContext
 from decimal import Decimal
 
@@ -64,6 +65,7 @@ def seed_data(db: Session):
         Category(name="Bookstore", description="Books, magazines, and stationery")
     ]
     db.add_all(categories)
+    bump_categories_version(db)
     db.commit()
     
     # Create shops
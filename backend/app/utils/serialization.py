@@ -0,0 +1,33 @@
+"""
+Fast JSON serialization for list endpoints.
+
+FastAPI validates a handler's return value against its `response_model`,
+converts the result to Python dicts and lists, and only then encodes JSON.
+For large pages it is cheaper to have pydantic-core validate the ORM objects
+and write the JSON bytes in one pass. The output is the same.
+"""
+from functools import lru_cache
+from typing import Any, Optional
+from fastapi import Response
+from pydantic import TypeAdapter
+
+@lru_cache(maxsize=None)
+def _type_adapter(response_type: Any) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+def dump_json(response_type: Any, data: Any) -> bytes:
+    """
+    Validate data (ORM objects included) as `response_type` and serialize it straight to JSON bytes.
+    """
+    adapter = _type_adapter(response_type)
+    return adapter.dump_json(adapter.validate_python(data, from_attributes=True))
+
+def json_response(response_type: Any, data: Any, response: Optional[Response] = None) -> Response:
+    """
+    Build a JSON response from data serialized with dump_json.
+
+    Headers and status code set on the handler's injected `response` are carried over.
+    """
+    headers = dict(response.headers) if response is not None else None
+    status_code = (response.status_code if response is not None else None) or 200
+    return Response(dump_json(response_type, data), status_code=status_code, media_type="application/json", headers=headers)
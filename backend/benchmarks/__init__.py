@@ -0,0 +1,12 @@
+"""
+Load-test harness for the City Shops Platform API.
+
+Builds a large synthetic dataset, drives realistic scenarios against the app
+(in-process or through a running server) and writes p50/p95/p99 latency and
+requests per second to a JSON baseline that later runs are compared against.
+
+    python -m benchmarks seed --database-url sqlite:///./bench.db --scale medium
+    python -m benchmarks run --database-url sqlite:///./bench.db --output baseline.json
+    python -m benchmarks compare baseline.json current.json
+    python -m benchmarks serialize
+"""
@@ -0,0 +1,116 @@
+"""
+Command line entry point: python -m benchmarks {seed,run,compare} ...
+"""
+import argparse
+import os
+import sys
+
+DEFAULT_DATABASE_URL = "sqlite:///./bench.db"
+
+def seed(args) -> None:
+    from app.database import engine
+    from benchmarks.dataset import SCALES, build_dataset
+
+    spec = SCALES[args.scale]
+    print(f"Seeding {args.scale} dataset ({spec.shops} shops, {spec.shops * spec.products_per_shop} products, "
+          f"{spec.customers} customers, {spec.orders} orders)...")
+    build_dataset(engine, spec, seed=args.seed, batch_size=args.batch_size)
+    print("Done.")
+
+def run(args) -> None:
+    from app.database import engine
+    from benchmarks.runner import format_comparison, read_report, run_benchmarks, write_report
+    from benchmarks.scenarios import load_context
+
+    context = load_context(engine, users=args.concurrency, seed=args.seed)
+    meta = {"target": args.url or "in-process", "database": engine.dialect.name}
+
+    if args.url:
+        import httpx
+        with httpx.Client(base_url=args.url, timeout=60) as client:
+            report = run_benchmarks(client, context, args.scenarios, args.concurrency, args.iterations, args.warmup, args.seed, meta)
+    else:
+        from fastapi.testclient import TestClient
+        from main import app
+        with TestClient(app) as client:
+            report = run_benchmarks(client, context, args.scenarios, args.concurrency, args.iterations, args.warmup, args.seed, meta)
+
+    for scenario, result in report["scenarios"].items():
+        print(f"{scenario:<14} {result['requests']:>7} requests {result['errors']:>5} errors "
+              f"{result['rps']:>9} rps  p50 {result['p50_ms']}ms  p95 {result['p95_ms']}ms  p99 {result['p99_ms']}ms")
+    write_report(report, args.output)
+    print(f"Report written to {args.output}")
+
+    if args.baseline:
+        print(format_comparison(read_report(args.baseline), report))
+
+def compare(args) -> None:
+    from benchmarks.runner import compare_reports, format_comparison, read_report
+
+    baseline, current = read_report(args.baseline), read_report(args.current)
+    print(format_comparison(baseline, current))
+    regressions = compare_reports(baseline, current, args.threshold)
+    if regressions:
+        print(f"\nRegressions over {args.threshold}%:")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+
+def serialize(args) -> None:
+    from benchmarks.runner import write_report
+    from benchmarks.serialization import format_serialization_results, run_serialization_benchmark
+
+    results = run_serialization_benchmark(args.page_sizes, args.repeat)
+    print(format_serialization_results(results))
+    if args.output:
+        write_report({"serialization_ms_per_page": results}, args.output)
+        print(f"Report written to {args.output}")
+
+def main(argv=None) -> None:
+    # The app reads its settings at import time, so point it at the benchmark database first
+    preparser = argparse.ArgumentParser(add_help=False)
+    preparser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    os.environ["DATABASE_URL"] = preparser.parse_known_args(argv)[0].database_url
+
+    from benchmarks.scenarios import SCENARIOS
+    from benchmarks.dataset import SCALES
+
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="City Shops Platform API benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    seed_parser = commands.add_parser("seed", help="build the synthetic dataset")
+    seed_parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    seed_parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    seed_parser.add_argument("--seed", type=int, default=42)
+    seed_parser.add_argument("--batch-size", type=int, default=5_000)
+    seed_parser.set_defaults(func=seed)
+
+    run_parser = commands.add_parser("run", help="run scenarios and write a report")
+    run_parser.add_argument("--database-url", default=DEFAULT_DATABASE_URL)
+    run_parser.add_argument("--url", help="base URL of a running server (default: run the app in-process)")
+    run_parser.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    run_parser.add_argument("--concurrency", type=int, default=8)
+    run_parser.add_argument("--iterations", type=int, default=50, help="iterations per virtual user")
+    run_parser.add_argument("--warmup", type=int, default=2, help="untimed iterations per virtual user")
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--output", default="benchmark-report.json")
+    run_parser.add_argument("--baseline", help="report to print a comparison against")
+    run_parser.set_defaults(func=run)
+
+    compare_parser = commands.add_parser("compare", help="compare two reports; exits 1 on regressions")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=10.0, help="allowed change in percent")
+    compare_parser.set_defaults(func=compare)
+
+    serialize_parser = commands.add_parser("serialize", help="compare JSON serialization paths for list pages")
+    serialize_parser.add_argument("--page-sizes", nargs="+", type=int, default=[100, 1_000])
+    serialize_parser.add_argument("--repeat", type=int, default=5)
+    serialize_parser.add_argument("--output", help="write the timings to a JSON file")
+    serialize_parser.set_defaults(func=serialize)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
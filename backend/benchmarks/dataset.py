@@ -0,0 +1,20 @@
+"""
+Benchmark dataset scales, built with the synthetic data generator.
+"""
+from typing import Dict
+from sqlalchemy.engine import Engine
+from app.utils.data_generator import CUSTOMER_PREFIX, OWNER_PREFIX, GeneratorSpec, generate_data
+
+DatasetSpec = GeneratorSpec
+
+SCALES: Dict[str, DatasetSpec] = {
+    "small": DatasetSpec(shops=20, products_per_shop=100, customers=200, orders=2_000, carts=50),
+    "medium": DatasetSpec(shops=1_000, products_per_shop=100, customers=10_000, orders=100_000, carts=2_000),
+    "large": DatasetSpec(shops=5_000, products_per_shop=100, customers=50_000, orders=500_000, carts=10_000),
+}
+
+def build_dataset(engine: Engine, spec: DatasetSpec, seed: int = 42, batch_size: int = 5_000) -> None:
+    """
+    Insert a deterministic synthetic dataset of the given size.
+    """
+    generate_data(engine, spec, seed=seed, batch_size=batch_size, progress=print)
@@ -0,0 +1,160 @@
+"""
+Run scenarios with concurrent virtual users and summarize their samples.
+"""
+import json
+import math
+import platform
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+from benchmarks.scenarios import SCENARIOS, BenchmarkContext, Sample, VirtualUser
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """
+    Nearest-rank percentile of already sorted values.
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+def summarize(samples: Sequence[Sample], elapsed: float) -> dict:
+    """
+    Latency percentiles (milliseconds), throughput and error count of a set of samples.
+    """
+    latencies = sorted(sample.latency for sample in samples)
+    errors = sum(1 for sample in samples if sample.status_code >= 400)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "rps": round(len(samples) / elapsed, 2) if elapsed > 0 else 0.0,
+        "mean_ms": round(1000 * sum(latencies) / len(latencies), 3) if latencies else 0.0,
+        "p50_ms": round(1000 * percentile(latencies, 0.50), 3),
+        "p95_ms": round(1000 * percentile(latencies, 0.95), 3),
+        "p99_ms": round(1000 * percentile(latencies, 0.99), 3),
+    }
+
+def run_scenario(
+    client,
+    context: BenchmarkContext,
+    scenario: str,
+    concurrency: int = 8,
+    iterations: int = 50,
+    warmup: int = 2,
+    seed: int = 42
+) -> dict:
+    """
+    Run `iterations` of a scenario on each of `concurrency` virtual users at once.
+    """
+    run_iteration = SCENARIOS[scenario]
+    users = [VirtualUser(client, context, index, seed) for index in range(concurrency)]
+    for user in users:
+        user.scenario = scenario
+    # The clock starts once every user has warmed up
+    started: List[float] = []
+    start_barrier = threading.Barrier(concurrency, action=lambda: started.append(time.perf_counter()))
+
+    def drive(user: VirtualUser) -> None:
+        try:
+            for _ in range(warmup):
+                run_iteration(user)
+        except BaseException:
+            # Release the other users instead of leaving them waiting for this one
+            start_barrier.abort()
+            raise
+        user.samples.clear()
+        start_barrier.wait()
+        for _ in range(iterations):
+            run_iteration(user)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(drive, user) for user in users]
+        for future in futures:
+            future.result()
+    elapsed = time.perf_counter() - started[0]
+
+    samples = [sample for user in users for sample in user.samples]
+    by_request: Dict[str, List[Sample]] = {}
+    for sample in samples:
+        by_request.setdefault(sample.request, []).append(sample)
+    result = summarize(samples, elapsed)
+    result["by_request"] = {name: summarize(group, elapsed) for name, group in by_request.items()}
+    return result
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def run_benchmarks(
+    client,
+    context: BenchmarkContext,
+    scenarios: Sequence[str],
+    concurrency: int = 8,
+    iterations: int = 50,
+    warmup: int = 2,
+    seed: int = 42,
+    meta: Optional[dict] = None
+) -> dict:
+    """
+    Run the given scenarios one after another and collect a baseline report.
+    """
+    report = {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(timespec="seconds") + "Z",
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "concurrency": concurrency,
+            "iterations": iterations,
+            "seed": seed,
+            **(meta or {}),
+        },
+        "scenarios": {},
+    }
+    for scenario in scenarios:
+        report["scenarios"][scenario] = run_scenario(client, context, scenario, concurrency, iterations, warmup, seed)
+    return report
+
+def compare_reports(baseline: dict, current: dict, threshold: float = 10.0) -> List[str]:
+    """
+    List the scenarios whose p95 latency grew, or whose throughput fell, by more than `threshold` percent.
+    """
+    regressions = []
+    for scenario, before in baseline["scenarios"].items():
+        after = current["scenarios"].get(scenario)
+        if after is None:
+            continue
+        if before["p95_ms"] and 100 * (after["p95_ms"] - before["p95_ms"]) / before["p95_ms"] > threshold:
+            regressions.append(f"{scenario}: p95 {before['p95_ms']}ms -> {after['p95_ms']}ms")
+        if before["rps"] and 100 * (before["rps"] - after["rps"]) / before["rps"] > threshold:
+            regressions.append(f"{scenario}: rps {before['rps']} -> {after['rps']}")
+    return regressions
+
+def format_comparison(baseline: dict, current: dict) -> str:
+    """
+    Render a side-by-side table of two reports.
+    """
+    lines = [f"{'scenario':<14} {'metric':<8} {'baseline':>12} {'current':>12} {'change':>9}"]
+    for scenario, before in baseline["scenarios"].items():
+        after = current["scenarios"].get(scenario)
+        if after is None:
+            continue
+        for metric in ("rps", "p50_ms", "p95_ms", "p99_ms"):
+            change = 100 * (after[metric] - before[metric]) / before[metric] if before[metric] else 0.0
+            lines.append(f"{scenario:<14} {metric:<8} {before[metric]:>12} {after[metric]:>12} {change:>+8.1f}%")
+    return "\n".join(lines)
+
+def write_report(report: dict, path: str) -> None:
+    with open(path, "w") as output:
+        json.dump(report, output, indent=2, sort_keys=True)
+        output.write("\n")
+
+def read_report(path: str) -> dict:
+    with open(path) as source:
+        return json.load(source)
@@ -0,0 +1,126 @@
+"""
+Benchmark scenarios: the request sequences a virtual user performs.
+
+Each scenario takes a VirtualUser and runs one iteration; every request it
+makes is timed by VirtualUser.request.
+"""
+import random
+import time
+from datetime import timedelta
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from app.models import User, Category, Product
+from app.services import auth_service
+from benchmarks.dataset import CUSTOMER_PREFIX, OWNER_PREFIX
+
+class Sample(NamedTuple):
+    scenario: str
+    request: str
+    status_code: int
+    latency: float
+
+class BenchmarkContext(NamedTuple):
+    customer_tokens: List[str]
+    owner_tokens: List[str]
+    category_ids: List[int]
+    # (product id, shop id) pairs of available products
+    products: List[Tuple[int, int]]
+
+def _token(user) -> str:
+    return auth_service.create_access_token(
+        data={"sub": user.username, "id": user.id, "role": user.role},
+        expires_delta=timedelta(hours=12)
+    )
+
+def load_context(engine: Engine, users: int, product_sample: int = 10_000, seed: int = 42) -> BenchmarkContext:
+    """
+    Pick the benchmark users and a sample of products from a seeded database.
+    """
+    with engine.connect() as connection:
+        customers = connection.execute(
+            select(User.id, User.username, User.role)
+            .where(User.username.like(f"{CUSTOMER_PREFIX}%")).order_by(User.id).limit(users)
+        ).all()
+        owners = connection.execute(
+            select(User.id, User.username, User.role)
+            .where(User.username.like(f"{OWNER_PREFIX}%")).order_by(User.id).limit(users)
+        ).all()
+        category_ids = list(connection.execute(select(Category.id)).scalars())
+        # Every n-th product, so the sample spreads over all shops
+        stride = max((connection.execute(select(func.max(Product.id))).scalar() or 0) // product_sample, 1)
+        products = [tuple(row) for row in connection.execute(
+            select(Product.id, Product.shop_id)
+            .where(Product.is_available == True, Product.stock_quantity >= 100_000, Product.id % stride == 0)
+            .order_by(Product.id).limit(product_sample)
+        )]
+
+    if not customers or not owners or not products:
+        raise RuntimeError("No benchmark data found: run `python -m benchmarks seed` first")
+
+    random.Random(seed).shuffle(products)
+    return BenchmarkContext(
+        customer_tokens=[_token(user) for user in customers],
+        owner_tokens=[_token(user) for user in owners],
+        category_ids=category_ids,
+        products=products
+    )
+
+class VirtualUser:
+    """
+    A simulated client: one customer, one shop owner and an HTTP client shared by all users.
+    """
+
+    def __init__(self, client, context: BenchmarkContext, index: int, seed: int = 42):
+        self.client = client
+        self.context = context
+        self.rng = random.Random(seed + index)
+        self.customer_headers = {"Authorization": f"Bearer {context.customer_tokens[index % len(context.customer_tokens)]}"}
+        self.owner_headers = {"Authorization": f"Bearer {context.owner_tokens[index % len(context.owner_tokens)]}"}
+        self.samples: List[Sample] = []
+        self.scenario = ""
+
+    def request(self, name: str, method: str, url: str, headers: Optional[dict] = None, **kwargs):
+        start = time.perf_counter()
+        response = self.client.request(method, url, headers=headers, **kwargs)
+        self.samples.append(Sample(self.scenario, name, response.status_code, time.perf_counter() - start))
+        return response
+
+    def product(self) -> Tuple[int, int]:
+        return self.rng.choice(self.context.products)
+
+def browse(user: VirtualUser) -> None:
+    """Catalog browsing: categories, a filtered product page, a product and its shop."""
+    product_id, shop_id = user.product()
+    user.request("list categories", "GET", "/categories/")
+    user.request("list products", "GET", "/products/", params={
+        "category_id": user.rng.choice(user.context.category_ids), "in_stock": True, "sort": "price", "limit": 20
+    })
+    user.request("get product", "GET", f"/products/{product_id}")
+    user.request("get shop", "GET", f"/shops/{shop_id}")
+
+def add_to_cart(user: VirtualUser) -> None:
+    """Add a product to the cart, view the cart and empty it again."""
+    product_id, _ = user.product()
+    user.request("add to cart", "POST", "/cart/items", headers=user.customer_headers, json={"product_id": product_id, "quantity": 1})
+    user.request("get cart", "GET", "/cart/", headers=user.customer_headers)
+    user.request("clear cart", "DELETE", "/cart/", headers=user.customer_headers)
+
+def checkout(user: VirtualUser) -> None:
+    """Fill the cart with a product and place an order for its shop."""
+    product_id, shop_id = user.product()
+    user.request("add to cart", "POST", "/cart/items", headers=user.customer_headers, json={"product_id": product_id, "quantity": 1})
+    user.request("create order", "POST", "/orders/", headers=user.customer_headers, json={
+        "shop_id": shop_id, "delivery_address": "1 Benchmark Street"
+    })
+
+def owner_orders(user: VirtualUser) -> None:
+    """A shop owner reading the first page of their orders."""
+    user.request("list orders", "GET", "/orders/", headers=user.owner_headers, params={"limit": 20})
+
+SCENARIOS: Dict[str, Callable[[VirtualUser], None]] = {
+    "browse": browse,
+    "add_to_cart": add_to_cart,
+    "checkout": checkout,
+    "owner_orders": owner_orders,
+}
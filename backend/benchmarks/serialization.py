@@ -0,0 +1,73 @@
+"""
+Serialization micro-benchmark for list pages.
+
+Compares, for pages of ORM products:
+- stdlib: FastAPI's default path (validate, dump to Python, json.dumps)
+- orjson: the same with orjson as the encoder (the app's default response class)
+- pydantic_json: validation and JSON bytes in one pass (app.utils.serialization.dump_json)
+"""
+import json
+import timeit
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Dict, List, Sequence
+import orjson
+from pydantic import TypeAdapter
+from app.models import Product
+from app.schemas import ProductResponse
+from app.utils.serialization import dump_json
+
+PAGE_SIZES = (100, 1_000)
+
+def make_products(count: int) -> List[Product]:
+    """
+    Build detached ORM products, as a list query would return them.
+    """
+    now = datetime(2024, 1, 1)
+    return [
+        Product(
+            id=index, shop_id=index % 50 + 1, name=f"Product {index}",
+            description=f"A fairly typical product description for product number {index}.",
+            price=Decimal(index % 10_000 + 99) / 100, category_id=index % 12 + 1,
+            image_url=f"https://cdn.example.com/products/{index}.jpg", stock_quantity=index % 500,
+            is_available=True, created_at=now - timedelta(minutes=index)
+        )
+        for index in range(1, count + 1)
+    ]
+
+def _stdlib(adapter: TypeAdapter, products) -> bytes:
+    content = adapter.dump_python(adapter.validate_python(products, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+def _orjson(adapter: TypeAdapter, products) -> bytes:
+    content = adapter.dump_python(adapter.validate_python(products, from_attributes=True), mode="json")
+    return orjson.dumps(content)
+
+def run_serialization_benchmark(page_sizes: Sequence[int] = PAGE_SIZES, repeat: int = 5) -> Dict[str, Dict[str, float]]:
+    """
+    Best-of-`repeat` milliseconds per page for each serialization path and page size.
+    """
+    adapter = TypeAdapter(List[ProductResponse])
+    results = {}
+    for size in page_sizes:
+        products = make_products(size)
+        paths = {
+            "stdlib": lambda: _stdlib(adapter, products),
+            "orjson": lambda: _orjson(adapter, products),
+            "pydantic_json": lambda: dump_json(List[ProductResponse], products),
+        }
+        number = max(10_000 // size, 5)
+        results[str(size)] = {
+            name: round(1000 * min(timeit.repeat(path, number=number, repeat=repeat)) / number, 4)
+            for name, path in paths.items()
+        }
+    return results
+
+def format_serialization_results(results: Dict[str, Dict[str, float]]) -> str:
+    lines = [f"{'items':>6} {'stdlib ms':>10} {'orjson ms':>10} {'pydantic ms':>12} {'speedup':>8}"]
+    for size, timings in results.items():
+        speedup = timings["stdlib"] / timings["pydantic_json"] if timings["pydantic_json"] else 0.0
+        lines.append(
+            f"{size:>6} {timings['stdlib']:>10} {timings['orjson']:>10} {timings['pydantic_json']:>12} {speedup:>7.1f}x"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,59 @@
+import argparse
+import os
+import sys
+import time
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fill the database with high-volume synthetic data")
+    parser.add_argument("--database-url", help="target database (default: DATABASE_URL)")
+    parser.add_argument("--shops", type=int, default=1_000, help="shops, one owner each")
+    parser.add_argument("--products-per-shop", type=int, default=100)
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--orders", type=int, default=1_000_000)
+    parser.add_argument("--carts", type=int, default=20_000, help="customers with a non-empty cart")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch-size", type=int, default=5_000, help="rows per INSERT executemany")
+    parser.add_argument("--anchor", help="date the generated timestamps count back from (YYYY-MM-DD, default: today)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    """
+    Initialize the database and fill it with synthetic data
+    """
+    args = parse_args(argv)
+    if args.database_url:
+        # Settings are read at import time, so override the URL before importing the app
+        os.environ["DATABASE_URL"] = args.database_url
+
+    from datetime import datetime
+    from app.database import engine
+    from app.utils.db_init import create_database
+    from app.utils.data_generator import GeneratorSpec, generate_data
+
+    print("Initializing database...")
+    create_database()
+
+    spec = GeneratorSpec(
+        shops=args.shops,
+        products_per_shop=args.products_per_shop,
+        customers=args.customers,
+        orders=args.orders,
+        carts=args.carts
+    )
+    anchor = datetime.strptime(args.anchor, "%Y-%m-%d") if args.anchor else None
+
+    start = time.perf_counter()
+    counts = generate_data(engine, spec, seed=args.seed, batch_size=args.batch_size, anchor=anchor, progress=print)
+    elapsed = time.perf_counter() - start
+
+    total = sum(counts.values())
+    print(f"Generated {total} rows in {elapsed:.1f}s ({total / elapsed:.0f} rows/s)")
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
-from contextlib import asynccontextmanager
+from contextlib import asynccontextmanager, suppress
+import asyncio
+import time
+import anyio.to_thread
 import uvicorn
 from dotenv import load_dotenv
 
@@ -9,36 +13,80 @@ load_dotenv()
 
 # Import routers
 from app.routers import auth_router, shops_router, products_router, categories_router, cart_router, orders_router, users_router
-from app.utils.db_init import create_database
-from app.utils.optimize_db import add_database_indexes
-from app.database import engine, Base
+from app.services import get_password_hash_stats, release_expired_reservations
+from app.database import engine, read_engine, replica_engines, SessionLocal
+from app.config import settings
+from app.utils.pagination import NEXT_CURSOR_HEADER
+from app.utils.compression import CompressionMiddleware
+from app.utils.metrics import MetricsMiddleware, gauge_lines, instrument_engine, register_collector, render_metrics
+from app.utils.schema import check_schema_version
+
+def _release_expired_reservations() -> int:
+    db = SessionLocal()
+    try:
+        return release_expired_reservations(db)
+    finally:
+        db.close()
+
+async def sweep_stock_reservations(interval: float):
+    """
+    Periodically delete expired stock holds, in a worker thread so the event loop never blocks.
+    
+    Expired holds already stop counting against stock; sweeping keeps the table and its index small.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            released = await anyio.to_thread.run_sync(_release_expired_reservations)
+            if released:
+                print(f"Released {released} expired stock reservations")
+        except Exception as e:
+            print(f"Stock reservation sweep failed: {e}")
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     print("Starting up City Shops Platform API...")
+    started = time.perf_counter()
+    phases = []
     
-    # Initialize database
-    print("Initializing database...")
-    create_database()
+    def phase_done(name: str, since: float) -> float:
+        now = time.perf_counter()
+        phases.append(f"{name} {(now - since) * 1000:.1f} ms")
+        return now
     
-    # Create tables if they don't exist
-    print("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
+    # Size the threadpool that runs the database-bound handlers
+    anyio.to_thread.current_default_thread_limiter().total_tokens = settings.THREADPOOL_SIZE
+    print(f"Threadpool size: {settings.THREADPOOL_SIZE}")
+    mark = phase_done("threadpool", started)
     
-    # Optimize database with indexes
-    print("Optimizing database with indexes...")
-    add_database_indexes()
+    # The schema is managed by the Alembic migrations: only check its revision
+    revision = check_schema_version(engine, migrate=settings.MIGRATE_ON_STARTUP)
+    print(f"Database schema revision: {revision}")
+    mark = phase_done("schema check", mark)
     
+    # Release expired cart stock holds in the background
+    sweeper = None
+    if settings.RESERVATION_SWEEP_INTERVAL_SECONDS > 0:
+        sweeper = asyncio.create_task(sweep_stock_reservations(settings.RESERVATION_SWEEP_INTERVAL_SECONDS))
+    phase_done("background tasks", mark)
+    
+    print(f"Started in {(time.perf_counter() - started) * 1000:.1f} ms ({', '.join(phases)})")
     yield
     # Shutdown
     print("Shutting down City Shops Platform API...")
+    if sweeper is not None:
+        sweeper.cancel()
+        with suppress(asyncio.CancelledError):
+            await sweeper
 
 app = FastAPI(
     title="City Shops Platform API",
     description="API for the City Shops Platform - connecting local shops with customers",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    # orjson encodes responses several times faster than the stdlib json module
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -48,8 +96,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, "ETag"],
+)
+
+# Compress responses for clients that accept it
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    thread_size=settings.COMPRESSION_THREAD_SIZE,
+    cache_size=settings.COMPRESSION_CACHE_SIZE,
+    encodings=settings.COMPRESSION_ENCODINGS,
 )
 
+# Record per-route request, latency and SQL metrics
+app.add_middleware(MetricsMiddleware)
+
+# Report connection pool and password hashing pool stats on /metrics
+instrument_engine(engine, "primary")
+if read_engine is not engine:
+    # SQLite file profile: the reader pool next to the single writer connection
+    instrument_engine(read_engine, "reader")
+for index, replica_engine in enumerate(replica_engines):
+    instrument_engine(replica_engine, f"replica{index}")
+
+def _password_hash_metrics():
+    stats = get_password_hash_stats()
+    return (
+        gauge_lines("password_hash_workers", "Size of the password hashing pool.", stats["workers"])
+        + gauge_lines("password_hash_in_flight", "Password hash operations running.", stats["in_flight"])
+        + gauge_lines("password_hash_queued", "Password hash operations waiting for a worker.", stats["queued"])
+    )
+
+register_collector(_password_hash_metrics)
+
 # Include routers
 app.include_router(auth_router)
 app.include_router(shops_router)
@@ -67,5 +146,9 @@ async def root():
 async def health_check():
     return {"status": "healthy"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
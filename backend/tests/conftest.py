@@ -1,11 +1,18 @@
+import os
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.pool import StaticPool
-from app.database import Base, get_db
+
+# The app's startup checks the schema of DATABASE_URL; let it migrate a fresh test database
+os.environ.setdefault("MIGRATE_ON_STARTUP", "True")
+
+from app.database import Base, get_db, get_primary_read_db, get_read_db
 from main import app
-from app.utils.auth_middleware import get_current_user, get_customer, get_shop_owner
+from app.utils.auth_middleware import get_current_user, get_customer, get_shop_owner, user_cache
+from app.services import clear_cart_cache, invalidate_category_cache
+from app.utils.query_stats import count_queries
 
 # Import fixtures from test_fixtures.py
 from tests.test_fixtures import (
@@ -22,6 +29,28 @@ engine = create_engine(
 )
 TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+@pytest.fixture(autouse=True)
+def clear_caches():
+    # Each test recreates the database, so cached rows must not leak between tests
+    user_cache.clear()
+    clear_cart_cache()
+    invalidate_category_cache()
+    yield
+    user_cache.clear()
+    clear_cart_cache()
+    invalidate_category_cache()
+
+@pytest.fixture
+def query_counter():
+    """
+    Count the SQL statements a block executes, to pin query budgets:
+    
+        with query_counter() as queries:
+            auth_client.get("/orders/")
+        assert queries.count <= 3, queries
+    """
+    return count_queries
+
 @pytest.fixture(scope="function")
 def db_session():
     # Create tables
@@ -39,7 +68,7 @@ def db_session():
 
 @pytest.fixture(scope="function")
 def client(db_session):
-    # Override the get_db dependency to use the test database
+    # Override the session dependencies to use the test database
     def override_get_db():
         try:
             yield db_session
@@ -47,6 +76,8 @@ def client(db_session):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_primary_read_db] = override_get_db
+    app.dependency_overrides[get_read_db] = override_get_db
     
     with TestClient(app) as test_client:
         yield test_client
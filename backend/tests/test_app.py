@@ -0,0 +1,127 @@
+import inspect
+import pytest
+from decimal import Decimal
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, exc
+from sqlalchemy.pool import QueuePool
+from app.database import get_db, get_primary_read_db, get_read_db
+from app.models import Product
+from app.utils.auth_middleware import get_current_user
+from app.utils.compression import CODECS, CompressionMiddleware, negotiate_encoding
+from app.utils.metrics import instrument_engine, render_metrics
+from main import app
+
+# Async handlers that await the password hashing pool and run their queries with run_in_threadpool
+OFFLOADING_HANDLERS = {"/auth/signup", "/auth/login", "/users/me/password"}
+
+def test_db_bound_handlers_run_in_threadpool():
+    """Test that handlers using the synchronous session are not declared async, unless they offload their queries"""
+    db_routes = [
+        route for route in app.routes
+        if isinstance(route, APIRoute) and any(dep.call in (get_db, get_primary_read_db, get_read_db) for dep in route.dependant.dependencies)
+    ]
+    
+    assert db_routes
+    async_paths = {route.path for route in db_routes if inspect.iscoroutinefunction(route.endpoint)}
+    assert async_paths == OFFLOADING_HANDLERS, "async handlers using the session block the event loop"
+    
+    assert not inspect.iscoroutinefunction(get_current_user)
+
+def test_metrics_endpoint(client, test_products):
+    """Test that requests are reported per route with their SQL statement counts"""
+    assert client.get("/health").status_code == 200
+    assert client.get(f"/products/{test_products[0].id}").status_code == 200
+    
+    response = client.get("/metrics")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert 'http_requests_total{method="GET",route="/health",status="200"}' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/products/{product_id}",le="+Inf"}' in body
+    # Reading one product never issues more than one statement
+    samples = dict(line.rsplit(" ", 1) for line in body.splitlines() if not line.startswith("#"))
+    route = 'method="GET",route="/products/{product_id}"'
+    assert int(samples[f'http_request_db_statements_bucket{{{route},le="1"}}']) >= 1
+    assert samples[f'http_request_db_statements_bucket{{{route},le="1"}}'] == samples[f'http_request_db_statements_count{{{route}}}']
+    assert f'http_requests_in_flight{{{route}}} 0' in body
+    assert "password_hash_workers" in body
+
+def test_pool_checkout_wait_metrics(tmp_path):
+    """Test that pool checkouts report how long they waited, and the ones that timed out"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool, pool_size=1, max_overflow=0, pool_timeout=0.2)
+    instrument_engine(engine, "wait_test")
+    
+    with engine.connect():
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    engine.dispose()
+    
+    samples = dict(line.rsplit(" ", 1) for line in render_metrics().splitlines() if not line.startswith("#"))
+    assert samples['db_pool_checkout_timeouts_total{engine="wait_test"}'] == "1"
+    assert samples['db_pool_checkout_wait_seconds_count{engine="wait_test"}'] == "2"
+    assert float(samples['db_pool_checkout_wait_seconds_sum{engine="wait_test"}']) >= 0.2
+    assert samples['db_pool_checkout_wait_seconds_bucket{engine="wait_test",le="0.1"}'] == "1"
+
+def test_response_compression(client, db_session, test_shop, test_categories):
+    """Test that large JSON responses are compressed for clients accepting it, and small ones are not"""
+    db_session.add_all([
+        Product(shop_id=test_shop.id, name=f"Product {index}", price=Decimal("9.99"),
+                category_id=test_categories[0].id, stock_quantity=10, is_available=True)
+        for index in range(50)
+    ])
+    db_session.commit()
+    
+    response = client.get("/products/", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert len(response.json()) == 50
+    
+    response = client.get("/products/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    
+    response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+
+def test_negotiate_encoding():
+    """Test Accept-Encoding negotiation with q-values and server preference"""
+    preferred = ["zstd", "br", "gzip"]
+    assert negotiate_encoding("gzip, deflate, br", preferred) == "br"
+    assert negotiate_encoding("gzip;q=1.0, br;q=0.5", preferred) == "gzip"
+    assert negotiate_encoding("*", preferred) == "zstd"
+    assert negotiate_encoding("gzip;q=0", preferred) is None
+    assert negotiate_encoding("deflate", preferred) is None
+    assert negotiate_encoding(None, preferred) is None
+
+def test_compression_streams_and_reuses_etag_bodies(monkeypatch):
+    """Test streamed compression off the event loop and reuse of compressed ETag responses"""
+    compressions = []
+    compress, stream = CODECS["gzip"]
+    monkeypatch.setitem(CODECS, "gzip", (lambda data: compressions.append(data) or compress(data), stream))
+    
+    demo = FastAPI()
+    
+    @demo.get("/stream")
+    def stream_rows():
+        return StreamingResponse((f"line {index}\n".encode() * 100 for index in range(20)), media_type="text/csv")
+    
+    @demo.get("/page")
+    def page():
+        return Response(b'{"items": "' + b"x" * 5000 + b'"}', media_type="application/json", headers={"ETag": 'W/"v1"'})
+    
+    demo.add_middleware(CompressionMiddleware, thread_size=1, cache_size=8, encodings=["gzip"])
+    demo_client = TestClient(demo)
+    
+    response = demo_client.get("/stream", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert response.text == "".join(f"line {index}\n" * 100 for index in range(20))
+    
+    first = demo_client.get("/page", headers={"Accept-Encoding": "gzip"})
+    second = demo_client.get("/page", headers={"Accept-Encoding": "gzip"})
+    assert first.json() == second.json()
+    assert second.headers["content-encoding"] == "gzip"
+    assert len(compressions) == 1
@@ -1,3 +1,8 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import anyio.to_thread
 import pytest
 from app.services import auth_service
 from app.models import User
@@ -90,6 +95,19 @@ def test_login_invalid_credentials(client, test_user):
     assert response.status_code == 401
     assert "Incorrect username or password" in response.json()["detail"]
 
+def test_change_password_then_login(client, test_user):
+    """Test the async password endpoints end to end: log in, change the password, log in with it"""
+    token = client.post("/auth/login", data={"username": "testuser", "password": "password123"}).json()["access_token"]
+    response = client.put(
+        "/users/me/password",
+        headers={"Authorization": f"Bearer {token}"},
+        json={"current_password": "password123", "new_password": "newpassword123"}
+    )
+    assert response.status_code == 200
+    
+    assert client.post("/auth/login", data={"username": "testuser", "password": "password123"}).status_code == 401
+    assert client.post("/auth/login", data={"username": "test@example.com", "password": "newpassword123"}).status_code == 200
+
 def test_get_current_user(client, test_user):
     """Test getting current user information"""
     # First login to get token
@@ -117,4 +135,85 @@ def test_get_current_user_invalid_token(client):
         headers={"Authorization": "Bearer invalidtoken"}
     )
     assert response.status_code == 401
-    assert "Could not validate credentials" in response.json()["detail"]
\ No newline at end of file
+    assert "Could not validate credentials" in response.json()["detail"]
+
+class SlowContext:
+    """Stand-in for the bcrypt context that records how many hashes run at once"""
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.active = 0
+        self.peak = 0
+    
+    def hash(self, password):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(0.02)
+        with self.lock:
+            self.active -= 1
+        return f"hashed-{password}"
+
+def test_password_hashing_concurrency_is_bounded(monkeypatch):
+    """Test that bcrypt work is limited to the hashing pool size"""
+    context = SlowContext()
+    monkeypatch.setattr(auth_service, "pwd_context", context)
+    workers = auth_service.get_password_hash_stats()["workers"]
+    
+    with ThreadPoolExecutor(max_workers=workers + 4) as pool:
+        results = list(pool.map(auth_service.get_password_hash, ["secret"] * (workers + 4)))
+    
+    assert results == ["hashed-secret"] * (workers + 4)
+    assert context.peak <= workers
+    assert auth_service.get_password_hash_stats() == {"workers": workers, "in_flight": 0, "queued": 0}
+
+def test_async_password_hashing_holds_no_worker_threads(monkeypatch):
+    """Test that awaiting the hashing pool is bounded and borrows no request worker threads"""
+    context = SlowContext()
+    monkeypatch.setattr(auth_service, "pwd_context", context)
+    workers = auth_service.get_password_hash_stats()["workers"]
+    
+    async def main():
+        hashes = asyncio.gather(*(auth_service.get_password_hash_async("secret") for _ in range(workers + 4)))
+        await asyncio.sleep(0.01)
+        stats = auth_service.get_password_hash_stats()
+        borrowed = anyio.to_thread.current_default_thread_limiter().borrowed_tokens
+        return await hashes, stats, borrowed
+    
+    results, stats, borrowed = asyncio.run(main())
+    
+    assert results == ["hashed-secret"] * (workers + 4)
+    assert stats == {"workers": workers, "in_flight": workers, "queued": 4}
+    assert borrowed == 0
+    assert context.peak <= workers
+
+def test_get_current_user_uses_cache(client, customer_token, test_user):
+    """Test that authenticated users are cached by the token's user id"""
+    from app.utils.auth_middleware import user_cache
+    
+    headers = {"Authorization": f"Bearer {customer_token}"}
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    assert user_cache.get(test_user.id)["username"] == "testuser"
+    
+    response = client.get("/auth/me", headers=headers)
+    assert response.status_code == 200
+    assert response.json()["username"] == "testuser"
+
+def test_profile_update_invalidates_cached_user(client, customer_token):
+    """Test that profile changes are visible to the next authenticated request"""
+    headers = {"Authorization": f"Bearer {customer_token}"}
+    assert client.get("/auth/me", headers=headers).json()["first_name"] == "Test"
+    
+    response = client.put("/users/me", json={"first_name": "Changed"}, headers=headers)
+    assert response.status_code == 200
+    
+    assert client.get("/auth/me", headers=headers).json()["first_name"] == "Changed"
+
+def test_deleted_user_is_not_served_from_cache(client, customer_token):
+    """Test that a deleted account can no longer authenticate"""
+    headers = {"Authorization": f"Bearer {customer_token}"}
+    assert client.get("/auth/me", headers=headers).status_code == 200
+    
+    assert client.delete("/users/me", headers=headers).status_code == 200
+    
+    assert client.get("/auth/me", headers=headers).status_code == 401
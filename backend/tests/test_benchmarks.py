@@ -0,0 +1,37 @@
+from typing import List
+from pydantic import TypeAdapter
+from app.schemas import ProductResponse
+from app.utils.serialization import dump_json
+from benchmarks.dataset import DatasetSpec, build_dataset
+from benchmarks.runner import compare_reports, percentile, run_scenario
+from benchmarks.scenarios import SCENARIOS, load_context
+from benchmarks.serialization import _orjson, _stdlib, make_products
+from tests.conftest import engine
+
+def test_benchmark_scenarios_run_without_errors(client, db_session):
+    """Test that every scenario runs cleanly against a freshly built dataset"""
+    build_dataset(engine, DatasetSpec(shops=3, products_per_shop=5, customers=4, orders=10), batch_size=4)
+    context = load_context(engine, users=2)
+    
+    assert len(context.customer_tokens) == 2
+    for scenario in SCENARIOS:
+        result = run_scenario(client, context, scenario, concurrency=1, iterations=2, warmup=1)
+        assert result["requests"] > 0
+        assert result["errors"] == 0, scenario
+        assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+
+def test_benchmark_report_comparison():
+    """Test percentile ranks and regression detection between reports"""
+    assert percentile([1, 2, 3, 4], 0.5) == 2
+    assert percentile([1, 2, 3, 4], 0.99) == 4
+    
+    baseline = {"scenarios": {"browse": {"p95_ms": 10.0, "rps": 100.0}}}
+    assert compare_reports(baseline, {"scenarios": {"browse": {"p95_ms": 10.5, "rps": 98.0}}}) == []
+    assert len(compare_reports(baseline, {"scenarios": {"browse": {"p95_ms": 20.0, "rps": 50.0}}})) == 2
+
+def test_serialization_paths_produce_the_same_json():
+    """Test that the one-pass pydantic serialization matches FastAPI's default output"""
+    products = make_products(20)
+    adapter = TypeAdapter(List[ProductResponse])
+    
+    assert dump_json(List[ProductResponse], products) == _orjson(adapter, products) == _stdlib(adapter, products)
@@ -1,8 +1,86 @@
 import pytest
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from fastapi.testclient import TestClient
-from app.models import Cart
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+from app.database import Base, get_db, get_primary_read_db
+from app.models import Cart, Category, Product, Shop, StockReservation, User
+from app.routers import cart as cart_router_module
+from app.schemas import ProductUpdate
+from app.services import bump_cart_version, create_access_token, hold_stock, release_expired_reservations, update_product
+from main import app
 from decimal import Decimal
 
+@pytest.fixture
+def other_customer(db_session):
+    """Fixture for a second customer whose cart competes for the same stock"""
+    user = User(email="other@example.com", username="othercustomer", password_hash="x", role="customer")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+@pytest.fixture
+def file_sessions(tmp_path):
+    """Fixture routing requests to a file database with a connection per session, so they really run concurrently"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'cart.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+        poolclass=NullPool
+    )
+    Base.metadata.create_all(bind=engine)
+    FileSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    
+    def override_get_db():
+        db = FileSession()
+        try:
+            yield db
+        finally:
+            db.close()
+    
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_primary_read_db] = override_get_db
+    yield FileSession
+    app.dependency_overrides = {}
+    engine.dispose()
+
+def seed_racing_carts(FileSession, customers, stock):
+    """Create a product with `stock` units and customers racing for it; returns its id and their tokens"""
+    with FileSession() as db:
+        owner = User(email="o@example.com", username="owner", password_hash="x", role="shop_owner")
+        category = Category(name="Bakery")
+        db.add_all([owner, category])
+        db.flush()
+        shop = Shop(owner_id=owner.id, name="Bakery", category_id=category.id, address="1 Main St")
+        db.add(shop)
+        db.flush()
+        product = Product(shop_id=shop.id, name="Croissant", price=Decimal("2.50"),
+                          category_id=category.id, stock_quantity=stock, is_available=True)
+        users = [
+            User(email=f"buyer{index}@example.com", username=f"buyer{index}", password_hash="x", role="customer")
+            for index in range(customers)
+        ]
+        db.add_all([product, *users])
+        db.commit()
+        tokens = [create_access_token(data={"sub": user.username, "id": user.id, "role": "customer"}) for user in users]
+        return product.id, tokens
+
+def race_holds(monkeypatch, requests, send, hold="hold_stock"):
+    """Send requests concurrently, holding each between its stock check and its hold; returns the statuses"""
+    barrier = threading.Barrier(requests, timeout=30)
+    hold_function = getattr(cart_router_module, hold)
+    
+    def racing_hold(*args, **kwargs):
+        barrier.wait()
+        return hold_function(*args, **kwargs)
+    
+    monkeypatch.setattr(cart_router_module, hold, racing_hold)
+    client = TestClient(app, raise_server_exceptions=False)
+    with ThreadPoolExecutor(max_workers=requests) as pool:
+        return list(pool.map(lambda index: send(client, index).status_code, range(requests)))
+
 def test_get_empty_cart(auth_client, test_user):
     """Test getting an empty cart"""
     response = auth_client.get("/cart/")
@@ -136,6 +214,236 @@ def test_add_to_cart_insufficient_stock(auth_client, test_products):
     assert response.status_code == 400
     assert "Not enough stock" in response.json()["detail"]
 
+def test_add_to_cart_holds_stock(auth_client, test_products, db_session, test_user, other_customer):
+    """Test that cart holds reserve stock against other carts until the item is removed"""
+    product = test_products[0]
+    hold_stock(db_session, other_customer.id, product.id, 5)
+    db_session.commit()
+    
+    response = auth_client.post("/cart/items", json={"product_id": product.id, "quantity": 4})
+    assert response.status_code == 201
+    item_id = response.json()["id"]
+    
+    hold = db_session.query(StockReservation).filter(StockReservation.user_id == test_user.id).one()
+    assert hold.product_id == product.id
+    assert hold.quantity == 4
+    assert hold.expires_at > datetime.utcnow()
+    
+    # 4 already in the cart + 2 is more than the 10 - 5 not held by the other cart
+    response = auth_client.post("/cart/items", json={"product_id": product.id, "quantity": 2})
+    assert response.status_code == 400
+    assert "Requested: 6, Available: 5" in response.json()["detail"]
+    
+    response = auth_client.put(f"/cart/items/{item_id}", json={"quantity": 5})
+    assert response.status_code == 200
+    db_session.expire_all()
+    assert db_session.query(StockReservation).filter(StockReservation.user_id == test_user.id).one().quantity == 5
+    
+    response = auth_client.delete(f"/cart/items/{item_id}")
+    assert response.status_code == 204
+    assert db_session.query(StockReservation).filter(StockReservation.user_id == test_user.id).count() == 0
+
+def test_concurrent_adds_never_hold_more_than_stock(file_sessions, monkeypatch):
+    """Test that carts racing for the last units never hold more than the stock, and the losers get 409"""
+    product_id, tokens = seed_racing_carts(file_sessions, customers=30, stock=10)
+    
+    statuses = race_holds(monkeypatch, len(tokens), lambda client, index: client.post(
+        "/cart/items",
+        headers={"Authorization": f"Bearer {tokens[index]}"},
+        json={"product_id": product_id, "quantity": 1}
+    ))
+    
+    with file_sessions() as db:
+        held = db.query(func.sum(StockReservation.quantity)).scalar()
+        carts = db.query(Cart).count()
+    assert statuses.count(201) == 10
+    assert statuses.count(409) == 20
+    assert held == 10
+    assert carts == 10
+
+def test_concurrent_adds_of_the_same_line(file_sessions, monkeypatch):
+    """Test that one user's concurrent adds of the same product get 409, not a unique constraint error"""
+    product_id, (token,) = seed_racing_carts(file_sessions, customers=1, stock=10)
+    
+    statuses = race_holds(monkeypatch, 5, lambda client, index: client.post(
+        "/cart/items",
+        headers={"Authorization": f"Bearer {token}"},
+        json={"product_id": product_id, "quantity": 1}
+    ))
+    
+    with file_sessions() as db:
+        cart_item = db.query(Cart).one()
+        hold = db.query(StockReservation).one()
+    assert sorted(statuses) == [201, 409, 409, 409, 409]
+    assert cart_item.quantity == hold.quantity == 1
+
+def test_concurrent_batch_updates_never_hold_more_than_stock(file_sessions, monkeypatch):
+    """Test that batch updates racing for the last units never hold more than the stock, and the losers get 409"""
+    product_id, tokens = seed_racing_carts(file_sessions, customers=20, stock=10)
+    
+    statuses = race_holds(monkeypatch, len(tokens), lambda client, index: client.patch(
+        "/cart/",
+        headers={"Authorization": f"Bearer {tokens[index]}"},
+        json={"operations": [{"op": "add", "product_id": product_id, "quantity": 1}]}
+    ), hold="hold_stocks")
+    
+    with file_sessions() as db:
+        held = db.query(func.sum(StockReservation.quantity)).scalar()
+        carts = db.query(Cart).count()
+    assert statuses.count(200) == 10
+    assert statuses.count(409) == 10
+    assert held == 10
+    assert carts == 10
+
+def test_expired_holds_are_ignored_and_swept(auth_client, test_products, db_session, other_customer):
+    """Test that expired holds no longer reserve stock and are deleted by the sweeper"""
+    product = test_products[0]
+    db_session.add(StockReservation(
+        user_id=other_customer.id,
+        product_id=product.id,
+        quantity=product.stock_quantity,
+        expires_at=datetime.utcnow() - timedelta(seconds=1)
+    ))
+    db_session.commit()
+    
+    response = auth_client.post("/cart/items", json={"product_id": product.id, "quantity": 3})
+    assert response.status_code == 201
+    
+    assert release_expired_reservations(db_session) == 1
+    assert db_session.query(StockReservation).filter(StockReservation.user_id == other_customer.id).count() == 0
+    
+    response = auth_client.delete("/cart/")
+    assert response.status_code == 204
+    assert db_session.query(StockReservation).count() == 0
+
+def test_cart_summary_is_cached_and_updated(auth_client, test_products, query_counter):
+    """Test that cart mutations keep the cached summary current without reloading it"""
+    assert auth_client.get("/cart/").json()["total_items"] == 0
+    
+    first = auth_client.post("/cart/items", json={"product_id": test_products[0].id, "quantity": 2}).json()
+    auth_client.post("/cart/items", json={"product_id": test_products[1].id, "quantity": 1})
+    auth_client.put(f"/cart/items/{first['id']}", json={"quantity": 3})
+    
+    # Only the user's cart version is read, not the cart
+    with query_counter() as queries:
+        data = auth_client.get("/cart/").json()
+    assert not [statement for statement in queries.statements if "FROM carts" in statement], queries
+    assert len([statement for statement in queries.statements if "users.cart_version" in statement]) == 1, queries
+    assert [item["quantity"] for item in data["items"]] == [3, 1]
+    assert data["total_amount"] == "89.96"  # 19.99*3 + 29.99
+    
+    auth_client.delete(f"/cart/items/{first['id']}")
+    data = auth_client.get("/cart/").json()
+    assert data["total_items"] == 1
+    assert data["total_amount"] == "29.99"
+    
+    auth_client.delete("/cart/")
+    data = auth_client.get("/cart/").json()
+    assert data["items"] == []
+    assert data["total_amount"] == "0.00"
+
+def test_cart_summary_invalidated_on_product_update(auth_client, test_products, db_session):
+    """Test that a price change reaches cached cart summaries"""
+    product = test_products[0]
+    auth_client.post("/cart/items", json={"product_id": product.id, "quantity": 2})
+    assert auth_client.get("/cart/").json()["total_amount"] == "39.98"
+    
+    update_product(db_session, product.id, ProductUpdate(price=Decimal("10.00")))
+    
+    data = auth_client.get("/cart/").json()
+    assert data["items"][0]["product_price"] == "10.00"
+    assert data["total_amount"] == "20.00"
+
+def test_cart_summary_sees_changes_from_other_workers(auth_client, test_products, db_session, test_user):
+    """Test that a cached summary is reloaded after another process changed the cart or its products"""
+    product1, product2 = test_products
+    user_id = test_user.id
+    auth_client.post("/cart/items", json={"product_id": product1.id, "quantity": 2})
+    assert auth_client.get("/cart/").json()["total_amount"] == "39.98"
+    
+    # Written directly, as a request served by another worker would, within the same second
+    db_session.query(Cart).filter(Cart.user_id == user_id).update({Cart.quantity: 3})
+    db_session.add(Cart(user_id=user_id, product_id=product2.id, quantity=1))
+    bump_cart_version(db_session, user_id)
+    db_session.commit()
+    data = auth_client.get("/cart/").json()
+    assert [item["quantity"] for item in data["items"]] == [3, 1]
+    assert data["total_amount"] == "89.96"
+    
+    update_product(db_session, product2.id, ProductUpdate(price=Decimal("10.00")))
+    assert auth_client.get("/cart/").json()["total_amount"] == "69.97"
+    
+    db_session.query(Cart).filter(Cart.user_id == user_id).delete()
+    bump_cart_version(db_session, user_id)
+    db_session.commit()
+    assert auth_client.get("/cart/").json()["items"] == []
+
+def test_cart_mutation_drops_summary_missing_other_changes(auth_client, test_products, db_session, test_user):
+    """Test that a mutation does not patch a cached summary that missed another worker's change"""
+    product1, product2 = test_products
+    auth_client.post("/cart/items", json={"product_id": product1.id, "quantity": 1})
+    auth_client.get("/cart/")
+    
+    db_session.add(Cart(user_id=test_user.id, product_id=product2.id, quantity=1))
+    bump_cart_version(db_session, test_user.id)
+    db_session.commit()
+    
+    auth_client.post("/cart/items", json={"product_id": product1.id, "quantity": 1})
+    data = auth_client.get("/cart/").json()
+    assert [(item["product_id"], item["quantity"]) for item in data["items"]] == [(product1.id, 2), (product2.id, 1)]
+
+def test_batch_update_cart(auth_client, test_products, db_session, test_user, query_counter):
+    """Test applying add, set and remove operations in one request"""
+    product1_id, product2_id = test_products[0].id, test_products[1].id
+    user_id = test_user.id
+    auth_client.post("/cart/items", json={"product_id": product2_id, "quantity": 1})
+    auth_client.get("/cart/")
+    
+    with query_counter() as queries:
+        response = auth_client.patch("/cart/", json={"operations": [
+            {"op": "add", "product_id": product1_id, "quantity": 2},
+            {"op": "add", "product_id": product1_id, "quantity": 1},
+            {"op": "set", "product_id": product2_id, "quantity": 4},
+        ]})
+    
+    assert response.status_code == 200
+    data = response.json()
+    assert [(item["product_id"], item["quantity"]) for item in data["items"]] == [(product2_id, 4), (product1_id, 3)]
+    assert data["total_amount"] == "179.93"  # 29.99*4 + 19.99*3
+    # Products are loaded once; the other statements reading them are the guarded hold INSERTs
+    assert len([statement for statement in queries.statements if statement.startswith("SELECT") and "FROM products" in statement]) == 1, queries
+    # The summary comes from the cache brought up to date, not from reloading the cart
+    assert not [statement for statement in queries.statements if "FROM carts JOIN" in statement and "carts.quantity AS" in statement], queries
+    holds = dict(db_session.query(StockReservation.product_id, StockReservation.quantity).filter(StockReservation.user_id == user_id))
+    assert holds == {product1_id: 3, product2_id: 4}
+    
+    response = auth_client.patch("/cart/", json={"operations": [{"op": "remove", "product_id": product2_id}]})
+    assert response.status_code == 200
+    assert [item["product_id"] for item in response.json()["items"]] == [product1_id]
+    assert auth_client.get("/cart/").json() == response.json()
+
+def test_batch_update_cart_is_atomic(auth_client, test_products, db_session):
+    """Test that a failing operation leaves the cart untouched"""
+    product1, product2 = test_products
+    
+    response = auth_client.patch("/cart/", json={"operations": [
+        {"op": "add", "product_id": product1.id, "quantity": 2},
+        {"op": "add", "product_id": product2.id, "quantity": product2.stock_quantity + 1},
+    ]})
+    assert response.status_code == 400
+    assert "Not enough stock" in response.json()["detail"]
+    assert auth_client.get("/cart/").json()["items"] == []
+    assert db_session.query(StockReservation).count() == 0
+    
+    response = auth_client.patch("/cart/", json={"operations": [{"op": "remove", "product_id": product1.id}]})
+    assert response.status_code == 404
+    
+    response = auth_client.patch("/cart/", json={"operations": [{"op": "set", "product_id": product1.id}]})
+    assert response.status_code == 422
+    
+    response = auth_client.patch("/cart/", json={"operations": [{"op": "replace", "product_id": product1.id, "quantity": 1}]})
+    assert response.status_code == 422
+
 def test_unauthorized_access(client):
     """Test accessing cart endpoints without authentication"""
     response = client.get("/cart/")
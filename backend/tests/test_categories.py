@@ -1,4 +1,6 @@
 import pytest
+from app.models import Category
+from app.services import bump_categories_version
 from .test_fixtures import test_user, shop_owner, test_categories, shop_owner_token, customer_token
 
 def test_get_categories(client, test_categories):
@@ -11,6 +13,75 @@ def test_get_categories(client, test_categories):
     assert data[1]["name"] == "Food"
     assert data[2]["name"] == "Electronics"
 
+def test_get_categories_with_cursor(client, test_categories):
+    """Test paging through categories with keyset cursors"""
+    names = []
+    url = "/categories/?limit=2"
+    while url:
+        response = client.get(url)
+        assert response.status_code == 200
+        names.extend(category["name"] for category in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        url = f"/categories/?limit=2&cursor={cursor}" if cursor else None
+    
+    assert names == ["Clothing", "Food", "Electronics"]
+
+def test_get_categories_conditional(client, test_categories, shop_owner_token):
+    """Test ETag revalidation of the category list"""
+    response = client.get("/categories/")
+    etag = response.headers["ETag"]
+    
+    response = client.get("/categories/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    
+    # A write rebuilds the snapshot, so the old ETag no longer matches
+    client.post(
+        "/categories/",
+        json={"name": "Books"},
+        headers={"Authorization": f"Bearer {shop_owner_token}"}
+    )
+    response = client.get("/categories/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [category["name"] for category in response.json()][-1] == "Books"
+
+def test_category_snapshot_sees_writes_from_other_workers(client, db_session, test_categories):
+    """Test that a category written through another worker is served at once, and its old ETags no longer match"""
+    response = client.get("/categories/")
+    etag = response.headers["ETag"]
+    item_etag = client.get(f"/categories/{test_categories[0].id}").headers["ETag"]
+    
+    # Written directly, as create_category and update_category in another process would
+    db_session.add(Category(name="Stationery", description="Pens and paper"))
+    test_categories[0].description = "Clothes and shoes"
+    bump_categories_version(db_session)
+    db_session.commit()
+    
+    response = client.get("/categories/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert "Stationery" in [category["name"] for category in response.json()]
+    response = client.get(f"/categories/{test_categories[0].id}", headers={"If-None-Match": item_etag})
+    assert response.status_code == 200
+    assert response.json()["description"] == "Clothes and shoes"
+
+def test_get_category_conditional(client, test_categories, shop_owner_token):
+    """Test ETag revalidation of a single category"""
+    category_id = test_categories[0].id
+    etag = client.get(f"/categories/{category_id}").headers["ETag"]
+    
+    response = client.get(f"/categories/{category_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    
+    client.put(
+        f"/categories/{category_id}",
+        json={"description": "Updated"},
+        headers={"Authorization": f"Bearer {shop_owner_token}"}
+    )
+    response = client.get(f"/categories/{category_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["description"] == "Updated"
+
 def test_get_category_by_id(client, test_categories):
     """Test getting a category by ID"""
     # Get existing category
@@ -100,4 +171,19 @@ def test_delete_nonexistent_category(client, shop_owner_token):
         headers={"Authorization": f"Bearer {shop_owner_token}"}
     )
     assert response.status_code == 404
-    assert "Category not found" in response.json()["detail"]
\ No newline at end of file
+    assert "Category not found" in response.json()["detail"]
+def test_category_writes_bypass_snapshot(client, db_session, test_categories, shop_owner_token):
+    """Test that updates and deletes see categories written elsewhere (e.g. another worker) since the snapshot was taken"""
+    # Warm the snapshot, then add a category behind its back
+    assert client.get("/categories/").status_code == 200
+    category = Category(name="Stationery", description="Pens and paper")
+    db_session.add(category)
+    db_session.commit()
+    category_id = category.id
+    
+    headers = {"Authorization": f"Bearer {shop_owner_token}"}
+    response = client.put(f"/categories/{category_id}", headers=headers, json={"description": "Office supplies"})
+    assert response.status_code == 200
+    assert response.json()["description"] == "Office supplies"
+    
+    assert client.delete(f"/categories/{category_id}", headers=headers).status_code == 204
@@ -0,0 +1,57 @@
+from datetime import datetime
+from sqlalchemy import create_engine, func, select
+from app.database import _create_sqlite_engine
+from app.models import Cart, Order, OrderItem, Product, User
+from app.utils.data_generator import GeneratorSpec, generate_data
+from app.utils.schema import check_schema_version, head_revision
+
+SPEC = GeneratorSpec(shops=3, products_per_shop=4, customers=10, orders=25, carts=5)
+ANCHOR = datetime(2024, 1, 1)
+
+def _generate():
+    engine = create_engine("sqlite://")
+    counts = generate_data(engine, SPEC, seed=7, batch_size=8, anchor=ANCHOR)
+    return engine, counts
+
+def test_generate_data_counts_and_consistency():
+    """Test that the generator writes the requested rows and consistent order totals"""
+    engine, counts = _generate()
+    
+    with engine.connect() as connection:
+        # The load's relaxed durability doesn't leak into the pooled connection
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 2  # FULL, the default
+        assert connection.execute(select(func.count(User.id))).scalar() == counts["users"] == 13
+        assert connection.execute(select(func.count(Product.id))).scalar() == counts["products"] == 12
+        assert connection.execute(select(func.count(Order.id))).scalar() == counts["orders"] == 25
+        assert connection.execute(select(func.count(OrderItem.id))).scalar() == counts["order_items"]
+        assert connection.execute(select(func.count(func.distinct(Cart.user_id)))).scalar() == 5
+        
+        item_totals = dict(connection.execute(
+            select(OrderItem.order_id, func.sum(OrderItem.price * OrderItem.quantity)).group_by(OrderItem.order_id)
+        ).all())
+        for order_id, total_amount in connection.execute(select(Order.id, Order.total_amount)):
+            assert abs(float(item_totals[order_id]) - float(total_amount)) < 0.005
+
+def test_generate_data_is_deterministic():
+    """Test that the same seed produces the same rows"""
+    first, _ = _generate()
+    second, _ = _generate()
+    
+    for table in (Product.__table__, Order.__table__, OrderItem.__table__, Cart.__table__, User.__table__):
+        # bcrypt salts every hash, so only the password hash differs between runs
+        query = select(*[column for column in table.c if column.name != "password_hash"]).order_by(table.c.id)
+        with first.connect() as a, second.connect() as b:
+            assert a.execute(query).all() == b.execute(query).all()
+
+def test_generate_data_on_sqlite_production_profile(tmp_path):
+    """Test loading a file database through the SQLite writer engine, whose transactions begin immediately"""
+    engine = _create_sqlite_engine(f"sqlite:///{tmp_path / 'load.db'}", writer=True)
+    
+    counts = generate_data(engine, SPEC, seed=7, batch_size=8, anchor=ANCHOR)
+    
+    with engine.connect() as connection:
+        assert connection.execute(select(func.count(Order.id))).scalar() == counts["orders"] == 25
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL, from the profile
+    # The seeded database is migrated, so the app starts on it
+    assert check_schema_version(engine) == head_revision()
+    engine.dispose()
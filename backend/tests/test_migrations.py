@@ -0,0 +1,106 @@
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import create_engine, event, inspect, text
+from app.database import Base
+from app.utils.schema import SchemaOutOfDate, alembic_config, check_schema_version, head_revision
+
+# Indexes the app created at startup before it had migrations
+LEGACY_INDEXES = [
+    ("idx_users_email", "users", "email"),
+    ("idx_users_username", "users", "username"),
+    ("idx_users_role", "users", "role"),
+    ("idx_shops_owner_id", "shops", "owner_id"),
+    ("idx_products_shop_id", "products", "shop_id"),
+    ("idx_products_category_id", "products", "category_id"),
+    ("idx_products_is_available", "products", "is_available"),
+    ("idx_products_price", "products", "price"),
+    ("idx_carts_user_id", "carts", "user_id"),
+    ("idx_orders_customer_id", "orders", "customer_id"),
+]
+
+def seed_product(connection):
+    connection.execute(text("INSERT INTO users (id, email, username, password_hash, role) VALUES (1, 'o@example.com', 'o', 'x', 'shop_owner')"))
+    connection.execute(text("INSERT INTO categories (id, name) VALUES (1, 'Groceries')"))
+    connection.execute(text("INSERT INTO shops (id, owner_id, name, category_id, address) VALUES (1, 1, 'Shop', 1, '1 Main St')"))
+    connection.execute(text("INSERT INTO products (id, shop_id, name, description, price, category_id) VALUES (1, 1, 'Sourdough loaf', 'Baked daily', 4.5, 1)"))
+
+def schema_differences(engine):
+    with engine.connect() as connection:
+        return compare_metadata(MigrationContext.configure(connection), Base.metadata)
+
+@pytest.fixture
+def file_engine(tmp_path):
+    """An empty SQLite file database"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'shops.db'}")
+    # Throwaway file: skip the fsync after every DDL statement
+    event.listen(engine, "connect", lambda connection, record: connection.execute("PRAGMA synchronous=OFF"))
+    yield engine
+    engine.dispose()
+
+def test_schema_check_refuses_or_migrates(file_engine):
+    """Test that startup refuses an unmigrated database unless told to migrate it"""
+    with pytest.raises(SchemaOutOfDate):
+        check_schema_version(file_engine)
+    
+    assert check_schema_version(file_engine, migrate=True) == head_revision()
+    # Up to date: a plain check passes
+    assert check_schema_version(file_engine) == head_revision()
+
+def test_migrations_match_models(file_engine):
+    """Test that the migrations create every table, column and index the models declare"""
+    check_schema_version(file_engine, migrate=True)
+    
+    diff = schema_differences(file_engine)
+    # Extra objects (query indexes, the FTS5 tables) are fine; missing ones are not
+    missing = [change for change in diff if isinstance(change, tuple) and change[0].startswith("add_")]
+    assert missing == []
+    
+    inspector = inspect(file_engine)
+    assert "idx_orders_customer_id" in {index["name"] for index in inspector.get_indexes("orders")}
+    assert inspector.has_table("products_fts")
+    with file_engine.connect() as connection:
+        assert connection.execute(text("SELECT name, version FROM cache_versions")).all() == [("categories", 0)]
+
+def test_search_index_and_downgrade(file_engine):
+    """Test that the migrated FTS5 index follows product writes, and that every migration reverts"""
+    check_schema_version(file_engine, migrate=True)
+    
+    with file_engine.begin() as connection:
+        seed_product(connection)
+        matches = connection.execute(text("SELECT rowid FROM products_fts WHERE products_fts MATCH 'sourdough'")).scalars().all()
+    assert matches == [1]
+    
+    with file_engine.begin() as connection:
+        command.downgrade(alembic_config(connection), "base")
+    assert inspect(file_engine).get_table_names() == ["alembic_version"]
+
+def test_upgrade_of_database_built_before_migrations(file_engine):
+    """Test that a database the app built at startup before migrations is brought to head with its data"""
+    # The original schema (what the first migration creates), without a revision, plus the startup indexes
+    with file_engine.begin() as connection:
+        command.upgrade(alembic_config(connection), "0001")
+        connection.execute(text("DROP TABLE alembic_version"))
+        for name, table, column in LEGACY_INDEXES:
+            connection.execute(text(f"CREATE INDEX {name} ON {table}({column})"))
+        seed_product(connection)
+    
+    assert check_schema_version(file_engine, migrate=True) == head_revision()
+    
+    assert [change for change in schema_differences(file_engine) if isinstance(change, tuple) and change[0].startswith("add_")] == []
+    inspector = inspect(file_engine)
+    assert inspector.has_table("stock_reservations")
+    product_indexes = {index["name"] for index in inspector.get_indexes("products")}
+    assert "idx_products_shop_available_price" in product_indexes
+    assert "idx_products_price" not in product_indexes
+    with file_engine.connect() as connection:
+        matches = connection.execute(text("SELECT rowid FROM products_fts WHERE products_fts MATCH 'sourdough'")).scalars().all()
+    assert matches == [1]
+
+def test_upgrade_of_database_built_by_create_all(file_engine):
+    """Test that a database whose tables, search and query indexes the app created at startup is brought to head"""
+    Base.metadata.create_all(bind=file_engine)
+    
+    assert check_schema_version(file_engine, migrate=True) == head_revision()
+    assert [change for change in schema_differences(file_engine) if isinstance(change, tuple) and change[0].startswith("add_")] == []
@@ -1,6 +1,17 @@
+import csv
+import io
+import json
+import logging
 import pytest
 from fastapi.testclient import TestClient
-from app.models import Order, OrderItem, Cart
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app.config import settings
+from app.models import Order, OrderItem, Cart, StockReservation, User
+from app.services import hold_stock
+from app.services import order_export_service
+from app.services.order_export_service import CSV_HEADER
+from app.utils.query_stats import QueryBudgetExceeded
 from decimal import Decimal
 
 @pytest.fixture
@@ -69,6 +80,42 @@ def test_create_order(auth_client, test_shop, cart_with_items):
     assert len(data["items"]) == 2
     assert Decimal(data["total_amount"]) == Decimal("69.97")  # 19.99*2 + 29.99
 
+def test_create_order_respects_stock_holds(auth_client, db_session, test_user, test_shop, test_products, cart_with_items):
+    """Test that checkout cannot take stock held by other carts, but can take its own"""
+    other = User(email="other@example.com", username="othercustomer", password_hash="x", role="customer")
+    db_session.add(other)
+    db_session.commit()
+    order = {"shop_id": test_shop.id, "delivery_address": "123 Test St, Test City"}
+    
+    # 10 in stock, 9 held by another cart: the 2 in this cart cannot be sold
+    hold_stock(db_session, other.id, test_products[0].id, 9)
+    db_session.commit()
+    response = auth_client.post("/orders/", json=order)
+    assert response.status_code == 409
+    
+    # This cart's own hold is not counted against it, and is released by the order
+    hold_stock(db_session, other.id, test_products[0].id, 8)
+    hold_stock(db_session, test_user.id, test_products[0].id, 2)
+    db_session.commit()
+    response = auth_client.post("/orders/", json=order)
+    assert response.status_code == 201
+    assert db_session.query(StockReservation).filter(StockReservation.user_id == test_user.id).count() == 0
+    assert db_session.query(StockReservation).filter(StockReservation.user_id == other.id).count() == 1
+
+def test_create_order_response_items(auth_client, db_session, test_user, test_shop, cart_with_items):
+    """Test that the checkout response describes every ordered item"""
+    response = auth_client.post(
+        "/orders/",
+        json={"shop_id": test_shop.id, "delivery_address": "123 Test St, Test City"}
+    )
+    
+    assert response.status_code == 201
+    data = response.json()
+    items = sorted(data["items"], key=lambda item: item["product_name"])
+    assert [(item["product_name"], item["quantity"]) for item in items] == [("Product 1", 2), ("Product 2", 1)]
+    assert all(item["order_id"] == data["id"] and item["id"] for item in items)
+    assert db_session.query(Cart).filter(Cart.user_id == test_user.id).count() == 0
+
 def test_get_orders_customer(auth_client, test_order):
     """Test getting orders as a customer"""
     response = auth_client.get("/orders/")
@@ -80,6 +127,100 @@ def test_get_orders_customer(auth_client, test_order):
     assert data[0]["status"] == "pending"
     assert len(data[0]["items"]) == 2
 
+def test_get_orders_groups_items_per_order(auth_client, db_session, test_user, test_shop, test_products, test_order):
+    """Test that batch-loaded items are attached to the right orders"""
+    second_order = Order(
+        customer_id=test_user.id,
+        shop_id=test_shop.id,
+        total_amount=Decimal("29.99"),
+        status="confirmed",
+        delivery_address="456 Other St, Test City"
+    )
+    db_session.add(second_order)
+    db_session.flush()
+    db_session.add(OrderItem(
+        order_id=second_order.id,
+        product_id=test_products[1].id,
+        quantity=1,
+        price=test_products[1].price
+    ))
+    db_session.commit()
+    
+    response = auth_client.get("/orders/")
+    
+    assert response.status_code == 200
+    orders = {order["id"]: order for order in response.json()}
+    assert len(orders) == 2
+    assert len(orders[test_order.id]["items"]) == 2
+    assert [item["product_name"] for item in orders[second_order.id]["items"]] == ["Product 2"]
+    for order in orders.values():
+        assert all(item["order_id"] == order["id"] for item in order["items"])
+
+def test_get_orders_query_budget(auth_client, db_session, test_user, test_shop, test_products, query_counter):
+    """Test that listing orders issues a constant number of queries however many orders there are"""
+    for _ in range(5):
+        order = Order(
+            customer_id=test_user.id,
+            shop_id=test_shop.id,
+            total_amount=Decimal("39.98"),
+            status="pending",
+            delivery_address="123 Test St, Test City"
+        )
+        db_session.add(order)
+        db_session.flush()
+        for product in test_products[:2]:
+            db_session.add(OrderItem(order_id=order.id, product_id=product.id, quantity=1, price=product.price))
+    db_session.commit()
+    auth_client.get("/orders/")
+    
+    with query_counter() as queries:
+        response = auth_client.get("/orders/")
+    
+    assert response.status_code == 200
+    assert len(response.json()) == 5
+    assert queries.count <= 3, queries
+
+def test_create_order_query_budget(auth_client, test_shop, cart_with_items, query_counter):
+    """Test that checkout does not select products or cart rows one by one"""
+    with query_counter() as queries:
+        response = auth_client.post(
+            "/orders/",
+            json={"shop_id": test_shop.id, "delivery_address": "123 Test St, Test City"}
+        )
+    
+    assert response.status_code == 201
+    selects = [statement for statement in queries.statements if statement.lstrip().startswith("SELECT")]
+    assert len([statement for statement in selects if "FROM carts" in statement]) == 1, queries
+    assert not [statement for statement in selects if "FROM products" in statement], queries
+    # The items go in as one executemany, however many there are
+    assert len([statement for statement in queries.statements if statement.startswith("INSERT INTO order_items")]) == 1, queries
+
+def test_query_budget_logs_and_raises(auth_client, test_products, test_order, monkeypatch, caplog):
+    """Test that requests over the query budget are logged, or fail in raise mode"""
+    monkeypatch.setattr(settings, "QUERY_BUDGET", 1)
+    monkeypatch.setattr(settings, "QUERY_BUDGET_MODE", "log")
+    
+    with caplog.at_level(logging.WARNING, logger="app.utils.query_stats"):
+        assert auth_client.get(f"/products/{test_products[0].id}").status_code == 200
+        assert auth_client.get("/orders/").status_code == 200
+    assert "GET /orders/ executed" in caplog.text
+    assert "/products/{product_id} executed" not in caplog.text
+    
+    monkeypatch.setattr(settings, "QUERY_BUDGET_MODE", "raise")
+    # Statements that reach the cursor: the one over budget must be stopped before it runs
+    started = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        started.append(statement)
+    
+    event.listen(Engine, "before_cursor_execute", record)
+    try:
+        with pytest.raises(QueryBudgetExceeded):
+            auth_client.get("/orders/")
+    finally:
+        event.remove(Engine, "before_cursor_execute", record)
+    assert len(started) == 1, started
+
 def test_get_orders_shop_owner(shop_owner_client, test_order):
     """Test getting orders as a shop owner"""
     response = shop_owner_client.get("/orders/")
@@ -112,6 +253,67 @@ def test_get_orders_with_filters(auth_client, test_order, test_shop):
     data = response.json()
     assert len(data) == 0
 
+def test_export_orders_ndjson(shop_owner_client, test_order):
+    """Test streaming a shop owner's orders as NDJSON, one order with its items per line"""
+    response = shop_owner_client.get("/orders/export")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert 'filename="orders.ndjson"' in response.headers["content-disposition"]
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert len(lines) == 1
+    assert lines[0]["id"] == test_order.id
+    assert lines[0]["total_amount"] == "69.97"
+    assert sorted(item["product_name"] for item in lines[0]["items"]) == ["Product 1", "Product 2"]
+
+def test_export_orders_csv(shop_owner_client, test_order, test_shop):
+    """Test streaming orders as CSV, one row per order item, with filters"""
+    response = shop_owner_client.get("/orders/export", params={"format": "csv", "shop_id": test_shop.id})
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 2
+    assert {row["order_id"] for row in rows} == {str(test_order.id)}
+    assert {row["product_name"] for row in rows} == {"Product 1", "Product 2"}
+    
+    response = shop_owner_client.get("/orders/export", params={"format": "csv", "status": "delivered"})
+    assert response.status_code == 200
+    assert response.text.splitlines() == [",".join(CSV_HEADER)]
+
+def test_export_orders_reads_keyset_batches(db_session, test_order, test_shop, shop_owner, query_counter, monkeypatch):
+    """Test that the export fetches orders in bounded keyset batches while it streams, never the whole result"""
+    db_session.add_all([
+        Order(customer_id=test_order.customer_id, shop_id=test_shop.id, total_amount=Decimal("1.00"),
+              status="pending", delivery_address="1 Main St")
+        for _ in range(4)
+    ])
+    db_session.commit()
+    monkeypatch.setattr(order_export_service, "EXPORT_BATCH_SIZE", 2)
+    monkeypatch.setattr(order_export_service, "EXPORT_CHUNK_SIZE", 1)
+    owner_id = shop_owner.id
+    
+    with query_counter() as queries:
+        chunks = order_export_service.export_orders(db_session, owner_id)
+        first = next(chunks)
+        # Only the first batch (its order ids, then their rows) has been read
+        assert queries.count == 2, queries
+        assert "LIMIT" in queries.statements[0]
+        lines = [first, *chunks]
+    
+    assert queries.count == 6, queries
+    assert [json.loads(line)["id"] for line in lines] == sorted(order.id for order in db_session.query(Order))
+    assert len(json.loads(first)["items"]) == 2
+
+def test_customer_cannot_export_orders(auth_client, test_order):
+    """Test that customers cannot export orders"""
+    assert auth_client.get("/orders/export").status_code == 403
+
+def test_export_orders_validation(shop_owner_client, test_order):
+    """Test that owners can only export their own shops, in a supported format"""
+    assert shop_owner_client.get("/orders/export", params={"shop_id": 9999}).status_code == 403
+    assert shop_owner_client.get("/orders/export", params={"format": "xml"}).status_code == 422
+
 def test_get_specific_order(auth_client, test_order):
     """Test getting a specific order"""
     response = auth_client.get(f"/orders/{test_order.id}")
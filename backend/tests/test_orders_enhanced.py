@@ -1,7 +1,15 @@
 import pytest
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from fastapi.testclient import TestClient
-from sqlalchemy.orm import Session
-from app.models import Order, OrderItem, Cart, Product
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import NullPool
+from app.database import Base, get_db, get_primary_read_db
+from app.models import Order, OrderItem, Cart, Product, User, Category, Shop
+from app.routers import orders as orders_router_module
+from app.services import create_access_token, reserve_product_stock
+from main import app
 from decimal import Decimal
 import json
 from datetime import datetime, timedelta
@@ -64,6 +72,20 @@ def test_get_orders_with_pagination(auth_client, multiple_orders):
     data = response.json()
     assert len(data) == 1
 
+def test_get_orders_with_cursor(auth_client, multiple_orders):
+    """Test paging through orders newest first with keyset cursors"""
+    seen = []
+    url = "/orders/?limit=2"
+    while url:
+        response = auth_client.get(url)
+        assert response.status_code == 200
+        seen.extend(order["id"] for order in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        url = f"/orders/?limit=2&cursor={cursor}" if cursor else None
+    
+    # multiple_orders creates each order one day older than the previous one
+    assert seen == [order.id for order in multiple_orders]
+
 def test_get_orders_with_date_filter(auth_client, multiple_orders):
     """Test getting orders with date filter"""
     # Get orders from the last 2 days
@@ -200,4 +222,82 @@ def test_order_creation_with_out_of_stock_product(auth_client, test_shop, db_ses
     )
     
     assert response.status_code == 400
-    assert "Not enough stock" in response.json()["detail"]
\ No newline at end of file
+    assert "Not enough stock" in response.json()["detail"]
+
+def test_concurrent_checkouts_never_oversell(tmp_path, monkeypatch):
+    """Stress test: concurrent POST /orders racing for the last units never oversell, and the losers get 409"""
+    # A file database with a connection per session, so the requests really run concurrently
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'stock.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+        poolclass=NullPool
+    )
+    Base.metadata.create_all(bind=engine)
+    StressSession = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    buyers = 40
+    
+    with StressSession() as db:
+        owner = User(email="o@example.com", username="owner", password_hash="x", role="shop_owner")
+        category = Category(name="Bakery")
+        db.add_all([owner, category])
+        db.flush()
+        shop = Shop(owner_id=owner.id, name="Bakery", category_id=category.id, address="1 Main St")
+        db.add(shop)
+        db.flush()
+        product = Product(shop_id=shop.id, name="Croissant", price=Decimal("2.50"),
+                          category_id=category.id, stock_quantity=10, is_available=True)
+        customers = [
+            User(email=f"buyer{index}@example.com", username=f"buyer{index}", password_hash="x", role="customer")
+            for index in range(buyers)
+        ]
+        db.add_all([product, *customers])
+        db.flush()
+        db.add_all([Cart(user_id=customer.id, product_id=product.id, quantity=1) for customer in customers])
+        db.commit()
+        shop_id, product_id = shop.id, product.id
+        tokens = [
+            create_access_token(data={"sub": customer.username, "id": customer.id, "role": "customer"})
+            for customer in customers
+        ]
+    
+    def override_get_db():
+        db = StressSession()
+        try:
+            yield db
+        finally:
+            db.close()
+    
+    # Hold every checkout between its stock pre-check and its guarded UPDATE, so they all race for the units
+    barrier = threading.Barrier(buyers, timeout=30)
+    
+    def racing_reserve(*args, **kwargs):
+        barrier.wait()
+        return reserve_product_stock(*args, **kwargs)
+    
+    monkeypatch.setattr(orders_router_module, "reserve_product_stock", racing_reserve)
+    app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_primary_read_db] = override_get_db
+    try:
+        client = TestClient(app)
+        
+        def checkout(token):
+            return client.post(
+                "/orders/",
+                headers={"Authorization": f"Bearer {token}"},
+                json={"shop_id": shop_id, "delivery_address": "1 Main St"}
+            ).status_code
+        
+        with ThreadPoolExecutor(max_workers=buyers) as pool:
+            statuses = list(pool.map(checkout, tokens))
+    finally:
+        app.dependency_overrides = {}
+    
+    with StressSession() as db:
+        remaining = db.query(Product.stock_quantity).filter(Product.id == product_id).scalar()
+        sold = db.query(func.sum(OrderItem.quantity)).scalar()
+    engine.dispose()
+    
+    assert statuses.count(201) == 10
+    assert statuses.count(409) == buyers - 10
+    assert remaining == 0
+    assert sold == 10
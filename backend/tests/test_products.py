@@ -1,4 +1,5 @@
 import pytest
+from unittest.mock import patch
 from .test_fixtures import (
     test_user, shop_owner, test_categories, test_shop, 
     test_products, shop_owner_token, customer_token
@@ -41,6 +42,81 @@ def test_get_products_with_filters(client, test_products, test_shop, test_catego
     data = response.json()
     assert len(data) == 0
 
+def test_get_products_with_cursor(client, test_products):
+    """Test paging through products with keyset cursors"""
+    response = client.get("/products/?limit=1")
+    assert response.status_code == 200
+    assert [product["name"] for product in response.json()] == ["Product 1"]
+    cursor = response.headers["X-Next-Cursor"]
+    
+    response = client.get(f"/products/?limit=1&cursor={cursor}")
+    assert response.status_code == 200
+    assert [product["name"] for product in response.json()] == ["Product 2"]
+    cursor = response.headers["X-Next-Cursor"]
+    
+    # The last page is empty and advertises no further cursor
+    response = client.get(f"/products/?limit=1&cursor={cursor}")
+    assert response.status_code == 200
+    assert response.json() == []
+    assert "X-Next-Cursor" not in response.headers
+
+def test_get_products_with_invalid_cursor(client, test_products):
+    """Test that malformed cursors are rejected"""
+    response = client.get("/products/?cursor=not-a-cursor")
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+def test_get_products_with_price_and_stock_filters(client, db_session, test_products):
+    """Test catalog browsing filters"""
+    response = client.get("/products/?min_price=20")
+    assert [product["name"] for product in response.json()] == ["Product 2"]
+    
+    response = client.get("/products/?max_price=20")
+    assert [product["name"] for product in response.json()] == ["Product 1"]
+    
+    test_products[0].stock_quantity = 0
+    test_products[1].is_available = False
+    db_session.commit()
+    
+    response = client.get("/products/?in_stock=true")
+    assert [product["name"] for product in response.json()] == ["Product 2"]
+    
+    response = client.get("/products/?is_available=true")
+    assert [product["name"] for product in response.json()] == ["Product 1"]
+
+def test_get_products_sorted(client, test_products):
+    """Test sorting products and paging a sorted listing with cursors"""
+    response = client.get("/products/?sort=price_desc")
+    assert [product["name"] for product in response.json()] == ["Product 2", "Product 1"]
+    
+    response = client.get("/products/?sort=price&limit=1")
+    assert [product["name"] for product in response.json()] == ["Product 1"]
+    cursor = response.headers["X-Next-Cursor"]
+    
+    response = client.get(f"/products/?sort=price&limit=1&cursor={cursor}")
+    assert [product["name"] for product in response.json()] == ["Product 2"]
+    
+    response = client.get("/products/?sort=popularity")
+    assert response.status_code == 422
+
+def test_get_product_facets(client, test_products, test_categories):
+    """Test per-category and price bucket facet counts"""
+    response = client.get("/products/facets")
+    assert response.status_code == 200
+    data = response.json()
+    
+    assert data["total"] == 2
+    assert data["categories"] == [
+        {"category_id": test_categories[0].id, "count": 1},
+        {"category_id": test_categories[1].id, "count": 1}
+    ]
+    # Product 1 costs 19.99 and Product 2 costs 29.99
+    counts = {bucket["min_price"]: bucket["count"] for bucket in data["price_buckets"]}
+    assert counts == {"0": 0, "10": 1, "25": 1, "50": 0, "100": 0}
+    
+    response = client.get("/products/facets?min_price=25")
+    assert response.json()["total"] == 1
+
 def test_get_product_by_id(client, test_products):
     """Test getting a product by ID"""
     # Get existing product
@@ -55,6 +131,50 @@ def test_get_product_by_id(client, test_products):
     assert response.status_code == 404
     assert "Product not found" in response.json()["detail"]
 
+def test_get_products_conditional(client, test_products, shop_owner_token):
+    """Test ETag revalidation of a product list page"""
+    response = client.get("/products/?sort=price")
+    etag = response.headers["ETag"]
+    
+    response = client.get("/products/?sort=price", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    
+    # Another page of the same list has its own ETag
+    response = client.get("/products/?sort=price&limit=1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    
+    # A change to a listed product changes the page's ETag, even within the same second
+    client.put(
+        f"/products/{test_products[0].id}",
+        json={"stock_quantity": 3},
+        headers={"Authorization": f"Bearer {shop_owner_token}"}
+    )
+    response = client.get("/products/?sort=price", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+def test_get_product_conditional(client, test_products, shop_owner_token):
+    """Test ETag revalidation of a single product"""
+    product_id = test_products[0].id
+    etag = client.get(f"/products/{product_id}").headers["ETag"]
+    
+    response = client.get(f"/products/{product_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    
+    client.put(
+        f"/products/{product_id}",
+        json={"price": "17.50"},
+        headers={"Authorization": f"Bearer {shop_owner_token}"}
+    )
+    response = client.get(f"/products/{product_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["price"] == "17.50"
+    
+    response = client.get("/products/9999", headers={"If-None-Match": etag})
+    assert response.status_code == 404
+
 def test_create_product_as_shop_owner(client, shop_owner_token, test_shop, test_categories):
     """Test creating a product as a shop owner"""
     response = client.post(
@@ -96,6 +216,70 @@ def test_create_product_for_other_shop(client, customer_token, test_shop, test_c
     assert response.status_code == 403
     assert "Not authorized. Shop owner role required" in response.json()["detail"]
 
+def test_bulk_import_products_json(client, db_session, shop_owner_token, test_shop, test_categories, test_products):
+    """Test creating and updating products in bulk, with a per-row report"""
+    response = client.post(
+        "/products/bulk",
+        headers={"Authorization": f"Bearer {shop_owner_token}"},
+        json=[
+            {"shop_id": test_shop.id, "name": "Bulk 1", "price": "5.00", "category_id": test_categories[0].id},
+            {"shop_id": test_shop.id, "name": "Bulk 2", "price": "-1", "category_id": test_categories[0].id},
+            {"id": test_products[0].id, "price": "17.50", "stock_quantity": 3},
+            {"shop_id": 9999, "name": "Elsewhere", "price": "5.00", "category_id": test_categories[0].id},
+            {"id": 9999, "price": "1.00"},
+            {"shop_id": test_shop.id, "name": "Bulk 3", "price": "5.00", "category_id": 9999},
+        ]
+    )
+    
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["created"], report["updated"], report["failed"]) == (1, 1, 4)
+    assert [result["status"] for result in report["results"]] == ["created", "error", "updated", "error", "error", "error"]
+    assert report["results"][1]["errors"][0].startswith("price")
+    assert "shop_id" in report["results"][3]["errors"][0]
+    
+    created = client.get(f"/products/{report['results'][0]['id']}").json()
+    assert created["name"] == "Bulk 1"
+    updated = client.get(f"/products/{test_products[0].id}").json()
+    assert (updated["price"], updated["stock_quantity"], updated["name"]) == ("17.50", 3, test_products[0].name)
+
+def test_bulk_import_products_csv(client, shop_owner_token, test_shop, test_categories, test_products):
+    """Test importing products from a CSV body, in several batches"""
+    lines = ["shop_id,name,price,category_id,stock_quantity,description"]
+    lines += [f"{test_shop.id},CSV product {index},{index + 1}.25,{test_categories[1].id},{index}," for index in range(1, 8)]
+    lines.append(f"{test_shop.id},,2.00,{test_categories[1].id},1,missing name")
+    
+    with patch("app.services.product_service.PRODUCT_BULK_BATCH_SIZE", 3):
+        response = client.post(
+            "/products/bulk",
+            headers={"Authorization": f"Bearer {shop_owner_token}", "Content-Type": "text/csv"},
+            content="\n".join(lines).encode()
+        )
+    
+    assert response.status_code == 200
+    report = response.json()
+    assert (report["created"], report["failed"]) == (7, 1)
+    assert report["results"][-1]["row"] == 8
+    products = client.get("/products/", params={"shop_id": test_shop.id, "limit": 100}).json()
+    csv_products = [product for product in products if product["name"].startswith("CSV product")]
+    assert len(csv_products) == 7
+    assert all(product["description"] is None for product in csv_products)
+
+def test_bulk_import_products_requires_owner_and_array(client, shop_owner_token, customer_token):
+    """Test bulk import access and body validation"""
+    response = client.post("/products/bulk", headers={"Authorization": f"Bearer {customer_token}"}, json=[])
+    assert response.status_code == 403
+    
+    # Access is checked before the body is read: a malformed upload is never parsed for outsiders
+    assert client.post("/products/bulk", content=b"not json").status_code == 401
+    response = client.post("/products/bulk", headers={"Authorization": f"Bearer {customer_token}"}, content=b"not json")
+    assert response.status_code == 403
+    
+    owner_headers = {"Authorization": f"Bearer {shop_owner_token}"}
+    assert client.post("/products/bulk", headers=owner_headers, json={"name": "x"}).status_code == 422
+    response = client.post("/products/bulk", headers={**owner_headers, "Content-Type": "application/xml"}, content=b"<a/>")
+    assert response.status_code == 415
+
 def test_update_product(client, test_products, shop_owner_token):
     """Test updating a product"""
     response = client.put(
@@ -147,4 +331,38 @@ def test_delete_product_not_owner(client, test_products, customer_token):
         headers={"Authorization": f"Bearer {customer_token}"}
     )
     assert response.status_code == 404
-    assert "Product not found or you don't have permission to delete it" in response.json()["detail"]
\ No newline at end of file
+    assert "Product not found or you don't have permission to delete it" in response.json()["detail"]
+def test_search_products(client, test_products):
+    """Test full-text product search"""
+    response = client.get("/products/search?q=product 2")
+    assert response.status_code == 200
+    data = response.json()
+    # "product" matches both, "2" makes Product 2 the best match
+    assert [product["name"] for product in data] == ["Product 2", "Product 1"]
+    
+    response = client.get("/products/search?q=nothing-matches-this")
+    assert response.status_code == 200
+    assert response.json() == []
+
+def test_search_products_with_filters(client, test_products, test_categories):
+    """Test that search honours the listing filters"""
+    response = client.get(f"/products/search?q=product&category_id={test_categories[0].id}")
+    assert response.status_code == 200
+    assert [product["name"] for product in response.json()] == ["Product 1"]
+
+def test_search_index_follows_product_changes(client, test_products, shop_owner_token):
+    """Test that product updates and deletes keep the search index in sync"""
+    headers = {"Authorization": f"Bearer {shop_owner_token}"}
+    product_id = test_products[0].id
+    
+    response = client.put(f"/products/{product_id}", json={"name": "Sourdough Loaf"}, headers=headers)
+    assert response.status_code == 200
+    
+    response = client.get("/products/search?q=sourdough")
+    assert [product["id"] for product in response.json()] == [product_id]
+    
+    response = client.delete(f"/products/{product_id}", headers=headers)
+    assert response.status_code == 204
+    
+    response = client.get("/products/search?q=sourdough")
+    assert response.json() == []
@@ -0,0 +1,100 @@
+import time
+import pytest
+from datetime import datetime
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import sessionmaker
+from app import database
+from app.database import Base
+from app.models import Category, Product, Shop, User
+from app.replicas import ReplicaRouter
+from app.services.auth_service import create_access_token
+from main import app
+
+@pytest.fixture
+def engines(tmp_path):
+    """Primary and replica stand-ins: two SQLite files with the same product under different names"""
+    engines = []
+    for name in ("primary", "replica"):
+        engine = create_engine(f"sqlite:///{tmp_path / name}.db", connect_args={"check_same_thread": False})
+        # Throwaway files: skip the fsync after every DDL statement
+        event.listen(engine, "connect", lambda connection, record: connection.execute("PRAGMA synchronous=OFF"))
+        Base.metadata.create_all(bind=engine)
+        with engine.begin() as connection:
+            connection.execute(insert(User), [{"id": 1, "email": "owner@example.com", "username": "owner", "password_hash": "x", "role": "shop_owner"}])
+            connection.execute(insert(Category), [{"id": 1, "name": "Groceries"}])
+            connection.execute(insert(Shop), [{"id": 1, "owner_id": 1, "name": "Shop", "category_id": 1, "address": "1 Main St"}])
+            connection.execute(insert(Product), [{
+                "id": 1, "shop_id": 1, "name": f"{name.title()} copy", "price": 5, "category_id": 1,
+                "stock_quantity": 1, "is_available": True, "updated_at": datetime(2024, 1, 1)
+            }])
+        engines.append(engine)
+    yield engines
+    for engine in engines:
+        engine.dispose()
+
+def test_reads_go_to_replicas_within_lag(engines):
+    """Test replica selection, lag fallback and read-your-writes stickiness"""
+    primary, replica = engines
+    lags = {"lag": 0.0}
+    router = ReplicaRouter(primary, [replica], max_lag=5, lag_check_interval=0, lag_probe=lambda engine: lags["lag"])
+    
+    assert router.read_engine() is replica
+    assert router.read_engine("Bearer reader") is replica
+    
+    lags["lag"] = 30.0
+    assert router.read_engine() is primary
+    
+    lags["lag"] = 0.0
+    router.mark_write("Bearer writer")
+    assert router.read_engine("Bearer writer") is primary
+    assert router.read_engine("Bearer reader") is replica
+    
+    # No replicas: everything reads from the primary
+    assert ReplicaRouter(primary).read_engine() is primary
+
+def test_unreachable_replica_falls_back(engines):
+    """Test that a replica whose lag cannot be measured is skipped until the next check"""
+    primary, replica = engines
+    
+    def probe(engine):
+        raise ConnectionError("replica down")
+    
+    router = ReplicaRouter(primary, [replica], lag_check_interval=60, lag_probe=probe)
+    assert router.read_engine() is primary
+
+def test_read_your_writes_window_expires(engines):
+    """Test that a writer reads from replicas again after the window"""
+    primary, replica = engines
+    router = ReplicaRouter(primary, [replica], read_your_writes_seconds=0.05, lag_probe=lambda engine: 0.0)
+    
+    router.mark_write("Bearer writer")
+    assert router.read_engine("Bearer writer") is primary
+    time.sleep(0.06)
+    assert router.read_engine("Bearer writer") is replica
+
+def test_get_handlers_read_from_replica(engines, monkeypatch):
+    """Test that catalog GET handlers use the replica session and writes through get_db mark the client"""
+    primary, replica = engines
+    lags = {"lag": 0.0}
+    router = ReplicaRouter(primary, [replica], lag_check_interval=0, lag_probe=lambda engine: lags["lag"])
+    monkeypatch.setattr(database, "replica_router", router)
+    # The real get_db, get_primary_read_db and get_read_db, with the primary stand-in as the primary
+    monkeypatch.setattr(database, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=primary))
+    monkeypatch.setattr(database, "read_engine", primary)
+    owner = {"Authorization": "Bearer " + create_access_token(data={"sub": "owner", "id": 1, "role": "shop_owner"})}
+    
+    client = TestClient(app)
+    assert client.get("/products/1").json()["name"] == "Replica copy"
+    
+    lags["lag"] = 60.0
+    assert client.get("/products/1").json()["name"] == "Primary copy"
+    
+    lags["lag"] = 0.0
+    # Reads alone don't stick the client to the primary
+    assert client.get("/products/1", headers=owner).json()["name"] == "Replica copy"
+    
+    assert client.put("/products/1", headers=owner, json={"stock_quantity": 2}).status_code == 200
+    response = client.get("/products/1", headers=owner).json()
+    assert (response["name"], response["stock_quantity"]) == ("Primary copy", 2)
+    assert client.get("/products/1").json()["name"] == "Replica copy"
@@ -38,6 +38,25 @@ def test_get_shop_by_id(client, test_shop):
     assert response.status_code == 404
     assert "Shop not found" in response.json()["detail"]
 
+def test_get_shops_conditional(client, test_shop, shop_owner_token):
+    """Test ETag revalidation of the shop list and a single shop"""
+    list_etag = client.get("/shops/").headers["ETag"]
+    shop_etag = client.get(f"/shops/{test_shop.id}").headers["ETag"]
+    
+    assert client.get("/shops/", headers={"If-None-Match": list_etag}).status_code == 304
+    assert client.get(f"/shops/{test_shop.id}", headers={"If-None-Match": shop_etag}).status_code == 304
+    
+    client.put(
+        f"/shops/{test_shop.id}",
+        json={"description": "Updated"},
+        headers={"Authorization": f"Bearer {shop_owner_token}"}
+    )
+    response = client.get("/shops/", headers={"If-None-Match": list_etag})
+    assert response.status_code == 200
+    assert response.json()[0]["description"] == "Updated"
+    response = client.get(f"/shops/{test_shop.id}", headers={"If-None-Match": shop_etag})
+    assert response.status_code == 200
+
 def test_create_shop_as_shop_owner(client, shop_owner_token, test_categories):
     """Test creating a shop as a shop owner"""
     response = client.post(